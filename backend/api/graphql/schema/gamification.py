@@ -52,11 +52,14 @@ class Badge:
 
 @strawberry.type
 class GamificationEvent:
-    id: int
+    id: Optional[int]
     event_type_id: int
     user_id: Optional[int]
     session_id: Optional[str]
     timestamp: str
+    count: int = 1
+    compacted: bool = False
+    summary_id: Optional[int] = None
 
     @classmethod
     def from_db(cls, event):
@@ -65,7 +68,10 @@ class GamificationEvent:
             event_type_id=event.event_type_id,
             user_id=event.user_id,
             session_id=event.session_id,
-            timestamp=event.timestamp.isoformat()
+            timestamp=event.timestamp.isoformat(),
+            count=getattr(event, "count", 1),
+            compacted=getattr(event, "compacted", False),
+            summary_id=getattr(event, "summary_id", None)
         )
 
 @strawberry.type
@@ -1,15 +1,16 @@
 # backend/api/v1/config/integrations.py
 # Endpoints para gestión de integraciones y webhooks
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from models.user import User
-from schemas.integration import IntegrationCreate
+from schemas.integration import IntegrationCreate, WebhookDeliveryResponse
 from models.integration import Integration
 from dependencies.auth import UserContext, get_user_context
-from services.integration_service import add_integration
+from services.integration_service import (add_integration, get_webhook_deliveries,
+                                          invalidate_integration_routes, retry_webhook_delivery)
 from core.database import get_db
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 router = APIRouter(tags=["integrations"])
 
@@ -17,6 +18,7 @@ class CreateIntegrationRequest(BaseModel):
     name: str
     webhook_url: str
     event_type: str
+    coalesce_window: int = Field(0, ge=0, le=3600)  # segundos; 0 = una entrega por evento
 
 @router.post("/", response_model=dict)
 def create_integration(
@@ -26,13 +28,15 @@ def create_integration(
 ):
     if user.user_type != "registered":
         raise HTTPException(status_code=403, detail="Solo usuarios registrados")
-    integration = add_integration(db, user.user_id, request.name, request.webhook_url, request.event_type)
+    integration = add_integration(db, user.user_id, request.name, request.webhook_url, request.event_type,
+                                  request.coalesce_window)
     return {
         "id": integration.id,
         "user_id": user.user_id,
         "name": integration.name,
         "webhook_url": integration.webhook_url,
         "event_type": integration.event_type,
+        "coalesce_window": integration.coalesce_window,
         "active": integration.active,
         "created_at": integration.created_at,
         "last_triggered": integration.last_triggered
@@ -56,6 +60,7 @@ def list_integrations(
             "name": i.name,
             "webhook_url": i.webhook_url,
             "event_type": i.event_type,
+            "coalesce_window": i.coalesce_window,
             "active": i.active,
             "created_at": i.created_at,
             "last_triggered": i.last_triggered,
@@ -63,6 +68,27 @@ def list_integrations(
         for i in integrations
     ]
 
+@router.get("/deliveries", response_model=List[WebhookDeliveryResponse])
+def list_webhook_deliveries(
+    status: Optional[str] = Query(None, description="pending, delivering, delivered o dead"),
+    limit: int = Query(100, ge=1, le=1000),
+    user: UserContext = Depends(get_user_context),
+    db: Session = Depends(get_db)
+):
+    if user.rol != "admin":
+        raise HTTPException(status_code=403, detail="Solo administradores pueden ver las entregas de webhooks")
+    return get_webhook_deliveries(db, status, limit)
+
+@router.post("/deliveries/{delivery_id}/retry", response_model=WebhookDeliveryResponse)
+def retry_delivery(
+    delivery_id: int,
+    user: UserContext = Depends(get_user_context),
+    db: Session = Depends(get_db)
+):
+    if user.rol != "admin":
+        raise HTTPException(status_code=403, detail="Solo administradores pueden reintentar webhooks")
+    return retry_webhook_delivery(db, delivery_id)
+
 @router.put("/{integration_id}", response_model=dict)
 def update_integration(
     integration_id: int,
@@ -78,7 +104,9 @@ def update_integration(
     integration.name = request.name
     integration.webhook_url = request.webhook_url
     integration.event_type = request.event_type
+    integration.coalesce_window = request.coalesce_window
     db.commit()
+    invalidate_integration_routes()
     db.refresh(integration)
     return {
         "id": integration.id,
@@ -86,6 +114,7 @@ def update_integration(
         "name": integration.name,
         "webhook_url": integration.webhook_url,
         "event_type": integration.event_type,
+        "coalesce_window": integration.coalesce_window,
         "active": integration.active,
         "created_at": integration.created_at,
         "last_triggered": integration.last_triggered
@@ -104,6 +133,7 @@ def delete_integration(
         raise HTTPException(status_code=404, detail="Integración no encontrada")
     db.delete(integration)
     db.commit()
+    invalidate_integration_routes()
     return {"message": "Integración eliminada"}
 
 @router.put("/{integration_id}/toggle", response_model=dict)
@@ -119,6 +149,7 @@ def toggle_integration(
         raise HTTPException(status_code=403, detail="No autorizado")
     integration.active = not integration.active
     db.commit()
+    invalidate_integration_routes()
     db.refresh(integration)  # Asegurarse de devolver el estado actualizado
     return {
         "id": integration.id,
@@ -139,4 +170,5 @@ async def create_integration(integration: IntegrationCreate, user_id: Optional[i
     db_integration = Integration(**integration_data)
     db.add(db_integration)
     db.commit()
+    invalidate_integration_routes()
     return db_integration
\ No newline at end of file
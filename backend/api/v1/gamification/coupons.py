@@ -15,7 +15,8 @@ from services.coupon_service import (create_coupon, create_test_coupon, get_coup
                                      redeem_coupon)
 from schemas.coupon import CouponCreate, CouponResponse, CouponTypeCreate, CouponTypeResponse, CouponUpdate
 from services.settings_service import get_setting
-from typing import List
+from services.reference_cache import coupon_type_cache
+from typing import List, Optional
 
 router = APIRouter(tags=["Coupons"])
 
@@ -41,11 +42,13 @@ async def create_test_coupon_route(
 
 @router.get("/activity", response_model=dict)
 async def get_coupons_activity(
-        page: int = Query(1, ge=1, description="Número de página"),
+        page: Optional[int] = Query(None, ge=1, description="Obsoleto: paginación por OFFSET; usar cursor"),
         limit: int = Query(10,
                            ge=1,
                            le=100,
                            description="Elementos por página"),
+        cursor: Optional[str] = Query(None, description="Cursor devuelto en next_cursor"),
+        include_total: bool = Query(True),
         db: Session = Depends(get_db),
         current_user: User = Depends(get_user_context)):
     """
@@ -57,7 +60,7 @@ async def get_coupons_activity(
             detail=
             "No autorizado. Solo administradores pueden ver la actividad de cupones."
         )
-    return get_coupon_activity(db, page, limit)
+    return get_coupon_activity(db, page, limit, cursor=cursor, include_total=include_total)
 
 
 @router.post("/", response_model=CouponResponse)
@@ -170,6 +173,7 @@ def create_coupon_type(coupon_type_data: CouponTypeCreate,
     db.add(coupon_type)
     db.commit()
     db.refresh(coupon_type)
+    coupon_type_cache.invalidate()
     return coupon_type
 
 
@@ -180,4 +184,4 @@ def get_coupon_types(user: UserContext = Depends(get_user_context),
         raise HTTPException(
             status_code=403,
             detail="Solo administradores pueden ver tipos de cupones")
-    return db.query(CouponType).all()
+    return coupon_type_cache.all(db)
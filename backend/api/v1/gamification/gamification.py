@@ -1,38 +1,59 @@
 # backend/api/v1/gamification/gamification.py
 # Endpoints para gamificación: eventos, puntos, badges, rankings
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from sqlalchemy import case, desc, func
 from sqlalchemy.orm import Session
-from models.gamification import Badge, EventType, GamificationEvent, UserGamification
+from models.gamification import Badge, EventType, GamificationEvent, GamificationEventSummary, UserGamification
 from models.user import User
 from dependencies.auth import UserContext, get_user_context
 from core.database import get_db
 from services.gamification_service import (
     create_event_type, get_badges_for_event, get_event_details,
-    get_event_types, get_rankings, get_user_events, get_user_gamification,
+    get_event_types, get_user_events, get_user_gamification,
     get_user_progress_for_event, register_event, update_event_type,
-    delete_event_type, create_badge, get_badges, update_badge, delete_badge)
+    delete_event_type, create_badge, get_badges, update_badge, delete_badge,
+    recompute_user_gamification, get_my_rank, get_window_rankings, register_events_batch,
+    get_gamification_pipeline_metrics)
+from services.gamification_compaction import compact_gamification_events
 from schemas.gamification import (EventTypeCreate, EventTypeResponse,
                                   BadgeCreate, BadgeResponse,
-                                  GamificationEventCreate,
+                                  GamificationEventCreate, GamificationEventBatch,
                                   GamificationEventResponse,
                                   UserGamificationResponse, RankingResponse)
-from typing import List
+from typing import List, Optional
 
 router = APIRouter(tags=["Gamification"])
 
 
 # Endpoints existentes
 @router.get("/rankings", response_model=List[RankingResponse])
-def get_rankings_endpoint(db: Session = Depends(get_db)):
-    return get_rankings(db)
+def get_rankings_endpoint(page: int = Query(1, ge=1),
+                          limit: int = Query(100, ge=1, le=1000),
+                          window: str = Query("all", pattern="^(1d|7d|30d|all)$"),
+                          event_type_id: Optional[int] = Query(None),
+                          db: Session = Depends(get_db)):
+    return get_window_rankings(db, window, event_type_id, limit=limit, offset=(page - 1) * limit)
+
+
+@router.get("/rankings/me")
+def get_my_rank_endpoint(user: UserContext = Depends(get_user_context),
+                         db: Session = Depends(get_db)):
+    return get_my_rank(db, user)
 
 
 @router.post("/events")
 async def create_event(event: GamificationEventCreate,
+                       idempotency_key: Optional[str] = Header(None, max_length=64),
                        user: UserContext = Depends(get_user_context),
                        db: Session = Depends(get_db)):
-    return register_event(db, event, user)
+    return register_event(db, event, user, idempotency_key)
+
+
+@router.post("/events/batch")
+def create_events_batch(batch: GamificationEventBatch,
+                        user: UserContext = Depends(get_user_context),
+                        db: Session = Depends(get_db)):
+    return register_events_batch(db, batch.events, user)
 
 
 @router.get("/me", response_model=List[UserGamificationResponse])
@@ -155,14 +176,43 @@ def delete_badge_endpoint(badge_id: int,
     return {"message": "Badge eliminado"}
 
 
+@router.get("/pipeline/metrics")
+def get_pipeline_metrics(user: UserContext = Depends(get_user_context)):
+    if user.rol != "admin":
+        raise HTTPException(status_code=403, detail="No autorizado")
+    return get_gamification_pipeline_metrics()
+
+
+@router.post("/recompute")
+def recompute_gamification_endpoint(event_type_id: Optional[int] = Query(None),
+                                    user: UserContext = Depends(get_user_context),
+                                    db: Session = Depends(get_db)):
+    """Reconstruye puntos y badges a partir del histórico de eventos."""
+    if user.rol != "admin":
+        raise HTTPException(status_code=403, detail="No autorizado")
+    return recompute_user_gamification(db, event_type_id)
+
+
+@router.post("/compact")
+def compact_gamification_events_endpoint(older_than_days: Optional[int] = Query(None, ge=1),
+                                         user: UserContext = Depends(get_user_context),
+                                         db: Session = Depends(get_db)):
+    """Resume por día los eventos antiguos y archiva las filas originales en NDJSON comprimido."""
+    if user.rol != "admin":
+        raise HTTPException(status_code=403, detail="No autorizado")
+    return compact_gamification_events(db, older_than_days)
+
+
 # backend/api/v1/admin.py
 @router.get("/kpis")
 def get_gamification_kpis(user=Depends(get_user_context), db: Session = Depends(get_db)):
     if user.rol != "admin":
         raise HTTPException(status_code=403, detail="Solo administradores")
 
-    # Total de eventos
-    total_events = db.query(GamificationEvent).count()
+    # Total de eventos (recientes más los ya compactados en resúmenes diarios)
+    total_events = db.query(GamificationEvent).count() + int(
+        db.query(func.sum(GamificationEventSummary.events)).scalar() or 0
+    )
 
     # Usuarios activos en gamificación
     active_users = db.query(GamificationEvent).distinct(
@@ -196,9 +246,15 @@ def get_gamification_kpis(user=Depends(get_user_context), db: Session = Depends(
     # Actividad por tipo de evento
     event_dist = db.query(
         EventType.name,
-        func.count(GamificationEvent.id).label("count")
+        func.count(GamificationEvent.id).label("count"),
+        EventType.id
     ).outerjoin(GamificationEvent, EventType.id == GamificationEvent.event_type_id
     ).group_by(EventType.id).all()
+    compacted_dist = dict(db.query(
+        GamificationEventSummary.event_type_id,
+        func.sum(GamificationEventSummary.events)
+    ).group_by(GamificationEventSummary.event_type_id).all())
+    event_dist = [(e[0], e[1] + int(compacted_dist.get(e[2]) or 0)) for e in event_dist]
 
     return {
         "total_events": total_events,
@@ -3,17 +3,13 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from dependencies.credits import check_credits
-from models.credit_transaction import CreditTransaction
-from models.gamification import EventType
-from models.guests import GuestsSession
-from models.user import User
 from schemas.gamification import GamificationEventCreate, GamificationEventResponse
 from services.gamification_service import register_event
-from services.integration_service import trigger_webhook
+from services.reference_cache import event_type_cache
 from services.settings_service import get_setting
 from middleware.credits_middleware import require_credits
 from dependencies.auth import UserContext, get_user_context
-from services.credits_service import reset_credits
+from services.credits_service import charge_credits, get_renewal_policy, reset_credits
 from core.database import get_db
 from core.logging import configure_logging
 
@@ -35,8 +31,8 @@ def reset_all_credits(user: UserContext = Depends(get_user_context), db: Session
         if user.user_type != "registered":
             logger.warning(f"Intento de resetear créditos por usuario no registrado ID {user.user_id}")
             raise HTTPException(status_code=403, detail="Solo usuarios registrados")
-        reset_credits(db, int(user.user_id))
-        return {"message": "Créditos reiniciados para todos los usuarios"}
+        report = reset_credits(db, **get_renewal_policy(db))
+        return {"message": "Créditos reiniciados para todos los usuarios", **report}
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -69,42 +65,7 @@ async def no_login_test(user: UserContext = Depends(check_credits), db: Session
     # Consumir créditos si no están desactivados
     disable_credits = get_setting(db, "disable_credits")
     if (disable_credits != "true"):
-        try:
-            if user.user_type == "registered":
-                user_db = db.query(User).filter(User.id == int(user.user_id)).first()
-                user_db.credits -= 1
-                transaction = CreditTransaction(
-                    user_id=user_db.id,
-                    user_type="registered",  # Especificar explícitamente
-                    amount=-1,
-                    transaction_type="usage",
-                    description="Consulta realizada"
-                )
-                credits_remaining = user_db.credits
-            else:
-                session_db = db.query(GuestsSession).filter(GuestsSession.id == user.user_id).first()
-                session_db.credits -= 1
-                transaction = CreditTransaction(
-                    session_id=session_db.id,
-                    user_type="anonymous",  # Especificar explícitamente para claridad
-                    amount=-1,
-                    transaction_type="usage",
-                    description="Consulta realizada por anónimo"
-                )
-                credits_remaining = session_db.credits
-            
-            db.add(transaction)
-            db.commit()
-
-            trigger_webhook(db, "credit_usage", {
-                "user_id": user.user_id,
-                "user_type": user.user_type,
-                "credits_remaining": credits_remaining
-            })
-            logger.debug(f"Créditos actualizados para {user.user_type} ID {user.user_id}: {credits_remaining}")
-        except Exception as e:
-            logger.error(f"Error al consumir créditos para {user.user_type} ID {user.user_id}: {str(e)}")
-            raise HTTPException(status_code=500, detail="Error al procesar los créditos")
+        charge_credits(db, user.user_type, user.user_id)  # Incluye el webhook credit_usage
 
     return response
 
@@ -123,34 +84,13 @@ async def restricted_test(user: UserContext = Depends(check_credits), db: Sessio
     # Consumir créditos si no están desactivados
     disable_credits = get_setting(db, "disable_credits")
     if disable_credits != "true":
-        try:
-            user_db = db.query(User).filter(User.id == int(user.user_id)).first()
-            user_db.credits -= 1
-            transaction = CreditTransaction(
-                user_id=user_db.id,
-                user_type="registered",  # Especificar explícitamente
-                amount=-1,
-                transaction_type="usage",
-                description="Consulta realizada"
-            )
-            db.add(transaction)
-            db.commit()
-
-            trigger_webhook(db, "credit_usage", {
-                "user_id": user.user_id,
-                "user_type": user.user_type,
-                "credits_remaining": user_db.credits
-            })
-            logger.debug(f"Créditos actualizados para {user.user_type} ID {user.user_id}: {user_db.credits}")
-        except Exception as e:
-            logger.error(f"Error al consumir créditos para {user.user_type} ID {user.user_id}: {str(e)}")
-            raise HTTPException(status_code=500, detail="Error al procesar los créditos")
+        charge_credits(db, "registered", user.user_id)  # Incluye el webhook credit_usage
 
     return response
 
 @router.post("/test-event", response_model=GamificationEventResponse)
 def test_gamification_event(user: UserContext = Depends(get_user_context), db: Session = Depends(get_db)):
-    event_type = db.query(EventType).filter(EventType.name == "test_api").first()
+    event_type = event_type_cache.get_by_name(db, "test_api")
     if not event_type:
         raise HTTPException(status_code=404, detail="Event type 'test_api' not found")
     event = GamificationEventCreate(event_type_id=event_type.id)
@@ -4,17 +4,18 @@
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from core.logging import configure_logging
 from models.log import APILog
 from schemas.api_log import APILogResponse  # Asegúrate de que este esquema existe
 from dependencies.auth import get_user_context
 from core.database import get_db
-from math import ceil
+from core.pagination import paginate
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from core.database import get_db
 from services.log_service import clear_api_logs, clear_error_logs
+from services.retention_service import apply_retention_policies
 from models.user import User
 
 router = APIRouter(tags=["Logs"])
@@ -22,30 +23,23 @@ logger = configure_logging()
 
 @router.get("/", response_model=dict)
 def get_api_logs(
-    page: int = Query(1, ge=1),
+    page: Optional[int] = Query(None, ge=1, description="Obsoleto: paginación por OFFSET; usar cursor"),
     limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Cursor devuelto en next_cursor"),
+    include_total: bool = Query(True),
     user=Depends(get_user_context),
     db: Session = Depends(get_db)
 ):
     if user.rol != "admin":
         raise HTTPException(status_code=403, detail="Solo los administradores pueden acceder a este recurso")
-    
-    offset = (page - 1) * limit
-    query = db.query(APILog)
-    total_items = query.count()
-    logs = query.offset(offset).limit(limit).all()
-    
+
     # Convertir los modelos SQLAlchemy a esquemas Pydantic
-    logs_data = [APILogResponse.from_orm(log) for log in logs]
-    
-    logger.info(f"Logs encontrados: {len(logs)} para page={page}, limit={limit}")
-    
-    return {
-        "data": logs_data,  # Usar los datos serializados
-        "total_items": total_items,
-        "total_pages": ceil(total_items / limit),
-        "current_page": page
-    }
+    result = paginate(db, db.query(APILog), APILog, limit, page=page, cursor=cursor,
+                      include_total=include_total, serialize=APILogResponse.from_orm)
+
+    logger.info(f"Logs encontrados: {len(result['data'])} para page={page}, limit={limit}")
+
+    return result
 
 @router.delete("/clear", status_code=status.HTTP_204_NO_CONTENT)
 async def clear_logs(
@@ -63,3 +57,18 @@ async def clear_logs(
     clear_api_logs(db)
     return None  # HTTP 204 no devuelve contenido
 
+
+@router.post("/retention", response_model=list)
+def run_retention(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_user_context)
+):
+    """
+    Aplica las políticas de retención de logs, errores, eventos y transacciones. Solo administradores.
+    """
+    if current_user.rol != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No autorizado. Solo administradores pueden aplicar la retención."
+        )
+    return apply_retention_policies(db)
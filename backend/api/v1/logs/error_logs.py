@@ -2,17 +2,17 @@
 # Endpoints para logs de errores (v1)
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from core.logging import configure_logging
 from models.error_log import ErrorLog
-from schemas.error_log import ErrorLogResponse  # Asegúrate de que este esquema existe
+from schemas.error_log import ErrorGroupResponse, ErrorLogResponse  # Asegúrate de que este esquema existe
 from dependencies.auth import get_user_context
 from core.database import get_db
-from math import ceil
+from core.pagination import paginate
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from core.database import get_db
-from services.log_service import clear_api_logs, clear_error_logs
+from services.log_service import clear_api_logs, clear_error_logs, get_error_groups, get_error_log_metrics
 from models.user import User
 
 router = APIRouter(tags=["Errors"])
@@ -20,8 +20,10 @@ logger = configure_logging()
 
 
 @router.get("/", response_model=dict)
-def get_error_logs(page: int = Query(1, ge=1),
+def get_error_logs(page: Optional[int] = Query(None, ge=1, description="Obsoleto: paginación por OFFSET; usar cursor"),
                    limit: int = Query(10, ge=1, le=100),
+                   cursor: Optional[str] = Query(None, description="Cursor devuelto en next_cursor"),
+                   include_total: bool = Query(True),
                    user=Depends(get_user_context),
                    db: Session = Depends(get_db)):
     if user.rol != "admin":
@@ -29,23 +31,38 @@ def get_error_logs(page: int = Query(1, ge=1),
             status_code=403,
             detail="Solo los administradores pueden acceder a este recurso")
 
-    offset = (page - 1) * limit
-    query = db.query(ErrorLog)
-    total_items = query.count()
-    logs = query.offset(offset).limit(limit).all()
-
     # Convertir los modelos SQLAlchemy a esquemas Pydantic
-    logs_data = [ErrorLogResponse.from_orm(log) for log in logs]
+    result = paginate(db, db.query(ErrorLog), ErrorLog, limit, page=page, cursor=cursor,
+                      include_total=include_total, serialize=ErrorLogResponse.from_orm)
 
     logger.info(
-        f"Logs encontrados: {len(logs)} para page={page}, limit={limit}")
-
-    return {
-        "data": logs_data,  # Usar los datos serializados
-        "total_items": total_items,
-        "total_pages": ceil(total_items / limit),
-        "current_page": page
-    }
+        f"Logs encontrados: {len(result['data'])} para page={page}, limit={limit}")
+
+    return result
+
+
+@router.get("/groups", response_model=List[ErrorGroupResponse])
+def get_error_groups_endpoint(sort: str = Query("count", pattern="^(count|recent)$"),
+                              limit: int = Query(50, ge=1, le=500),
+                              user=Depends(get_user_context),
+                              db: Session = Depends(get_db)):
+    """
+    Errores agregados por huella, ordenados por número de ocurrencias o por la más reciente.
+    """
+    if user.rol != "admin":
+        raise HTTPException(
+            status_code=403,
+            detail="Solo los administradores pueden acceder a este recurso")
+    return get_error_groups(db, sort, limit)
+
+
+@router.get("/metrics", response_model=dict)
+def get_error_writer_metrics(user=Depends(get_user_context)):
+    if user.rol != "admin":
+        raise HTTPException(
+            status_code=403,
+            detail="Solo los administradores pueden acceder a este recurso")
+    return get_error_log_metrics()
 
 
 @router.delete("/clear", status_code=status.HTTP_204_NO_CONTENT)
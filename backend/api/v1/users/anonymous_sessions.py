@@ -3,38 +3,31 @@
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from models.guests import GuestsSession
 from schemas.anonymous_session import GuestsSessionResponse 
 from dependencies.auth import UserContext, get_user_context
 from core.database import get_db
-from math import ceil
+from core.pagination import paginate
 
 router = APIRouter(tags=["Sessions"])
 
 @router.get("/", response_model=dict)
 def get_anonymous_sessions(
-    page: int = Query(1, ge=1),
+    page: Optional[int] = Query(None, ge=1, description="Obsoleto: paginación por OFFSET; usar cursor"),
     limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Cursor devuelto en next_cursor"),
+    include_total: bool = Query(True),
     user=Depends(get_user_context),
     db: Session = Depends(get_db)
 ):
     if user.rol != "admin":
         raise HTTPException(status_code=403, detail="Solo los administradores pueden acceder a este recurso")
-    
-    offset = (page - 1) * limit
-    query = db.query(GuestsSession)
-    total_items = query.count()
-    sessions = query.offset(offset).limit(limit).all()
 
-    sessions_data = [GuestsSessionResponse.from_orm(session) for session in sessions]
-    
-    return {
-        "data": sessions_data,  # Usar los datos serializados
-        "total_items": total_items,
-        "total_pages": ceil(total_items / limit),
-        "current_page": page
-    }
+    # El id es un UUID: se ordena por fecha de creación y se desempata por id
+    return paginate(db, db.query(GuestsSession), GuestsSession, limit, page=page, cursor=cursor,
+                    order_column=GuestsSession.create_at, include_total=include_total,
+                    serialize=GuestsSessionResponse.from_orm)
 
 @router.get("/credits", response_model=dict)
 async def get_anonymous_credits(user: UserContext = Depends(get_user_context), db: Session = Depends(get_db)):
@@ -1,12 +1,13 @@
 # backend/api/v1/users/users.py
 # Endpoints de gestión de usuarios (v1)
-from math import ceil
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from models.user import User
 from schemas.user import UserResponse, UpdateProfileRequest
 from services.user_service import get_user_info, update_user, delete_user, list_users
 from core.database import get_db
+from core.pagination import paginate
 from dependencies.auth import UserContext, get_user_context
 from core.logging import configure_logging
 
@@ -44,8 +45,10 @@ def delete_me(user: UserContext = Depends(get_user_context),
 
 
 @router.get("/admin/users", response_model=dict)
-def get_all_users(page: int = Query(1, ge=1),
+def get_all_users(page: Optional[int] = Query(None, ge=1, description="Obsoleto: paginación por OFFSET; usar cursor"),
                   limit: int = Query(10, ge=1, le=100),
+                  cursor: Optional[str] = Query(None, description="Cursor devuelto en next_cursor"),
+                  include_total: bool = Query(True),
                   user=Depends(get_user_context),
                   db: Session = Depends(get_db)):
     if user.rol != "admin":
@@ -53,20 +56,9 @@ def get_all_users(page: int = Query(1, ge=1),
             status_code=403,
             detail="Solo administradores pueden ver la lista de usuarios")
 
-    offset = (page - 1) * limit
-    query = db.query(User)
-    total_items = query.count()
-    users = query.offset(offset).limit(limit).all()
-
     # Convertimos los usuarios a esquemas Pydantic
-    users_data = [UserResponse.model_validate(user) for user in users]
-
-    return {
-        "data": users_data,
-        "total_items": total_items,
-        "total_pages": ceil(total_items / limit),
-        "current_page": page
-    }
+    return paginate(db, db.query(User), User, limit, page=page, cursor=cursor,
+                    include_total=include_total, serialize=UserResponse.model_validate)
 
 
 @router.get("/{user_id}", response_model=UserResponse)
@@ -1,3 +1,3 @@
-celery -A app.tasks worker --loglevel=info
+celery -A app.tasks worker -B --loglevel=info
 
 redis-server
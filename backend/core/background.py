@@ -0,0 +1,127 @@
+# backend/core/background.py
+# Escritura diferida en lotes desde un hilo de fondo por proceso
+import time
+from collections import deque
+from threading import Event, Lock, Thread
+from typing import Callable, Hashable, List, Optional
+from core.logging import configure_logging
+
+logger = configure_logging()
+
+
+class BatchWriter:
+    """
+    Acumula elementos en memoria y los entrega en lotes a flush_fn desde un hilo de fondo,
+    cada flush_interval segundos o en cuanto se alcanzan max_batch elementos.
+
+    - Con key, los elementos se fusionan: sólo se conserva el último valor por clave.
+    - max_queue acota la memoria; al llenarse, submit descarta el elemento y lo contabiliza.
+    - Si el writer no está arrancado (scripts, tareas Celery), submit escribe de forma síncrona.
+    """
+
+    def __init__(self, name: str, flush_fn: Callable[[List], None], max_batch: int = 500,
+                 flush_interval: float = 5.0, max_queue: Optional[int] = None):
+        self.name = name
+        self.flush_fn = flush_fn
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self._items: deque = deque()
+        self._keyed: dict = {}
+        self._lock = Lock()
+        self._flush_lock = Lock()
+        self._wakeup = Event()
+        self._stopping = Event()
+        self._thread: Optional[Thread] = None
+        self.metrics = {
+            "submitted": 0,
+            "written": 0,
+            "dropped": 0,
+            "failed": 0,
+            "batches": 0,
+            "last_batch_size": 0,
+            "max_batch_size": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._items) + len(self._keyed)
+
+    def submit(self, item, key: Hashable = None) -> bool:
+        if not self.running:
+            self._write([item])
+            return True
+        with self._lock:
+            size = len(self._items) + len(self._keyed)
+            if self.max_queue is not None and size >= self.max_queue and key not in self._keyed:
+                self.metrics["dropped"] += 1
+                return False
+            if key is None:
+                self._items.append(item)
+            else:
+                self._keyed[key] = item
+            self.metrics["submitted"] += 1
+            size += 1
+        if size >= self.max_batch:
+            self._wakeup.set()
+        return True
+
+    def _drain(self) -> List:
+        with self._lock:
+            batch = list(self._items) + list(self._keyed.values())
+            self._items.clear()
+            self._keyed.clear()
+        return batch
+
+    def _write(self, batch: List) -> None:
+        started = time.perf_counter()
+        try:
+            self.flush_fn(batch)
+            self.metrics["written"] += len(batch)
+        except Exception as e:
+            self.metrics["failed"] += len(batch)
+            logger.error(f"Error al volcar lote de {self.name} ({len(batch)} elementos): {str(e)}")
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.metrics["batches"] += 1
+        self.metrics["last_batch_size"] = len(batch)
+        self.metrics["max_batch_size"] = max(self.metrics["max_batch_size"], len(batch))
+        self.metrics["last_flush_ms"] = round(elapsed_ms, 3)
+        self.metrics["max_flush_ms"] = round(max(self.metrics["max_flush_ms"], elapsed_ms), 3)
+
+    def flush(self) -> int:
+        """Vuelca inmediatamente todo lo pendiente. Devuelve el número de elementos escritos."""
+        with self._flush_lock:
+            batch = self._drain()
+            for start in range(0, len(batch), self.max_batch):
+                self._write(batch[start:start + self.max_batch])
+            return len(batch)
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stopping.clear()
+        self._thread = Thread(target=self._run, name=f"batch-writer-{self.name}", daemon=True)
+        self._thread.start()
+        logger.info(f"BatchWriter '{self.name}' iniciado (lote={self.max_batch}, intervalo={self.flush_interval}s)")
+
+    def stop(self) -> None:
+        """Detiene el hilo y vuelca lo pendiente (llamar en el shutdown de la aplicación)."""
+        if self._thread is not None:
+            self._stopping.set()
+            self._wakeup.set()
+            self._thread.join(timeout=self.flush_interval + 5)
+            self._thread = None
+        written = self.flush()
+        logger.info(f"BatchWriter '{self.name}' detenido; {written} elementos volcados al cerrar")
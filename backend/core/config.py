@@ -2,6 +2,7 @@
 # Módulo de configuración de la aplicación.
 
 from dotenv import load_dotenv
+import json
 import os
 
 load_dotenv()
@@ -14,6 +15,100 @@ class Settings:
     # Configuración de bases de datos
     SQLITE_URL = os.getenv("SQLITE_URL","sqlite:///dev.db")  # SQLite en desarrollo
     MYSQL_URL = os.getenv("MYSQL_URL")  # MySQL en producción (definido en .env)
+
+    # Caché en memoria de site_settings (segundos entre comprobaciones de versión)
+    SETTINGS_CACHE_TTL = int(os.getenv("SETTINGS_CACHE_TTL", "5"))
+
+    # Índice en memoria de tokens revocados (Bloom + LRU)
+    REVOCATION_BLOOM_CAPACITY = int(os.getenv("REVOCATION_BLOOM_CAPACITY", "100000"))
+    REVOCATION_BLOOM_ERROR_RATE = float(os.getenv("REVOCATION_BLOOM_ERROR_RATE", "0.001"))
+    REVOCATION_LRU_SIZE = int(os.getenv("REVOCATION_LRU_SIZE", "10000"))
+    REVOCATION_REFRESH_INTERVAL = int(os.getenv("REVOCATION_REFRESH_INTERVAL", "5"))  # segundos
+    REVOCATION_REFRESH_OVERLAP = int(os.getenv("REVOCATION_REFRESH_OVERLAP", "60"))  # segundos releídos en cada consulta
+
+    # Escritura diferida de last_ip / last_login / ultima_actividad
+    ACTIVITY_FLUSH_INTERVAL = float(os.getenv("ACTIVITY_FLUSH_INTERVAL", "10"))  # segundos
+    ACTIVITY_FLUSH_SIZE = int(os.getenv("ACTIVITY_FLUSH_SIZE", "500"))
+
+    # Ledger de credit_transactions: "sync" (misma transacción que el cargo) o "batched"
+    # (inserción diferida en lotes; el saldo se sigue actualizando de forma atómica)
+    CREDIT_LEDGER_MODE = os.getenv("CREDIT_LEDGER_MODE", "sync")
+    CREDIT_LEDGER_MAX_LATENCY = float(os.getenv("CREDIT_LEDGER_MAX_LATENCY", "1"))  # segundos
+    CREDIT_LEDGER_BATCH_SIZE = int(os.getenv("CREDIT_LEDGER_BATCH_SIZE", "1000"))
+    CREDIT_LEDGER_FLUSH_RETRIES = int(os.getenv("CREDIT_LEDGER_FLUSH_RETRIES", "3"))
+    # Lotes que no se pueden insertar se guardan aquí y se reinsertan al recuperarse la base de datos
+    CREDIT_LEDGER_SPILL_DIR = os.getenv("CREDIT_LEDGER_SPILL_DIR", "spool/credit_ledger")
+
+    # Filas de usuarios por transacción en la renovación masiva de créditos
+    CREDIT_RESET_CHUNK_SIZE = int(os.getenv("CREDIT_RESET_CHUNK_SIZE", "10000"))
+
+    # Despachador de webhooks (outbox)
+    WEBHOOK_POLL_INTERVAL = float(os.getenv("WEBHOOK_POLL_INTERVAL", "1"))  # segundos
+    WEBHOOK_BATCH_SIZE = int(os.getenv("WEBHOOK_BATCH_SIZE", "100"))
+    WEBHOOK_TIMEOUT = float(os.getenv("WEBHOOK_TIMEOUT", "5"))  # segundos por petición
+    WEBHOOK_PER_INTEGRATION_CONCURRENCY = int(os.getenv("WEBHOOK_PER_INTEGRATION_CONCURRENCY", "2"))
+    WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "50"))
+    WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "8"))
+    WEBHOOK_BACKOFF_BASE = float(os.getenv("WEBHOOK_BACKOFF_BASE", "2"))  # segundos
+    WEBHOOK_BACKOFF_MAX = float(os.getenv("WEBHOOK_BACKOFF_MAX", "3600"))  # segundos
+    # Vigencia de la tabla de rutas event_type -> integraciones activas en cada worker
+    INTEGRATION_ROUTES_TTL = float(os.getenv("INTEGRATION_ROUTES_TTL", "30"))  # segundos
+
+    # Escritura en lotes de error_logs desde los manejadores de excepciones
+    ERROR_LOG_FLUSH_INTERVAL = float(os.getenv("ERROR_LOG_FLUSH_INTERVAL", "2"))  # segundos
+    ERROR_LOG_BATCH_SIZE = int(os.getenv("ERROR_LOG_BATCH_SIZE", "200"))
+    ERROR_LOG_MAX_QUEUE = int(os.getenv("ERROR_LOG_MAX_QUEUE", "10000"))
+    # Con la cola por encima de la mitad, sólo se conserva esta fracción de los errores 4xx
+    ERROR_LOG_SAMPLE_RATE = float(os.getenv("ERROR_LOG_SAMPLE_RATE", "0.1"))
+    # Los errores se agregan en error_groups; sólo los de código >= este valor guardan además fila en error_logs
+    ERROR_LOG_RAW_MIN_STATUS = int(os.getenv("ERROR_LOG_RAW_MIN_STATUS", "500"))
+    ERROR_GROUP_SAMPLE_SIZE = int(os.getenv("ERROR_GROUP_SAMPLE_SIZE", "5"))  # ocurrencias de ejemplo por grupo
+
+    # Registro de peticiones en api_logs (middleware ASGI + escritura en lotes)
+    API_LOG_ENABLED = os.getenv("API_LOG_ENABLED", "true").lower() == "true"
+    API_LOG_SAMPLE_RATE = float(os.getenv("API_LOG_SAMPLE_RATE", "0.1"))  # respuestas < 400
+    API_LOG_ERROR_SAMPLE_RATE = float(os.getenv("API_LOG_ERROR_SAMPLE_RATE", "1"))  # respuestas >= 400
+    # Tasas por plantilla de ruta en JSON, p.ej. {"/health": 0, "/v1/payments/": 1}
+    API_LOG_ROUTE_SAMPLE_RATES = json.loads(os.getenv("API_LOG_ROUTE_SAMPLE_RATES", '{"/health": 0}'))
+    API_LOG_CAPTURE_BODY = os.getenv("API_LOG_CAPTURE_BODY", "false").lower() == "true"
+    API_LOG_BODY_LIMIT = int(os.getenv("API_LOG_BODY_LIMIT", "1024"))  # bytes guardados del cuerpo
+    API_LOG_FLUSH_INTERVAL = float(os.getenv("API_LOG_FLUSH_INTERVAL", "2"))  # segundos
+    API_LOG_BATCH_SIZE = int(os.getenv("API_LOG_BATCH_SIZE", "500"))
+    API_LOG_MAX_QUEUE = int(os.getenv("API_LOG_MAX_QUEUE", "20000"))
+
+    # Paginación de listados de administración
+    PAGINATION_COUNT_TTL = int(os.getenv("PAGINATION_COUNT_TTL", "30"))  # segundos de caché del total
+    PAGINATION_APPROX_COUNT_THRESHOLD = int(os.getenv("PAGINATION_APPROX_COUNT_THRESHOLD", "100000"))
+
+    # Agregados diarios de KPIs: intervalo de la tarea programada que los recalcula (segundos)
+    KPI_ROLLUP_MAX_AGE = int(os.getenv("KPI_ROLLUP_MAX_AGE", "300"))
+    KPI_SOURCE = os.getenv("KPI_SOURCE", "rollup")  # "rollup" o "live"
+    KPI_CACHE_TTL = int(os.getenv("KPI_CACHE_TTL", "30"))
+
+    # Gamificación: caducidad del índice en memoria de tipos de evento y badges
+    GAMIFICATION_CACHE_TTL = int(os.getenv("GAMIFICATION_CACHE_TTL", "60"))
+    GAMIFICATION_WINDOW_CACHE_TTL = int(os.getenv("GAMIFICATION_WINDOW_CACHE_TTL", "30"))  # rankings por ventana
+    GAMIFICATION_BATCH_MAX_EVENTS = int(os.getenv("GAMIFICATION_BATCH_MAX_EVENTS", "1000"))
+    GAMIFICATION_BATCH_MAX_AGE_DAYS = int(os.getenv("GAMIFICATION_BATCH_MAX_AGE_DAYS", "7"))  # Antigüedad máxima de timestamp
+    GAMIFICATION_FLUSH_INTERVAL = float(os.getenv("GAMIFICATION_FLUSH_INTERVAL", "1"))  # volcado de eventos encolados
+    GAMIFICATION_BATCH_SIZE = int(os.getenv("GAMIFICATION_BATCH_SIZE", "500"))
+    GAMIFICATION_MAX_QUEUE = int(os.getenv("GAMIFICATION_MAX_QUEUE", "50000"))
+    GAMIFICATION_FLUSH_RETRIES = int(os.getenv("GAMIFICATION_FLUSH_RETRIES", "3"))
+    GAMIFICATION_DEAD_LETTER_ATTEMPTS = int(os.getenv("GAMIFICATION_DEAD_LETTER_ATTEMPTS", "3"))  # Volcados fallidos por evento
+    GAMIFICATION_COMPACT_AFTER_DAYS = int(os.getenv("GAMIFICATION_COMPACT_AFTER_DAYS", "30"))  # 0 = no compactar
+    GAMIFICATION_ARCHIVE_DIR = os.getenv("GAMIFICATION_ARCHIVE_DIR", "archive/gamification_events")  # vacío = sin archivo
+    GAMIFICATION_BUCKET_RETENTION_DAYS = int(os.getenv("GAMIFICATION_BUCKET_RETENTION_DAYS", "31"))
+
+    # Caché de datos de referencia (tipos de evento, badges, tipos de cupón, proveedores de pago)
+    REFERENCE_CACHE_TTL = int(os.getenv("REFERENCE_CACHE_TTL", "60"))
+
+    # Retención de tablas de sólo inserción (días; 0 = conservar siempre)
+    API_LOG_RETENTION_DAYS = int(os.getenv("API_LOG_RETENTION_DAYS", "30"))
+    ERROR_LOG_RETENTION_DAYS = int(os.getenv("ERROR_LOG_RETENTION_DAYS", "90"))
+    GAMIFICATION_EVENT_RETENTION_DAYS = int(os.getenv("GAMIFICATION_EVENT_RETENTION_DAYS", "0"))
+    CREDIT_TRANSACTION_RETENTION_DAYS = int(os.getenv("CREDIT_TRANSACTION_RETENTION_DAYS", "0"))
+    RETENTION_CHUNK_SIZE = int(os.getenv("RETENTION_CHUNK_SIZE", "5000"))  # filas por DELETE sin particiones
+    RETENTION_PARTITIONS_AHEAD = int(os.getenv("RETENTION_PARTITIONS_AHEAD", "7"))  # periodos futuros a preparar
     
     @property
     def DATABASE_URL(self):
@@ -0,0 +1,121 @@
+# backend/core/pagination.py
+# Paginación por cursor (keyset) para los listados de administración
+#
+# Los listados se recorren de más reciente a más antiguo sobre (columna_orden, id) o sólo id.
+# El cursor es opaco (base64 de la última clave devuelta): cada página es un rango sobre el
+# índice, así que la página 1000 cuesta lo mismo que la primera. El cursor es el modo por
+# defecto; page (OFFSET, coste proporcional a la página) sólo se usa si el cliente lo envía
+# explícitamente y se mantiene por compatibilidad. Las filas con la columna de orden a NULL
+# van al final (NULLS LAST explícito, igual en todos los motores) y el cursor las codifica.
+# El total es opcional y se sirve desde un contador cacheado (estimado en MariaDB/MySQL para
+# tablas grandes) en lugar de un COUNT(*) por página.
+import base64
+import json
+import time
+from datetime import datetime
+from math import ceil
+from threading import Lock
+from fastapi import HTTPException
+from sqlalchemy import and_, func, or_, select, text
+from sqlalchemy.orm import Query, Session
+from core.config import settings
+
+_count_cache: dict = {}
+_count_lock = Lock()
+
+
+def encode_cursor(key: list) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in key])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, with_timestamp: bool) -> list:
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(key, list) or len(key) != (2 if with_timestamp else 1):
+            raise ValueError("longitud de clave")
+        if with_timestamp and key[0] is not None:
+            key[0] = datetime.fromisoformat(key[0])
+        return key
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor de paginación no válido")
+
+
+def count_rows(db: Session, model) -> tuple[int, bool]:
+    """
+    Total de filas de la tabla, cacheado PAGINATION_COUNT_TTL segundos.
+    En MariaDB/MySQL, si la estimación de information_schema supera el umbral se devuelve
+    la estimación (segundo valor True) en lugar de contar toda la tabla.
+    """
+    table = model.__tablename__
+    now = time.monotonic()
+    with _count_lock:
+        cached = _count_cache.get(table)
+        if cached and cached[2] > now:
+            return cached[0], cached[1]
+
+    estimated = False
+    total = None
+    if db.get_bind().dialect.name in ("mysql", "mariadb"):
+        approx = db.execute(text(
+            "SELECT TABLE_ROWS FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table"
+        ), {"table": table}).scalar()
+        if approx is not None and approx >= settings.PAGINATION_APPROX_COUNT_THRESHOLD:
+            total, estimated = int(approx), True
+    if total is None:
+        total = db.execute(select(func.count()).select_from(model)).scalar() or 0
+
+    with _count_lock:
+        _count_cache[table] = (total, estimated, now + settings.PAGINATION_COUNT_TTL)
+    return total, estimated
+
+
+def paginate(db: Session, query: Query, model, limit: int, page: int | None = None, cursor: str | None = None,
+             order_column=None, include_total: bool = True, serialize=None) -> dict:
+    """
+    Devuelve una página de query ordenada por (order_column, id) descendente, NULLs al final.
+    Por defecto se usa keyset (primera página sin cursor, siguientes con next_cursor); page
+    activa el modo heredado por OFFSET y sólo se respeta si no se envía cursor.
+    """
+    pk = model.id
+    keys = [order_column, pk] if order_column is not None else [pk]
+    legacy = page is not None and not cursor
+    if cursor:
+        key = decode_cursor(cursor, order_column is not None)
+        if order_column is None:
+            query = query.filter(pk < key[0])
+        elif key[0] is None:
+            query = query.filter(order_column.is_(None), pk < key[1])
+        else:
+            query = query.filter(or_(order_column < key[0], and_(order_column == key[0], pk < key[1]),
+                                     order_column.is_(None)))
+    if order_column is not None:
+        query = query.order_by(order_column.is_(None), order_column.desc(), pk.desc())
+    else:
+        query = query.order_by(pk.desc())
+    if legacy and page > 1:
+        query = query.offset((page - 1) * limit)
+
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, k.key) for k in keys])
+
+    result = {
+        "data": [serialize(r) for r in rows] if serialize else rows,
+        "next_cursor": next_cursor,
+        "has_more": has_more,
+        "current_page": page if legacy else None,
+    }
+    if include_total:
+        total_items, estimated = count_rows(db, model)
+        result.update({
+            "total_items": total_items,
+            "total_pages": ceil(total_items / limit),
+            "total_is_estimate": estimated,
+        })
+    return result
@@ -1,12 +1,14 @@
 # backend/dependencies/auth.py
 # Módulo de dependencias de autenticación y contexto de usuario
-from models.coupon_type import CouponType
 from fastapi import Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from core.database import get_db
 from models.user import User
 from models.guests import GuestsSession
-from models.token import RevokedToken
+from services.revocation_service import revocation_index
+from services.activity_service import track_session_activity, track_user_activity
+from services.credits_service import renew_credits_if_due
+from services.reference_cache import coupon_type_cache
 from core.security import decode_token
 from core.logging import configure_logging
 from services.coupon_service import create_coupon
@@ -49,7 +51,7 @@ async def get_user_context(request: Request, response: Response, db: Session = D
     try:
         if token:
             # Lógica para usuarios registrados (sin cambios)
-            if db.query(RevokedToken).filter(RevokedToken.token == token).first():
+            if revocation_index.is_revoked(db, token):
                 logger.warning(f"Intento de uso de token revocado desde IP {client_ip}")
                 raise HTTPException(status_code=401, detail="Token revocado")
             payload = decode_token(token)
@@ -67,11 +69,10 @@ async def get_user_context(request: Request, response: Response, db: Session = D
                 logger.warning(f"Token expirado manualmente para usuario ID {user.id} desde IP {client_ip}")
                 raise HTTPException(status_code=401, detail="Token no válido")
             
-            user.last_ip = client_ip
-            user.last_login = datetime.utcnow()
-            db.commit()
+            renew_credits_if_due(db, user)
+            track_user_activity(user.id, client_ip)
             logger.info(f"Usuario registrado ID {user.id} autenticado desde IP {client_ip}")
-            return UserContext(
+            context = UserContext(
                 user_type="registered",
                 user_id=str(user.id),
                 email=user.email,
@@ -80,6 +81,8 @@ async def get_user_context(request: Request, response: Response, db: Session = D
                 subscription=user.subscription.value,
                 rol=user.rol
             )
+            request.state.user_context = context  # Para el middleware de logs
+            return context
 
         if not session_id:
             logger.info("No hay session_id en header, creando nueva sesión anónima")
@@ -97,7 +100,7 @@ async def get_user_context(request: Request, response: Response, db: Session = D
             db.commit()
 
             # Crear cupón de bienvenida
-            coupon_type = db.query(CouponType).filter(CouponType.name == "Bienvenida").first()
+            coupon_type = coupon_type_cache.get_by_name(db, "Bienvenida")
             if not coupon_type:
                 logger.error("Tipo de cupón 'Bienvenida' no encontrado")
                 raise HTTPException(status_code=500, detail="Tipo de cupón 'Bienvenida' no encontrado")
@@ -121,7 +124,7 @@ async def get_user_context(request: Request, response: Response, db: Session = D
 
         
             logger.info(f"Nueva sesión anónima creada ID {session_id} con username {username} desde IP {client_ip}")
-            return UserContext(
+            context = UserContext(
                 user_type="anonymous",
                 user_id=session_id,
                 email="anonymous@example.com",
@@ -131,6 +134,8 @@ async def get_user_context(request: Request, response: Response, db: Session = D
                 rol="anonymous",
                 session_id=session_id
             )
+            request.state.user_context = context  # Para el middleware de logs
+            return context
         else:
             logger.info(f"Buscando sesión anónima con ID {session_id} desde header")
             session = db.query(GuestsSession).filter(GuestsSession.id == session_id).first()
@@ -138,11 +143,9 @@ async def get_user_context(request: Request, response: Response, db: Session = D
                 logger.warning(f"Sesión anónima inválida ID {session_id} desde IP {client_ip}")
                 raise HTTPException(status_code=400, detail="Sesión anónima inválida")
             
-            session.last_ip = client_ip
-            session.ultima_actividad = datetime.utcnow()
-            db.commit()
+            track_session_activity(session.id, client_ip)
             logger.info(f"Sesión anónima ID {session_id} actualizada desde IP {client_ip}")
-            return UserContext(
+            context = UserContext(
                 user_type="anonymous",
                 user_id=session.id,
                 email="anonymous@example.com",
@@ -152,6 +155,8 @@ async def get_user_context(request: Request, response: Response, db: Session = D
                 rol="anonymous",
                 session_id=session_id
             )
+            request.state.user_context = context  # Para el middleware de logs
+            return context
 
         logger.error(f"No autorizado: sin token ni sesión válida desde IP {client_ip}")
         raise HTTPException(status_code=401, detail="No autorizado")
@@ -14,11 +14,15 @@ from models.site_settings import SiteSettings
 from models.user import User, subscriptionEnum
 from models.allowed_origin import AllowedOrigin
 from models.credit_transaction import CreditTransaction
-from models.error_log import ErrorLog
+from models.error_log import ErrorLog, ErrorGroup
 from models.integration import Integration
+from models.webhook_delivery import WebhookDelivery
+from models.kpi_rollup import KpiDailyRollup
 from models.log import APILog
 from models.payment_method import PaymentMethod
-from models.gamification import EventType, Badge, GamificationEvent, UserGamification
+from models.gamification import (EventType, Badge, GamificationEvent, UserGamification, GamificationHourlyCount,
+                                 GamificationEventSummary, GamificationDeadEvent)
+from models.leaderboard import LeaderboardEntry
 from models.guests import GuestsSession
 from models.token import RevokedToken, PasswordResetToken
 from models.coupon import Coupon
@@ -21,15 +21,19 @@ from schemas.gamification import UserGamificationResponse
 from ini_db import init_db, init_settings_and_users
 from dependencies.auth import UserContext, get_user_context
 from dependencies.credits import check_credits
-from services.gamification_service import get_user_gamification, register_event
+from services.gamification_service import ensure_leaderboard, gamification_writer, get_user_gamification, register_event
 from services.integration_service import trigger_webhook
 from services.settings_service import get_setting
 from services.origin_service import get_allowed_origins
-from services.credits_service import reset_credits
+from services.credits_service import ledger_writer
+from services.revocation_service import revocation_index
+from services.activity_service import activity_tracker
+from services.webhook_dispatcher import webhook_dispatcher
 from core.database import get_db
 from core.logging import configure_logging
 from core.config import settings
-from models.error_log import ErrorLog
+from services.log_service import api_log_writer, error_log_writer, record_error
+from middleware.logging import LoggingMiddleware
 from sqlalchemy.orm import Session
 
 app = FastAPI(
@@ -66,7 +70,7 @@ app.add_middleware(
 #configure_cors()
 
 logger = configure_logging()
-# app.add_middleware(LoggingMiddleware)
+app.add_middleware(LoggingMiddleware)
 
 # Middleware para confiar en el proxy
 # app.add_middleware(TrustedHostMiddleware, allowed_hosts=["*"])
@@ -102,18 +106,34 @@ db = next(get_db())
 async def startup_event():
     init_db()  # Crea las tablas si no existen
     init_settings_and_users()  # Pobla con datos iniciales si es necesario
+    activity_tracker.start()
+    if settings.CREDIT_LEDGER_MODE == "batched":
+        ledger_writer.start()
+    webhook_dispatcher.start()
+    error_log_writer.start()
+    api_log_writer.start()
+    gamification_writer.start()
     
     try:
-        admin_id = 1
         logger.info(f"Iniciando {settings.PROJECT_NAME} en entorno {settings.ENVIRONMENT}")
-        logger.info("Ejecutando renovación de créditos automática al iniciar")
-        reset_credits(db, admin_id)
+        revocation_index.rebuild(db)
+        ensure_leaderboard(db)
     except HTTPException as e:
         logger.error(f"Error HTTP en startup: {e.detail}")
     except Exception as e:
         logger.error(f"Error inesperado en startup: {str(e)}")
     finally:
         db.close()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Volcar la escritura diferida pendiente antes de salir
+    await webhook_dispatcher.stop()
+    activity_tracker.stop()
+    ledger_writer.stop()
+    error_log_writer.stop()
+    api_log_writer.stop()
+    gamification_writer.stop()
         
 #rate_limit_auth = get_setting(db, "rate_limit_auth") or {"times": 20, "seconds": 60}
 #rate_limit_api = get_setting(db, "rate_limit_api") or {"times": 100, "seconds": 60}
@@ -143,22 +163,22 @@ app.include_router(marketplace.router, prefix="/v1/marketplace", tags=["Marketpl
 
 
 
+def route_template(request: Request) -> str:
+    # Plantilla de la ruta (/v1/users/{user_id}) para agrupar errores; sin ruta casada, un único grupo
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or "<sin ruta>"
+
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException) -> JSONResponse:
-    db = next(get_db())
-    try:
-        logger.error(f"HTTP Error {exc.status_code} en {request.method} {request.url}: {exc.detail}")
-        error_log = ErrorLog(
-            error_code=exc.status_code,
-            message=exc.detail,
-            url=str(request.url),
-            method=request.method,
-            ip_address=request.client.host
-        )
-        db.add(error_log)
-        db.commit()
-    finally:
-        db.close()
+    logger.error(f"HTTP Error {exc.status_code} en {request.method} {request.url}: {exc.detail}")
+    record_error(
+        error_code=exc.status_code,
+        message=exc.detail,
+        url=str(request.url),
+        method=request.method,
+        ip_address=request.client.host if request.client else None,
+        route=route_template(request)
+    )
     return JSONResponse(
         status_code=exc.status_code,
         content={"error": {"code": exc.status_code, "message": exc.detail}}
@@ -166,21 +186,16 @@ async def http_exception_handler(request: Request, exc: HTTPException) -> JSONRe
 
 @app.exception_handler(Exception)
 async def generic_exception_handler(request: Request, exc: Exception) -> JSONResponse:
-    db = next(get_db())
-    try:
-        logger.critical(f"Error inesperado en {request.method} {request.url}: {str(exc)}")
-        error_log = ErrorLog(
-            error_code=500,
-            message="Error interno del servidor",
-            details=str(exc),
-            url=str(request.url),
-            method=request.method,
-            ip_address=request.client.host
-        )
-        db.add(error_log)
-        db.commit()
-    finally:
-        db.close()
+    logger.critical(f"Error inesperado en {request.method} {request.url}: {str(exc)}")
+    record_error(
+        error_code=500,
+        message="Error interno del servidor",
+        details=str(exc),
+        url=str(request.url),
+        method=request.method,
+        ip_address=request.client.host if request.client else None,
+        route=route_template(request)
+    )
     return JSONResponse(
         status_code=500,
         content={"error": {"code": 500, "message": "Error interno del servidor"}}
@@ -1,40 +1,69 @@
 # backend/middleware/logging.py
-# Middleware para registrar logs de peticiones y respuestas
-from fastapi import Request, Response
-from sqlalchemy.orm import Session
-from core.database import get_db
-from models.log import APILog
-# from core.logging import logger
-import json
-from starlette.middleware.base import BaseHTTPMiddleware
-from typing import Callable
-
-# Limpieza: todos los imports son usados en este archivo.
-
-class LoggingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        db = next(get_db())
-        request_data = await request.body()
-        response = await call_next(request)
-        
-        user_id = None
-        if "Authorization" in request.headers:
-            from dependencies.auth import get_user_context
-            try:
-                user = await get_user_context(request.headers["Authorization"].replace("Bearer ", ""))
-                user_id = int(user.user_id)
-            except:
-                pass
-
-        log_entry = APILog(
-            user_id=user_id,
-            endpoint=str(request.url.path),
-            method=request.method,
-            status_code=response.status_code,
-            request_data=request_data.decode() if request_data else None,
-            response_data=response.body.decode() if response.body else None
-        )
-        db.add(log_entry)
-        db.commit()
-        # logger.info(f"{request.method} {request.url.path} - Status: {response.status_code}")
-        return response
\ No newline at end of file
+# Middleware ASGI para registrar peticiones en api_logs con muestreo y escritura en lotes
+import random
+import time
+from datetime import datetime
+from core.config import settings
+from services.log_service import api_log_writer
+
+
+def should_log(route: str | None, status_code: int) -> bool:
+    rate = settings.API_LOG_ROUTE_SAMPLE_RATES.get(route)
+    if rate is None:
+        rate = settings.API_LOG_ERROR_SAMPLE_RATE if status_code >= 400 else settings.API_LOG_SAMPLE_RATE
+    return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
+class LoggingMiddleware:
+    """
+    Middleware ASGI puro: no bufferiza cuerpos (salvo la captura opcional y truncada del de la
+    petición), mide estado, latencia y tamaño de la respuesta y toma el usuario del UserContext que
+    get_user_context deja en request.state, sin volver a decodificar el token. Las filas se
+    encolan en api_log_writer y se insertan en lotes.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.API_LOG_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+        response_size = 0
+        captured = bytearray()
+
+        async def receive_wrapper():
+            message = await receive()
+            if message["type"] == "http.request" and len(captured) < settings.API_LOG_BODY_LIMIT:
+                captured.extend(message.get("body", b"")[:settings.API_LOG_BODY_LIMIT - len(captured)])
+            return message
+
+        async def send_wrapper(message):
+            nonlocal status_code, response_size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper if settings.API_LOG_CAPTURE_BODY else receive, send_wrapper)
+        finally:
+            route = getattr(scope.get("route"), "path", None)
+            if should_log(route, status_code):
+                user = scope.get("state", {}).get("user_context")
+                api_log_writer.submit({
+                    "user_id": int(user.user_id) if user and user.user_type == "registered" else None,
+                    "endpoint": scope["path"][:255],
+                    "route": route,
+                    "method": scope["method"],
+                    "status_code": status_code,
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+                    "response_size": response_size,
+                    "request_data": captured.decode(errors="replace") if captured else None,
+                    "response_data": None,
+                    "timestamp": datetime.utcnow(),
+                })
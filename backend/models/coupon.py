@@ -16,7 +16,7 @@ class Coupon(Base):
     name = Column(String(100), nullable=False)
     description = Column(String(255), nullable=True)
     unique_identifier = Column(String(50), unique=True, nullable=False)
-    issued_at = Column(DateTime, default=datetime.utcnow)
+    issued_at = Column(DateTime, default=datetime.utcnow, index=True)
     expires_at = Column(DateTime, nullable=True)
     redeemed_at = Column(DateTime, nullable=True)
     active = Column(Boolean, default=True)
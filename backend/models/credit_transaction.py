@@ -20,7 +20,7 @@ class CreditTransaction(Base):
     payment_amount = Column(Float, nullable=True)
     payment_method = Column(String(50), nullable=True)
     payment_status = Column(String(20), default="pending")
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(DateTime, default=datetime.utcnow, index=True)
 
     # Restricción para asegurar que solo uno de user_id o session_id esté presente
     __table_args__ = (CheckConstraint(
@@ -22,4 +22,19 @@ class ErrorLog(Base):
     url = Column(String(255), nullable=True)
     method = Column(String(10), nullable=True)
     ip_address = Column(String(45), nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+class ErrorGroup(Base):
+    """Errores agregados por huella (código + plantilla de ruta + mensaje)."""
+    __tablename__ = "error_groups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    fingerprint = Column(String(40), unique=True, nullable=False)  # sha1 hex
+    error_code = Column(Integer, nullable=False)
+    route = Column(String(255), nullable=True)  # Plantilla de ruta, p.ej. /v1/users/{user_id}
+    message = Column(String(255), nullable=False)
+    count = Column(Integer, default=0, nullable=False)
+    first_seen = Column(DateTime, default=datetime.utcnow)
+    last_seen = Column(DateTime, default=datetime.utcnow, index=True)
+    samples = Column(Text, nullable=True)  # JSON: reservorio de ocurrencias de ejemplo
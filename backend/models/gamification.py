@@ -1,7 +1,7 @@
 # backend/models/gamification.py
 # Modelo de gamificación: eventos, badges, puntos, ranking
 
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Column, Date, Index, Integer, String, ForeignKey, DateTime, UniqueConstraint
 from sqlalchemy.orm import relationship
 from core.database import Base
 from datetime import datetime
@@ -42,7 +42,8 @@ class GamificationEvent(Base):
     event_type_id = Column(Integer, ForeignKey("event_types.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("usuarios.id"), nullable=True)
     session_id = Column(String(36), ForeignKey("sesiones_anonimas.id"), nullable=True)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(DateTime, default=datetime.utcnow, index=True)
+    idempotency_key = Column(String(64), unique=True, nullable=True)  # Descarta reintentos del mismo evento
     
     event_type = relationship("EventType", back_populates="gamification_events")
     user = relationship("User", back_populates="gamification_events")
@@ -57,8 +58,64 @@ class UserGamification(Base):
     event_type_id = Column(Integer, ForeignKey("event_types.id"), nullable=False)
     points = Column(Integer, default=0)
     badge_id = Column(Integer, ForeignKey("badges.id"), nullable=True)
+
+    # Un único registro de progreso por usuario (o sesión) y tipo de evento
+    __table_args__ = (
+        UniqueConstraint("user_id", "event_type_id", name="uq_user_gamification_user"),
+        UniqueConstraint("session_id", "event_type_id", name="uq_user_gamification_session"),
+        Index("ix_user_gamification_type_points", "event_type_id", "points"),
+    )
     
     event_type = relationship("EventType", back_populates="user_gamification")
     badge = relationship("Badge", back_populates="user_gamification")
     user = relationship("User", back_populates="gamification")
-    session = relationship("GuestsSession", back_populates="gamification")
\ No newline at end of file
+    session = relationship("GuestsSession", back_populates="gamification")
+
+class GamificationDeadEvent(Base):
+    """Eventos que el volcado en segundo plano no pudo escribir tras varios intentos."""
+    __tablename__ = "gamification_dead_events"
+
+    # Sin claves foráneas: el motivo del fallo suele ser precisamente una referencia rota
+    id = Column(Integer, primary_key=True, index=True)
+    event_type_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, nullable=True)
+    session_id = Column(String(36), nullable=True)
+    timestamp = Column(DateTime, nullable=False)
+    idempotency_key = Column(String(64), nullable=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(String(255), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class GamificationHourlyCount(Base):
+    """Contadores por hora de eventos y puntos para los rankings por ventana de tiempo."""
+    __tablename__ = "gamification_hourly_counts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    bucket_start = Column(DateTime, nullable=False)  # Inicio de la hora (UTC, minutos a cero)
+    event_type_id = Column(Integer, ForeignKey("event_types.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("usuarios.id", ondelete="CASCADE"), nullable=True)
+    session_id = Column(String(36), ForeignKey("sesiones_anonimas.id", ondelete="CASCADE"), nullable=True)
+    events = Column(Integer, default=0, nullable=False)
+    points = Column(Integer, default=0, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("bucket_start", "event_type_id", "user_id", name="uq_hourly_count_user"),
+        UniqueConstraint("bucket_start", "event_type_id", "session_id", name="uq_hourly_count_session"),
+        Index("ix_hourly_count_type_bucket", "event_type_id", "bucket_start"),
+    )
+
+class GamificationEventSummary(Base):
+    """Eventos compactados: recuento diario por usuario o sesión y tipo de evento."""
+    __tablename__ = "gamification_event_summaries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False)
+    event_type_id = Column(Integer, ForeignKey("event_types.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("usuarios.id", ondelete="CASCADE"), nullable=True, index=True)
+    session_id = Column(String(36), ForeignKey("sesiones_anonimas.id", ondelete="CASCADE"), nullable=True, index=True)
+    events = Column(Integer, default=0, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("day", "event_type_id", "user_id", name="uq_event_summary_user"),
+        UniqueConstraint("day", "event_type_id", "session_id", name="uq_event_summary_session"),
+    )
@@ -15,4 +15,5 @@ class Integration(Base):
     event_type = Column(String(50), nullable=False)  # "credit_usage", "user_login", "payment_added"
     active = Column(Boolean, default=False)  # Estado de la integración
     created_at = Column(DateTime, default=datetime.utcnow)
-    last_triggered = Column(DateTime, nullable=True)  # Última vez que se disparó
\ No newline at end of file
+    last_triggered = Column(DateTime, nullable=True)  # Última vez que se disparó
+    coalesce_window = Column(Integer, default=0)  # Segundos para agrupar credit_usage por usuario (0 = sin agrupar)
\ No newline at end of file
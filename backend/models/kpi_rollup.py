@@ -0,0 +1,27 @@
+# backend/models/kpi_rollup.py
+# Agregados diarios para el panel de KPIs (mantenidos por services/kpi_service.refresh_kpi_rollups)
+
+from sqlalchemy import Column, Integer, Date, DateTime, Float
+from models.user import Base
+from datetime import datetime
+
+class KpiDailyRollup(Base):
+    __tablename__ = "kpi_daily_rollups"
+
+    day = Column(Date, primary_key=True)
+    # Actividad del día
+    new_users = Column(Integer, default=0)
+    active_users = Column(Integer, default=0)  # Usuarios con acceso en el día (no decrece una vez cerrado)
+    conversions = Column(Integer, default=0)  # Altas del día con suscripción de pago
+    payments = Column(Integer, default=0)
+    revenue = Column(Float, default=0.0)
+    credits_used = Column(Integer, default=0)
+    # Foto del estado de usuarios en el momento del cálculo
+    total_users = Column(Integer, default=0)
+    paying_users = Column(Integer, default=0)
+    churned_users = Column(Integer, default=0)
+    total_credits = Column(Integer, default=0)
+    dau = Column(Integer, default=0)
+    wau = Column(Integer, default=0)
+    mau = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,19 @@
+# backend/models/leaderboard.py
+# Ranking global materializado: puntos totales y badges por usuario o sesión
+
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from models.user import Base
+from datetime import datetime
+
+class LeaderboardEntry(Base):
+    __tablename__ = "leaderboard"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("usuarios.id", ondelete="CASCADE"), nullable=True, unique=True)
+    session_id = Column(String(36), ForeignKey("sesiones_anonimas.id", ondelete="CASCADE"), nullable=True, unique=True)
+    points = Column(Integer, default=0, nullable=False)
+    badges_count = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    # Top-K, páginas y "mi posición" recorren este índice hacia atrás: (points DESC, id DESC)
+    __table_args__ = (Index("ix_leaderboard_points_id", "points", "id"),)
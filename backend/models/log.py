@@ -1,7 +1,7 @@
 # backend/models/log.py
 # Modelo de logs de actividad de la API
 
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Float
 from models.user import Base
 from datetime import datetime
 
@@ -15,4 +15,7 @@ class APILog(Base):
     status_code = Column(Integer, nullable=False)
     request_data = Column(Text, nullable=True)  # JSON serializado
     response_data = Column(Text, nullable=True)  # JSON serializado
-    timestamp = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    timestamp = Column(DateTime, default=datetime.utcnow, index=True)
+    route = Column(String(255), nullable=True)  # Plantilla de ruta, p.ej. /v1/users/{user_id}
+    duration_ms = Column(Float, nullable=True)  # Latencia de la petición
+    response_size = Column(Integer, nullable=True)  # Bytes del cuerpo de la respuesta
\ No newline at end of file
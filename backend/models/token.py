@@ -10,7 +10,7 @@ class RevokedToken(Base):
     __tablename__ = "revoked_tokens"
     
     token = Column(String(500), primary_key=True)  # Token JWT completo
-    revoked_at = Column(DateTime, default=datetime.utcnow)  # Fecha de revocación
+    revoked_at = Column(DateTime, default=datetime.utcnow, index=True)  # Fecha de revocación
     user_id = Column(Integer, nullable=True)  # ID del usuario asociado (opcional)
     
 class PasswordResetToken(Base):
@@ -0,0 +1,22 @@
+# backend/models/webhook_delivery.py
+# Modelo de la bandeja de salida (outbox) de webhooks pendientes de entrega
+
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from models.user import Base
+from datetime import datetime
+
+class WebhookDelivery(Base):
+    __tablename__ = "webhook_deliveries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    integration_id = Column(Integer, ForeignKey("integrations.id", ondelete="CASCADE"), nullable=False, index=True)
+    event_type = Column(String(50), nullable=False)
+    payload = Column(Text, nullable=False)  # JSON serializado
+    status = Column(String(20), default="pending", index=True)  # "pending", "delivering", "delivered", "dead"
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, index=True)  # En "delivering": fin del bloqueo
+    last_error = Column(String(255), nullable=True)
+    coalesce_key = Column(String(100), nullable=True, index=True)  # "<user_type>:<user_id>" si se agrupa
+    coalesced_count = Column(Integer, default=1)  # Eventos agrupados en esta entrega
+    created_at = Column(DateTime, default=datetime.utcnow)
+    delivered_at = Column(DateTime, nullable=True)
@@ -12,6 +12,9 @@ class APILogBase(BaseModel):
     request_data: str | None
     response_data: str | None
     timestamp: datetime
+    route: str | None = None
+    duration_ms: float | None = None
+    response_size: int | None = None
 
 class APILogResponse(APILogBase):
     id: int
@@ -19,4 +19,19 @@ class ErrorLogResponse(ErrorLogBase):
     id: int
 
     class Config:
-        from_attributes = True  # Reemplaza orm_mode = True
\ No newline at end of file
+        from_attributes = True  # Reemplaza orm_mode = True
+
+
+class ErrorGroupResponse(BaseModel):
+    id: int
+    fingerprint: str
+    error_code: int
+    route: str | None
+    message: str
+    count: int
+    first_seen: datetime
+    last_seen: datetime
+    samples: list[dict] = []
+
+    class Config:
+        from_attributes = True
@@ -1,7 +1,7 @@
 # backend/schemas/gamification.py
 # Esquemas Pydantic para gamificación y ranking
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 from typing import Optional, List
 
@@ -41,11 +41,25 @@ class GamificationEventBase(BaseModel):
 class GamificationEventCreate(GamificationEventBase):
     pass
 
+class GamificationEventBatchItem(GamificationEventBase):
+    # Sólo administradores pueden registrar eventos de otros usuarios o sesiones
+    user_id: Optional[int] = None
+    session_id: Optional[str] = None
+    timestamp: Optional[datetime] = None
+    idempotency_key: Optional[str] = Field(None, max_length=64)
+
+class GamificationEventBatch(BaseModel):
+    events: List[GamificationEventBatchItem]
+
 class GamificationEventResponse(GamificationEventBase):
-    id: int
+    id: Optional[int]  # None en los resúmenes de eventos compactados
     user_id: Optional[int]
     session_id: Optional[str]
     timestamp: datetime
+    # Los eventos compactados se devuelven agrupados por día y tipo: count eventos en ese día
+    count: int = 1
+    compacted: bool = False
+    summary_id: Optional[int] = None
 
     class Config:
         from_attributes = True
@@ -9,6 +9,7 @@ class IntegrationBase(BaseModel):
     name: str
     webhook_url: str
     event_type: str
+    coalesce_window: int = 0
 
 class IntegrationCreate(IntegrationBase):
     pass
@@ -21,4 +22,21 @@ class IntegrationResponse(IntegrationBase):
     last_triggered: Optional[datetime] = None
 
     class Config:
-        from_attributes = True  # Para mapear desde objetos SQLAlchemy
\ No newline at end of file
+        from_attributes = True  # Para mapear desde objetos SQLAlchemy
+
+class WebhookDeliveryResponse(BaseModel):
+    id: int
+    integration_id: int
+    event_type: str
+    payload: str
+    status: str
+    attempts: int
+    next_attempt_at: Optional[datetime] = None
+    last_error: Optional[str] = None
+    coalesce_key: Optional[str] = None
+    coalesced_count: int = 1
+    created_at: datetime
+    delivered_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,65 @@
+# backend/services/activity_service.py
+# Registro diferido de actividad (última IP y último acceso) de usuarios y sesiones anónimas
+from datetime import datetime
+from sqlalchemy import bindparam, update
+from core.background import BatchWriter
+from core.config import settings
+from core.database import SessionLocal
+from core.logging import configure_logging
+from models.user import User
+from models.guests import GuestsSession
+
+logger = configure_logging()
+
+
+def _flush_activity(batch: list) -> None:
+    """
+    Aplica un lote de actividad con un UPDATE por primary key (executemany) por tabla.
+    Es un UPDATE de Core, sin comprobación de filas afectadas: si un usuario o una sesión se
+    ha borrado entretanto, su fila simplemente no se actualiza y el resto del lote se aplica.
+    """
+    users = [
+        {"b_id": item["id"], "last_ip": item["ip"], "last_login": item["seen_at"]}
+        for item in batch if item["kind"] == "registered"
+    ]
+    sessions = [
+        {"b_id": item["id"], "last_ip": item["ip"], "ultima_actividad": item["seen_at"]}
+        for item in batch if item["kind"] == "anonymous"
+    ]
+    db = SessionLocal()
+    try:
+        if users:
+            # Las claves distintas de b_id pasan a ser el SET del UPDATE
+            db.execute(update(User.__table__).where(User.__table__.c.id == bindparam("b_id")), users)
+        if sessions:
+            db.execute(update(GuestsSession.__table__).where(GuestsSession.__table__.c.id == bindparam("b_id")),
+                       sessions)
+        db.commit()
+        logger.debug(f"Actividad volcada: {len(users)} usuarios, {len(sessions)} sesiones")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+activity_tracker = BatchWriter(
+    "activity",
+    _flush_activity,
+    max_batch=settings.ACTIVITY_FLUSH_SIZE,
+    flush_interval=settings.ACTIVITY_FLUSH_INTERVAL,
+)
+
+
+def track_user_activity(user_id: int, ip: str) -> None:
+    activity_tracker.submit(
+        {"kind": "registered", "id": user_id, "ip": ip, "seen_at": datetime.utcnow()},
+        key=("registered", user_id),
+    )
+
+
+def track_session_activity(session_id: str, ip: str) -> None:
+    activity_tracker.submit(
+        {"kind": "anonymous", "id": session_id, "ip": ip, "seen_at": datetime.utcnow()},
+        key=("anonymous", session_id),
+    )
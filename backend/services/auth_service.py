@@ -11,6 +11,7 @@ from core.security import (
 )
 from core.logging import configure_logging
 from core.security import google_client, meta_client
+from services.revocation_service import revocation_index
 
 from datetime import datetime, timedelta
 from fastapi import HTTPException
@@ -120,7 +121,7 @@ def refresh_access_token(db: Session, refresh_token: str):
                 raise HTTPException(status_code=401, detail="Token inválido")
 
             # 2. Verificar si el token fue revocado DESPUÉS de decodificar
-            if db.query(RevokedToken).filter(RevokedToken.token == refresh_token).first():
+            if revocation_index.is_revoked(db, refresh_token):
                 logger.warning("Refresh token ya revocado")
                 raise HTTPException(status_code=401, detail="Refresh token revocado")
 
@@ -145,6 +146,7 @@ def refresh_access_token(db: Session, refresh_token: str):
             new_refresh_token = create_refresh_token({"sub": str(user.id), "type": "registered"})
             
             db.commit()  # Hacer commit después de crear los nuevos tokens
+            revocation_index.add(refresh_token)
             
             return {
                 "access_token": new_access_token,
@@ -169,6 +171,7 @@ def logout_user(db: Session, token: str): #_estimate ?
     revoked_token = RevokedToken(token=token)
     db.add(revoked_token)
     db.commit()
+    revocation_index.add(token)
     return {"message": "Sesión cerrada"}
 
 def request_password_reset(db: Session, email: str):
@@ -2,8 +2,8 @@
 # Servicio para gestión y canje de cupones
 
 from typing import Optional
-from sqlalchemy import desc
 from sqlalchemy.orm import Session
+from core.pagination import paginate
 from models.coupon import Coupon
 from models.user import User
 from models.guests import GuestsSession
@@ -34,43 +34,26 @@ def create_test_coupon(db: Session, coupon_type_id: int, admin_user_id: int):
     db.refresh(new_coupon)
     return new_coupon
 
-def get_coupon_activity(db: Session, page: int = 1, limit: int = 10) -> dict:
+def get_coupon_activity(db: Session, page: Optional[int] = None, limit: int = 10, cursor: Optional[str] = None,
+                        include_total: bool = True) -> dict:
     """
-    Obtiene la actividad de cupones con paginación.
+    Obtiene la actividad de cupones con paginación (por cursor sobre (issued_at, id) o por página).
     """
-    offset = (page - 1) * limit
-    total_items = db.query(Coupon).count()
-    total_pages = (total_items + limit - 1) // limit
-
-    coupons = (
-        db.query(Coupon)
-        .order_by(desc(Coupon.issued_at))
-        .offset(offset)
-        .limit(limit)
-        .all()
-    )
-
     # Serialización manual para coincidir con el frontend
-    coupons_data = [
-        {
+    def serialize(coupon: Coupon) -> dict:
+        return {
             "id": coupon.id,
             "coupon_type": coupon.coupon_type_id,
             "unique_identifier": coupon.unique_identifier,
             "user_id": coupon.user_id,
             "session_id": coupon.session_id,
             "status": coupon.status,
-            "issued_at": coupon.issued_at.isoformat(),
+            "issued_at": coupon.issued_at.isoformat() if coupon.issued_at else None,
             "redeemed_at": coupon.redeemed_at.isoformat() if coupon.redeemed_at else None,
         }
-        for coupon in coupons
-    ]
 
-    return {
-        "data": coupons_data,
-        "total_items": total_items,
-        "total_pages": total_pages,
-        "current_page": page,
-    }
+    return paginate(db, db.query(Coupon), Coupon, limit, page=page, cursor=cursor,
+                    order_column=Coupon.issued_at, include_total=include_total, serialize=serialize)
 
 def create_coupon(db: Session, coupon_data: CouponCreate, user_id: Optional[int] = None, session_id: Optional[str] = None) -> Coupon:
     unique_identifier = str(uuid.uuid4())
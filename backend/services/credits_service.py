@@ -1,52 +1,296 @@
 # backend/services/credits_service.py
 # Servicio para gestión y deducción de créditos
 # Permitir la renovación automática o manual de créditos para usuarios registrados y anónimos.
+import glob
+import json
+import os
+import time
+from sqlalchemy import and_, case, func, insert, literal, or_, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from models.user import User, subscriptionEnum
+from models.guests import GuestsSession
 from models.credit_transaction import CreditTransaction
 from datetime import datetime, timedelta
 from fastapi import HTTPException, status
+from core.background import BatchWriter
+from core.config import settings
+from core.database import SessionLocal
 from core.logging import configure_logging
+from services.integration_service import enqueue_webhook
+from services.settings_service import get_setting
 
 logger = configure_logging()
 
-def reset_credits(db: Session, freemium_credits: int = 100, premium_credits: int = 1000, reset_interval: int = 30):
+def _insert_ledger(rows: list) -> None:
+    db = SessionLocal()
     try:
-        users = db.query(User).filter(User.activo == True).all()
-        for user in users:
-            if not user.renewal or user.renewal < datetime.utcnow() - timedelta(days=reset_interval):
-                user.credits = freemium_credits if user.subscription == subscriptionEnum.FREEMIUM else premium_credits
-                user.renewal = datetime.utcnow()
-                db.add(CreditTransaction(
-                    user_id=user.id,
-                    user_type='registered',  # Corrección clave
-                    amount=user.credits,
-                    transaction_type="reset"
-                ))
+        db.execute(insert(CreditTransaction), rows)  # executemany
         db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def _spill_ledger(rows: list, prefix: str = "ledger") -> str:
+    """Guarda en disco (NDJSON) filas del ledger que no se han podido insertar; nunca se descartan."""
+    os.makedirs(settings.CREDIT_LEDGER_SPILL_DIR, exist_ok=True)
+    path = os.path.join(settings.CREDIT_LEDGER_SPILL_DIR, f"{prefix}-{time.time_ns()}.ndjson")
+    with open(path + ".tmp", "w", encoding="utf-8") as spill:
+        for row in rows:
+            spill.write(json.dumps({**row, "timestamp": row["timestamp"].isoformat()}) + "\n")
+    os.replace(path + ".tmp", path)  # El fichero sólo aparece completo
+    return path
+
+def _replay_spilled_ledger() -> None:
+    """Reinserta los lotes volcados a disco durante una caída de la base de datos (del más antiguo al más reciente)."""
+    for path in sorted(glob.glob(os.path.join(settings.CREDIT_LEDGER_SPILL_DIR, "ledger-*.ndjson"))):
+        # Renombrar reclama el fichero: otro worker que comparta el directorio no lo reinserta también
+        claimed = f"{path}.{os.getpid()}"
+        try:
+            os.rename(path, claimed)
+        except FileNotFoundError:
+            continue
+        with open(claimed, encoding="utf-8") as spill:
+            rows = [json.loads(line) for line in spill if line.strip()]
+        for row in rows:
+            row["timestamp"] = datetime.fromisoformat(row["timestamp"])
+        try:
+            _flush_ledger(rows, replaying=True)
+        except Exception:
+            os.rename(claimed, path)
+            raise
+        os.remove(claimed)
+        logger.info(f"Ledger: {len(rows)} transacciones recuperadas de {path}")
+
+def _flush_ledger(rows: list, replaying: bool = False) -> None:
+    """
+    Inserta un lote del ledger. Los saldos ya están confirmados, así que ninguna fila se pierde:
+    - error transitorio: reintentos con espera y, agotados, el lote se vuelca a disco y se
+      reinserta tras el siguiente volcado correcto;
+    - IntegrityError (p.ej. usuario borrado entretanto): se inserta fila a fila y las que sigan
+      fallando se apartan en un fichero rejected-*.ndjson para revisión manual.
+    """
+    for attempt in range(settings.CREDIT_LEDGER_FLUSH_RETRIES):
+        try:
+            _insert_ledger(rows)
+            break
+        except IntegrityError:
+            rejected = []
+            for row in rows:
+                try:
+                    _insert_ledger([row])
+                except IntegrityError:
+                    rejected.append(row)
+            if rejected:
+                path = _spill_ledger(rejected, prefix="rejected")
+                logger.error(f"Ledger: {len(rejected)} transacciones rechazadas por la base de datos, guardadas en {path}")
+            break
+        except Exception as e:
+            if attempt == settings.CREDIT_LEDGER_FLUSH_RETRIES - 1:
+                if replaying:
+                    raise  # El fichero original se conserva para el siguiente intento
+                path = _spill_ledger(rows)
+                logger.error(f"Ledger: lote de {len(rows)} transacciones no insertado ({str(e)}); guardado en {path}")
+                return
+            time.sleep(0.5 * 2 ** attempt)
+    if not replaying:
+        try:
+            _replay_spilled_ledger()
+        except Exception as e:
+            logger.error(f"Ledger: no se pudieron reinsertar los lotes guardados en disco: {str(e)}")
+
+# Escritor del ledger en modo "batched": sólo se arranca si CREDIT_LEDGER_MODE lo pide
+ledger_writer = BatchWriter(
+    "credit_ledger",
+    _flush_ledger,
+    max_batch=settings.CREDIT_LEDGER_BATCH_SIZE,
+    flush_interval=settings.CREDIT_LEDGER_MAX_LATENCY,
+)
+
+def ledger_is_batched() -> bool:
+    return settings.CREDIT_LEDGER_MODE == "batched" and ledger_writer.running
+
+def get_ledger_metrics() -> dict:
+    return {
+        "mode": "batched" if ledger_is_batched() else "sync",
+        "max_latency_seconds": ledger_writer.flush_interval,
+        "batch_size": ledger_writer.max_batch,
+        "pending": ledger_writer.pending(),
+        **ledger_writer.metrics,
+    }
+
+def reset_credits(db: Session, freemium_credits: int = 100, premium_credits: int = 1000, reset_interval: int = 30,
+                  chunk_size: int = None) -> dict:
+    """
+    Renueva en bloque los créditos de los usuarios activos cuya última renovación es anterior
+    a reset_interval días. La renovación normal ocurre de forma perezosa en renew_credits_if_due;
+    este barrido queda como tarea de administración para cuentas inactivas. Trabaja por rangos de primary key de chunk_size usuarios; cada rango
+    es una transacción con un INSERT ... SELECT para el ledger y un UPDATE por tier, sin cargar
+    objetos ORM. Devuelve el número de usuarios renovados y el tiempo empleado.
+    """
+    chunk_size = chunk_size or settings.CREDIT_RESET_CHUNK_SIZE
+    started = time.perf_counter()
+    now = datetime.utcnow()
+    cutoff = now - timedelta(days=reset_interval)
+    is_freemium = User.subscription == subscriptionEnum.FREEMIUM
+    not_freemium = or_(User.subscription != subscriptionEnum.FREEMIUM, User.subscription.is_(None))
+    users_reset = chunks = 0
+    try:
+        min_id, max_id = db.execute(select(func.min(User.id), func.max(User.id))).one()
+        if min_id is None:
+            return {"users_reset": 0, "chunks": 0, "elapsed_ms": 0.0}
+
+        for low in range(min_id, max_id + 1, chunk_size):
+            due = and_(
+                User.id >= low,
+                User.id < low + chunk_size,
+                User.activo == True,
+                or_(User.renewal.is_(None), User.renewal < cutoff),
+            )
+            # Primero el ledger: el SELECT aún ve a los usuarios pendientes de renovar
+            db.execute(insert(CreditTransaction).from_select(
+                ["user_id", "user_type", "amount", "transaction_type", "payment_status", "timestamp"],
+                select(
+                    User.id,
+                    literal("registered"),
+                    case((is_freemium, literal(freemium_credits)), else_=literal(premium_credits)),
+                    literal("reset"),
+                    literal("pending"),
+                    literal(now),
+                ).where(due),
+            ))
+            for tier_filter, credits in ((is_freemium, freemium_credits), (not_freemium, premium_credits)):
+                users_reset += db.execute(
+                    update(User).where(due, tier_filter).values(credits=credits, renewal=now)
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+            db.commit()
+            chunks += 1
+
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+        logger.info(f"Renovación de créditos: {users_reset} usuarios en {chunks} bloques ({elapsed_ms} ms)")
+        return {"users_reset": users_reset, "chunks": chunks, "elapsed_ms": elapsed_ms}
     except Exception as e:
+        db.rollback()
         logger.error(f"Error al reiniciar créditos: {str(e)}")
         raise HTTPException(status_code=500, detail="Error al reiniciar créditos")
 
-def deduct_credit(db: Session, user_id: int, amount: int = 1):
+def get_renewal_policy(db: Session) -> dict:
+    """Créditos por tier e intervalo de renovación configurados en site_settings."""
+    return {
+        "freemium_credits": int(get_setting(db, "freemium_credits") or 100),
+        "premium_credits": int(get_setting(db, "premium_credits") or 1000),
+        "reset_interval": int(get_setting(db, "credit_reset_interval") or 30),
+    }
+
+def renew_credits_if_due(db: Session, user: User) -> bool:
+    """
+    Renovación perezosa: si el periodo del usuario ha vencido, renueva sus créditos con un
+    UPDATE condicional sobre renewal, de modo que sólo una petición por periodo lo aplica
+    aunque lleguen varias a la vez. Devuelve True si esta llamada hizo la renovación.
+    """
+    policy = get_renewal_policy(db)
+    now = datetime.utcnow()
+    cutoff = now - timedelta(days=policy["reset_interval"])
+    if user.renewal and user.renewal >= cutoff:
+        return False
+
+    credits = policy["freemium_credits"] if user.subscription == subscriptionEnum.FREEMIUM else policy["premium_credits"]
     try:
-        user = db.query(User).filter(User.id == user_id).with_for_update().first()
-        if not user:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuario no encontrado")
-        if user.credits < amount:
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No te quedan suficientes créditos")
-        user.credits -= amount
+        renewed = db.execute(
+            update(User)
+            .where(User.id == user.id, User.activo == True,
+                   or_(User.renewal.is_(None), User.renewal < cutoff))
+            .values(credits=credits, renewal=now)
+        ).rowcount == 1
+        if not renewed:
+            db.rollback()
+            return False
         db.add(CreditTransaction(
-            user_id=user_id,
-            user_type='registered',  # Corrección clave
-            amount=-amount,
-            transaction_type="usage",
-            description="Consulta realizada"  # Opcional, para consistencia con los logs
+            user_id=user.id,
+            user_type="registered",
+            amount=credits,
+            transaction_type="reset",
+            timestamp=now
         ))
         db.commit()
-        return user.credits
+        logger.info(f"Créditos renovados para usuario ID {user.id}: {credits}")
+        return True
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error al renovar créditos para usuario {user.id}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error al renovar créditos")
+
+def charge_credits(db: Session, user_type: str, owner_id, amount: int = 1, description: str = None,
+                   notify: bool = True) -> int:
+    """
+    Descuenta créditos con un único UPDATE condicional
+    (credits = credits - :n WHERE id = :id AND credits >= :n) e inserta la CreditTransaction
+    en la misma transacción. Devuelve el saldo resultante.
+    Con notify, las entregas del webhook credit_usage se añaden a la outbox en esa misma
+    transacción: el cargo y su notificación se confirman (o se pierden) juntos.
+    Con CREDIT_LEDGER_MODE="batched" la CreditTransaction se encola en ledger_writer y se
+    inserta en lote como mucho CREDIT_LEDGER_MAX_LATENCY segundos después.
+    No hay lectura previa, así que cargos concurrentes sobre el mismo usuario no pierden
+    actualizaciones ni dejan saldos negativos.
+    """
+    payload_user_id = owner_id
+    if user_type == "registered":
+        model, owner_id = User, int(owner_id)
+        transaction = {"user_id": owner_id, "session_id": None, "user_type": "registered",
+                       "description": description or "Consulta realizada"}
+    else:
+        model = GuestsSession
+        transaction = {"user_id": None, "session_id": owner_id, "user_type": "anonymous",
+                       "description": description or "Consulta realizada por anónimo"}
+    transaction.update(amount=-amount, transaction_type="usage", payment_status="pending",
+                       timestamp=datetime.utcnow())
+
+    try:
+        stmt = (
+            update(model)
+            .where(model.id == owner_id, model.credits >= amount)
+            .values(credits=model.credits - amount)
+            .execution_options(synchronize_session=False)
+        )
+        if db.get_bind().dialect.update_returning:
+            new_balance = db.execute(stmt.returning(model.credits)).scalar()
+            charged = new_balance is not None
+        else:
+            charged = db.execute(stmt).rowcount == 1
+            # La fila ya está bloqueada por el UPDATE: esta lectura es consistente
+            new_balance = db.execute(select(model.credits).where(model.id == owner_id)).scalar() if charged else None
+
+        if not charged:
+            db.rollback()
+            if db.execute(select(model.id).where(model.id == owner_id)).first() is None:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                    detail="Usuario no encontrado" if user_type == "registered" else "Sesión no encontrada")
+            logger.warning(f"Usuario {user_type} ID {owner_id} sin créditos suficientes")
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No te quedan créditos disponibles.")
+
+        if notify:
+            enqueue_webhook(db, "credit_usage", {
+                "user_id": payload_user_id,
+                "user_type": user_type,
+                "credits_remaining": new_balance
+            })
+        if ledger_is_batched():
+            db.commit()
+            ledger_writer.submit(transaction)
+        else:
+            db.add(CreditTransaction(**transaction))
+            db.commit()
+        logger.debug(f"Créditos actualizados para {user_type} ID {owner_id}: {new_balance}")
+        return new_balance
     except HTTPException as e:
         raise e
     except Exception as e:
-        logger.error(f"Error al deducir créditos para usuario {user_id}: {str(e)}")
-        raise HTTPException(status_code=500, detail="Error al deducir créditos")
\ No newline at end of file
+        db.rollback()
+        logger.error(f"Error al deducir créditos para {user_type} ID {owner_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error al deducir créditos")
+
+def deduct_credit(db: Session, user_id: int, amount: int = 1):
+    return charge_credits(db, "registered", user_id, amount, notify=False)
@@ -0,0 +1,137 @@
+# backend/services/gamification_compaction.py
+# Compactación de eventos de gamificación antiguos en resúmenes diarios, con archivo NDJSON comprimido
+#
+# Tras la puntuación incremental sólo se necesitan agregados: los eventos anteriores al umbral se
+# resumen por (usuario o sesión, tipo de evento, día) en gamification_event_summaries y las filas
+# originales se archivan en ficheros NDJSON.gz (uno por día y ejecución) antes de borrarse.
+# Cada día se procesa en su propia transacción.
+import gzip
+import json
+import os
+import time
+from datetime import date, datetime, timedelta
+from typing import Optional
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+from core.config import settings
+from core.logging import configure_logging
+from models.gamification import GamificationEvent, GamificationEventSummary
+from services.gamification_service import increment_or_insert
+
+logger = configure_logging()
+
+_DELETE_CHUNK = 5000
+
+
+def _archive_path(day: date) -> str:
+    # Nombre único por ejecución: un día puede recompactarse si llegan eventos atrasados
+    return os.path.join(settings.GAMIFICATION_ARCHIVE_DIR,
+                        f"gamification_events-{day.isoformat()}-{time.time_ns()}.ndjson.gz")
+
+
+def _compact_day(db: Session, day: date) -> dict:
+    start = datetime.combine(day, datetime.min.time())
+    end = start + timedelta(days=1)
+    query = select(
+        GamificationEvent.id, GamificationEvent.event_type_id, GamificationEvent.user_id,
+        GamificationEvent.session_id, GamificationEvent.timestamp, GamificationEvent.idempotency_key
+    ).where(GamificationEvent.timestamp >= start, GamificationEvent.timestamp < end).order_by(GamificationEvent.id)
+
+    archive = None
+    archive_path = None
+    if settings.GAMIFICATION_ARCHIVE_DIR:
+        os.makedirs(settings.GAMIFICATION_ARCHIVE_DIR, exist_ok=True)
+        archive_path = _archive_path(day)
+        archive = gzip.open(archive_path, "wt", encoding="utf-8")
+
+    events = 0
+    last_id = None
+    groups: dict = {}
+    try:
+        for row in db.execute(query.execution_options(yield_per=10000)):
+            events += 1
+            last_id = row.id
+            key = (row.user_id, row.session_id, row.event_type_id)
+            groups[key] = groups.get(key, 0) + 1
+            if archive:
+                archive.write(json.dumps({
+                    "id": row.id,
+                    "event_type_id": row.event_type_id,
+                    "user_id": row.user_id,
+                    "session_id": row.session_id,
+                    "timestamp": row.timestamp.isoformat(),
+                    "idempotency_key": row.idempotency_key,
+                }) + "\n")
+        if archive:
+            archive.close()
+            archive = None
+        if not events:
+            if archive_path:
+                os.remove(archive_path)
+            return {"day": day.isoformat(), "events": 0, "summaries": 0}
+
+        for (user_id, session_id, event_type_id), count in groups.items():
+            increment_or_insert(
+                db, GamificationEventSummary,
+                (GamificationEventSummary.day == day,
+                 GamificationEventSummary.event_type_id == event_type_id,
+                 (GamificationEventSummary.user_id == user_id) if user_id is not None
+                 else (GamificationEventSummary.session_id == session_id)),
+                {"events": count},
+                {"day": day, "event_type_id": event_type_id, "user_id": user_id,
+                 "session_id": session_id if user_id is None else None, "events": count}
+            )
+        # Borrado por rango [start, end) en lotes dentro de la misma transacción; id <= last_id deja
+        # fuera los eventos atrasados que hayan llegado durante la lectura (se compactarán después)
+        in_range = (GamificationEvent.timestamp >= start, GamificationEvent.timestamp < end,
+                    GamificationEvent.id <= last_id)
+        deleted = 0
+        while True:
+            chunk = db.execute(
+                select(GamificationEvent.id).where(*in_range).order_by(GamificationEvent.id).limit(_DELETE_CHUNK)
+            ).scalars().all()
+            if not chunk:
+                break
+            db.execute(delete(GamificationEvent).where(*in_range, GamificationEvent.id <= chunk[-1]),
+                       execution_options={"synchronize_session": False})
+            deleted += len(chunk)
+            if len(chunk) < _DELETE_CHUNK:
+                break
+        if deleted != events:
+            raise RuntimeError(f"Eventos del {day} modificados durante la compactación ({deleted} != {events})")
+        db.commit()
+    except Exception:
+        db.rollback()
+        if archive:
+            archive.close()
+        # Sin commit no se ha borrado nada: el archivo de esta ejecución sobraría
+        if archive_path and os.path.exists(archive_path):
+            os.remove(archive_path)
+        raise
+    return {"day": day.isoformat(), "events": events, "summaries": len(groups), "archive": archive_path}
+
+
+def compact_gamification_events(db: Session, older_than_days: Optional[int] = None) -> dict:
+    """Compacta los eventos anteriores a older_than_days días (por defecto, GAMIFICATION_COMPACT_AFTER_DAYS)."""
+    older_than_days = settings.GAMIFICATION_COMPACT_AFTER_DAYS if older_than_days is None else older_than_days
+    if older_than_days <= 0:
+        return {"days": [], "events": 0}
+    cutoff = datetime.utcnow().date() - timedelta(days=older_than_days)
+    started = time.perf_counter()
+    days = []
+    while True:
+        oldest = db.execute(
+            select(func.min(GamificationEvent.timestamp))
+            .where(GamificationEvent.timestamp < datetime.combine(cutoff, datetime.min.time()))
+        ).scalar()
+        if oldest is None:
+            break
+        days.append(_compact_day(db, oldest.date()))
+    result = {
+        "cutoff": cutoff.isoformat(),
+        "days": days,
+        "events": sum(d["events"] for d in days),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+    logger.info(f"Compactados {result['events']} eventos de gamificación en {len(days)} días (anteriores a {cutoff})")
+    return result
@@ -1,54 +1,578 @@
 # backend/services/gamification_service.py
 # Servicio para lógica de gamificación y ranking
 
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from models.guests import GuestsSession
-from models.gamification import GamificationEvent, UserGamification, EventType, Badge
-from schemas.gamification import GamificationEventCreate, EventTypeCreate, BadgeCreate, RankingResponse
-from dependencies.auth import UserContext
-from sqlalchemy import func
-from models.gamification import EventType, Badge, GamificationEvent, UserGamification
-from schemas.gamification import EventTypeCreate, BadgeCreate
-from fastapi import HTTPException
-from models.user import User
 import logging
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from bisect import bisect_right
+from threading import Lock
+from types import SimpleNamespace
 from typing import List, Optional
+from fastapi import HTTPException
+from sqlalchemy import and_, bindparam, delete, func, insert, or_, select, text, update
+from sqlalchemy.exc import IntegrityError, OperationalError
 from sqlalchemy.orm import Session
-from models.gamification import GamificationEvent, UserGamification, EventType, Badge
-from schemas.gamification import GamificationEventCreate
+from core.background import BatchWriter
+from core.config import settings
+from core.database import SessionLocal
 from dependencies.auth import UserContext
+from models.gamification import (EventType, Badge, GamificationDeadEvent, GamificationEvent,
+                                 GamificationEventSummary, GamificationHourlyCount, UserGamification)
+from models.guests import GuestsSession
+from models.leaderboard import LeaderboardEntry
+from models.user import User
+from services.reference_cache import badge_cache, event_type_cache
+from schemas.gamification import (GamificationEventCreate, GamificationEventBatchItem, EventTypeCreate,
+                                  BadgeCreate, RankingResponse)
+
+class BadgeIndex:
+    """
+    Índice en memoria de tipos de evento y badges para puntuar sin consultar la base de datos,
+    construido desde la caché de datos de referencia. Por cada (event_type_id, user_type) guarda
+    los umbrales ordenados (required_points) y sus badge_id en paralelo; el badge alcanzado se
+    localiza con bisect. Los badges "both" se indexan para ambos tipos de usuario. Se invalida en el CRUD de tipos de evento y badges y, como red de
+    seguridad entre procesos, caduca cada GAMIFICATION_CACHE_TTL segundos.
+    """
+
+    USER_TYPES = ("registered", "anonymous")
+
+    def __init__(self):
+        self._lock = Lock()
+        self._data: dict | None = None
+        self._loaded_at = 0.0
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._data = None
+
+    def _load(self, db: Session) -> dict:
+        points = {event_type.id: event_type.points_per_event or 0 for event_type in event_type_cache.all(db)}
+        thresholds: dict = {}
+        badges: dict = {}
+        for badge in sorted(badge_cache.all(db), key=lambda b: (b.required_points, b.id)):
+            badges.setdefault(badge.event_type_id, []).append(badge)
+            user_types = self.USER_TYPES if (badge.user_type or "both") == "both" else (badge.user_type,)
+            for user_type in user_types:
+                required, ids = thresholds.setdefault((badge.event_type_id, user_type), ([], []))
+                required.append(badge.required_points)
+                ids.append(badge.id)
+        return {"points": points, "thresholds": thresholds, "badges": badges}
+
+    def _get(self, db: Session) -> dict:
+        data = self._data
+        if data is not None and time.monotonic() - self._loaded_at < settings.GAMIFICATION_CACHE_TTL:
+            return data
+        with self._lock:
+            if self._data is None or time.monotonic() - self._loaded_at >= settings.GAMIFICATION_CACHE_TTL:
+                self._data = self._load(db)
+                self._loaded_at = time.monotonic()
+            return self._data
+
+    def points_per_event(self, db: Session, event_type_id: int) -> Optional[int]:
+        return self._get(db)["points"].get(event_type_id)
+
+    def badge_for(self, db: Session, event_type_id: int, user_type: str, points: int) -> Optional[int]:
+        """Badge de mayor umbral alcanzado por points, o None."""
+        entry = self._get(db)["thresholds"].get((event_type_id, user_type))
+        if not entry:
+            return None
+        required, ids = entry
+        position = bisect_right(required, points)
+        return ids[position - 1] if position else None
+
+    def badges_for_event(self, db: Session, event_type_id: int) -> List[SimpleNamespace]:
+        return self._get(db)["badges"].get(event_type_id, [])
+
+
+badge_index = BadgeIndex()
+
+
+def invalidate_gamification_caches() -> None:
+    """Tras el CRUD de tipos de evento o badges: datos de referencia e índice de umbrales."""
+    event_type_cache.invalidate()
+    badge_cache.invalidate()
+    badge_index.invalidate()
+
+
+RANKING_WINDOWS = {"1d": timedelta(days=1), "7d": timedelta(days=7), "30d": timedelta(days=30)}
+
+# Caché corta de rankings por ventana: (window, event_type_id, limit, offset) -> (caduca, resultado)
+_window_rankings_cache: dict = {}
+_window_rankings_lock = Lock()
+
+
+def _owner_filter(user_id: Optional[int], session_id: Optional[str], model=UserGamification):
+    if user_id is not None:
+        return model.user_id == user_id
+    return model.session_id == session_id
+
+
+def increment_or_insert(db: Session, model, where: tuple, increments: dict, initial: dict) -> None:
+    """UPDATE atómico col = col + n; si no hay fila, INSERT (y si otra petición la crea a la vez, UPDATE)."""
+    increment = update(model).where(*where).values(
+        **{column: getattr(model, column) + amount for column, amount in increments.items()}
+    )
+    result = db.execute(increment, execution_options={"synchronize_session": False})
+    if result.rowcount:
+        return
+    try:
+        with db.begin_nested():
+            db.execute(insert(model).values(**initial))
+        logging.info(f"Creado nuevo registro de {model.__name__}")
+    except IntegrityError:
+        db.execute(increment, execution_options={"synchronize_session": False})
+
+
+def _increment_or_insert_many(db: Session, model, keys: tuple, rows: List[dict], increments: tuple) -> None:
+    """
+    increment_or_insert para un lote: cada fila de rows trae user_id, session_id, las columnas de
+    keys y los valores iniciales (que son también los incrementos de las columnas de increments).
+    Por propietario, una lectura de las claves existentes, un INSERT de las que faltan y un UPDATE
+    executemany col = col + n del resto. user_id y session_id se tratan por separado porque un
+    NULL no casa en el WHERE.
+    """
+    table = model.__table__
+    for owner in ("user_id", "session_id"):
+        owned = [row for row in rows if row[owner] is not None and (owner == "user_id" or row["user_id"] is None)]
+        if not owned:
+            continue
+        columns = (owner, *keys)
+        existing = {tuple(key) for key in db.execute(select(*[table.c[c] for c in columns]).where(
+            *[table.c[c].in_(list({row[c] for row in owned})) for c in columns]
+        ))}
+        fresh = [row for row in owned if tuple(row[c] for c in columns) not in existing]
+        stale = [row for row in owned if tuple(row[c] for c in columns) in existing]
+        if fresh:
+            try:
+                with db.begin_nested():
+                    db.execute(insert(table), fresh)
+            except IntegrityError:
+                # Otra petición ha creado alguna de las filas a la vez: resolverlas una a una
+                for row in fresh:
+                    increment_or_insert(db, model, tuple(getattr(model, c) == row[c] for c in columns),
+                                         {c: row[c] for c in increments}, row)
+        if stale:
+            db.execute(
+                update(table).where(*[table.c[c] == bindparam(f"k_{c}") for c in columns]).values(
+                    **{c: table.c[c] + bindparam(f"d_{c}") for c in increments}
+                ),
+                [{**{f"k_{c}": row[c] for c in columns}, **{f"d_{c}": row[c] for c in increments}} for row in stale]
+            )
+
+
+def apply_gamification_points_batch(db: Session, counts: dict) -> None:
+    """
+    Versión por lotes de apply_gamification_points. counts: (user_id, session_id, event_type_id,
+    bucket_start) -> eventos. Progreso, contadores por hora y ranking se actualizan con unas pocas
+    sentencias por tabla en lugar de una por grupo; los badges, con una lectura y un UPDATE
+    executemany de los que cambian. No hace commit.
+    """
+    progress: dict = {}
+    hourly = []
+    for (user_id, session_id, event_type_id, bucket_start), count in counts.items():
+        points_per_event = badge_index.points_per_event(db, event_type_id)
+        if points_per_event is None:
+            raise ValueError("Event type not found")
+        delta = points_per_event * count
+        owner_key = (user_id, None if user_id is not None else session_id, event_type_id)
+        progress[owner_key] = progress.get(owner_key, 0) + delta
+        hourly.append({"bucket_start": bucket_start, "event_type_id": event_type_id, "user_id": owner_key[0],
+                       "session_id": owner_key[1], "events": count, "points": delta})
+    if not progress:
+        return
+    _increment_or_insert_many(db, UserGamification, ("event_type_id",), [
+        {"user_id": user_id, "session_id": session_id, "event_type_id": event_type_id, "points": delta}
+        for (user_id, session_id, event_type_id), delta in progress.items()
+    ], ("points",))
+
+    user_ids = {user_id for user_id, _, _ in progress if user_id is not None}
+    session_ids = {session_id for user_id, session_id, _ in progress if user_id is None}
+    owners = ([UserGamification.user_id.in_(list(user_ids))] if user_ids else []) + (
+        [UserGamification.session_id.in_(list(session_ids))] if session_ids else [])
+    current = db.execute(select(
+        UserGamification.id, UserGamification.user_id, UserGamification.session_id,
+        UserGamification.event_type_id, UserGamification.points, UserGamification.badge_id,
+    ).where(or_(*owners), UserGamification.event_type_id.in_(list({key[2] for key in progress})))).all()
+
+    now = datetime.utcnow()
+    badge_changes = []
+    leaderboard: dict = {}
+    for row in current:
+        key = (row.user_id, None if row.user_id is not None else row.session_id, row.event_type_id)
+        if key not in progress:
+            continue
+        user_type = "registered" if row.user_id is not None else "anonymous"
+        badge_id = badge_index.badge_for(db, row.event_type_id, user_type, row.points)
+        if badge_id != row.badge_id:
+            badge_changes.append({"b_id": row.id, "b_badge_id": badge_id})
+        entry = leaderboard.setdefault(key[:2], {"user_id": key[0], "session_id": key[1], "points": 0,
+                                                 "badges_count": 0, "updated_at": now})
+        entry["points"] += progress[key]
+        entry["badges_count"] += (badge_id is not None) - (row.badge_id is not None)
+    if badge_changes:
+        table = UserGamification.__table__
+        db.execute(update(table).where(table.c.id == bindparam("b_id")).values(badge_id=bindparam("b_badge_id")),
+                   badge_changes)
+
+    # Ranking materializado y contadores por hora: mismos incrementos, agregados por fila destino
+    _increment_or_insert_many(db, LeaderboardEntry, (), list(leaderboard.values()), ("points", "badges_count"))
+    _increment_or_insert_many(db, GamificationHourlyCount, ("bucket_start", "event_type_id"), hourly,
+                              ("events", "points"))
+
+
+def apply_gamification_points(db: Session, user_type: str, user_id: Optional[int], session_id: Optional[str],
+                              event_type_id: int, count: int = 1, occurred_at: Optional[datetime] = None) -> int:
+    """
+    Suma count eventos al progreso del usuario con un UPDATE atómico (INSERT en el primer evento)
+    y actualiza el badge desde el índice en memoria. Coste constante, sin recontar el histórico.
+    No hace commit. Devuelve los puntos resultantes.
+    """
+    points_per_event = badge_index.points_per_event(db, event_type_id)
+    if points_per_event is None:
+        raise ValueError("Event type not found")
+    delta = points_per_event * count
+    where = (_owner_filter(user_id, session_id), UserGamification.event_type_id == event_type_id)
+    increment_or_insert(db, UserGamification, where, {"points": delta}, {
+        "user_id": user_id, "session_id": session_id, "event_type_id": event_type_id, "points": delta
+    })
+
+    row = db.execute(
+        select(UserGamification.id, UserGamification.points, UserGamification.badge_id).where(*where)
+    ).first()
+    badge_id = badge_index.badge_for(db, event_type_id, user_type, row.points)
+    if badge_id != row.badge_id:
+        db.execute(
+            update(UserGamification).where(UserGamification.id == row.id).values(badge_id=badge_id),
+            execution_options={"synchronize_session": False}
+        )
+
+    # Ranking materializado: mismos incrementos sobre la fila del usuario o sesión
+    badges_delta = (badge_id is not None) - (row.badge_id is not None)
+    increment_or_insert(
+        db, LeaderboardEntry, (_owner_filter(user_id, session_id, LeaderboardEntry),),
+        {"points": delta, "badges_count": badges_delta},
+        {"user_id": user_id, "session_id": session_id, "points": delta,
+         "badges_count": int(badge_id is not None), "updated_at": datetime.utcnow()}
+    )
+
+    # Contador de la hora del evento para los rankings por ventana
+    bucket_start = (occurred_at or datetime.utcnow()).replace(minute=0, second=0, microsecond=0)
+    increment_or_insert(
+        db, GamificationHourlyCount,
+        (GamificationHourlyCount.bucket_start == bucket_start,
+         GamificationHourlyCount.event_type_id == event_type_id,
+         _owner_filter(user_id, session_id, GamificationHourlyCount)),
+        {"events": count, "points": delta},
+        {"bucket_start": bucket_start, "event_type_id": event_type_id, "user_id": user_id,
+         "session_id": session_id, "events": count, "points": delta}
+    )
+    return row.points
+
+
+def recompute_user_gamification(db: Session, event_type_id: Optional[int] = None) -> dict:
+    """
+    Reconstruye user_gamification a partir de gamification_events y de los resúmenes diarios de los
+    eventos ya compactados (reparación tras cambiar points_per_event o badges, o ante cualquier
+    desajuste). Opcionalmente, sólo un tipo de evento.
+    """
+    invalidate_gamification_caches()
+    query = select(
+        GamificationEvent.user_id, GamificationEvent.session_id, GamificationEvent.event_type_id,
+        func.count(GamificationEvent.id)
+    ).group_by(GamificationEvent.user_id, GamificationEvent.session_id, GamificationEvent.event_type_id)
+    summaries = select(
+        GamificationEventSummary.user_id, GamificationEventSummary.session_id, GamificationEventSummary.event_type_id,
+        func.sum(GamificationEventSummary.events)
+    ).group_by(GamificationEventSummary.user_id, GamificationEventSummary.session_id,
+               GamificationEventSummary.event_type_id)
+    if event_type_id is not None:
+        query = query.where(GamificationEvent.event_type_id == event_type_id)
+        summaries = summaries.where(GamificationEventSummary.event_type_id == event_type_id)
+
+    totals: dict = {}
+    for user_id, session_id, type_id, events in list(db.execute(summaries)) + list(db.execute(query)):
+        key = (user_id, session_id if user_id is None else None, type_id)
+        totals[key] = totals.get(key, 0) + int(events or 0)
+
+    rows = []
+    for (user_id, session_id, type_id), events in totals.items():
+        points_per_event = badge_index.points_per_event(db, type_id)
+        if points_per_event is None:
+            continue
+        points = events * points_per_event
+        user_type = "registered" if user_id is not None else "anonymous"
+        rows.append({
+            "user_id": user_id,
+            "session_id": session_id if user_id is None else None,
+            "event_type_id": type_id,
+            "points": points,
+            "badge_id": badge_index.badge_for(db, type_id, user_type, points),
+        })
+
+    stale = delete(UserGamification)
+    if event_type_id is not None:
+        stale = stale.where(UserGamification.event_type_id == event_type_id)
+    db.execute(stale, execution_options={"synchronize_session": False})
+    if rows:
+        db.execute(insert(UserGamification), rows)
+    rebuild_leaderboard(db, commit=False)
+    db.commit()
+    logging.info(f"Gamificación recalculada desde eventos: {len(rows)} registros")
+    return {"records": len(rows), "event_type_id": event_type_id}
 
 
 # backend/services/gamification_service.py
 
-def register_event(db: Session, event: GamificationEventCreate, user: UserContext) -> GamificationEvent:
-    """Registra un evento de gamificación y actualiza los puntos del usuario."""
+_EVENT_COLUMNS = ("event_type_id", "user_id", "session_id", "timestamp", "idempotency_key")
+
+
+def _store_events(db: Session, rows: List[dict]) -> int:
+    """
+    Inserta eventos en bloque y aplica los incrementos agregados por (usuario o sesión, tipo de
+    evento, hora) con unas pocas sentencias por tabla (apply_gamification_points_batch).
+    Los eventos cuya idempotency_key ya existe (reintentos) se descartan. No hace commit.
+    Devuelve el número de eventos nuevos.
+    """
+    keys = [row["idempotency_key"] for row in rows if row.get("idempotency_key")]
+    seen = set()
+    if keys:
+        seen.update(db.execute(
+            select(GamificationEvent.idempotency_key).where(GamificationEvent.idempotency_key.in_(keys))
+        ).scalars())
+    fresh = []
+    for row in rows:
+        key = row.get("idempotency_key")
+        if key:
+            if key in seen:
+                continue
+            seen.add(key)
+        fresh.append(row)
+    if not fresh:
+        return 0
+
+    groups: dict = {}
+    for row in fresh:
+        bucket_start = row["timestamp"].replace(minute=0, second=0, microsecond=0)
+        group = (row["user_id"], row["session_id"], row["event_type_id"], bucket_start)
+        groups[group] = groups.get(group, 0) + 1
+    # Los elementos reencolados llevan además attempts/last_error: insertar sólo las columnas
+    db.execute(insert(GamificationEvent), [{column: row.get(column) for column in _EVENT_COLUMNS} for row in fresh])
+    apply_gamification_points_batch(db, groups)
+    return len(fresh)
+
+
+_dead_letter_metrics = {"dead_lettered": 0}
+
+
+def _dead_letter(db: Session, items: List[dict]) -> None:
+    """Aparta en gamification_dead_events los eventos que no se pueden volcar."""
+    db.execute(insert(GamificationDeadEvent), [{
+        "event_type_id": item["event_type_id"],
+        "user_id": item["user_id"],
+        "session_id": item["session_id"],
+        "timestamp": item["timestamp"],
+        "idempotency_key": item.get("idempotency_key"),
+        "attempts": item.get("attempts", 0),
+        "last_error": (item.get("last_error") or "")[:255] or None,
+    } for item in items])
+    db.commit()
+    _dead_letter_metrics["dead_lettered"] += len(items)
+    logging.error(f"{len(items)} eventos de gamificación apartados en gamification_dead_events")
+
+
+def _flush_gamification_events(batch: List[dict]) -> None:
+    db = SessionLocal()
+    try:
+        for attempt in range(settings.GAMIFICATION_FLUSH_RETRIES):
+            try:
+                _store_events(db, batch)
+                db.commit()
+                return
+            except OperationalError:
+                # Base de datos no disponible: el lote entero vuelve a la cola sin gastar intentos
+                db.rollback()
+                if attempt == settings.GAMIFICATION_FLUSH_RETRIES - 1:
+                    if gamification_writer.running:
+                        requeued = sum(gamification_writer.submit(item) for item in batch)
+                        logging.error(f"Base de datos no disponible; {requeued}/{len(batch)} eventos reencolados")
+                        return
+                    raise
+                time.sleep(0.1 * (attempt + 1))
+            except Exception:
+                # IntegrityError por una clave insertada a la vez en otro proceso se resuelve al reintentar
+                db.rollback()
+                if attempt < settings.GAMIFICATION_FLUSH_RETRIES - 1:
+                    time.sleep(0.1 * (attempt + 1))
+
+        # El lote sigue fallando: volcar evento a evento para aislar los que lo impiden
+        failed = []
+        for item in batch:
+            try:
+                _store_events(db, [item])
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                failed.append({**item, "attempts": item.get("attempts", 0) + 1,
+                               "last_error": f"{type(e).__name__}: {str(e)}"})
+        if not failed:
+            return
+        # Al menos una vez: las claves de idempotencia evitan duplicados al reintentar
+        retry = [item for item in failed if item["attempts"] < settings.GAMIFICATION_DEAD_LETTER_ATTEMPTS]
+        dead = [item for item in failed if item["attempts"] >= settings.GAMIFICATION_DEAD_LETTER_ATTEMPTS]
+        if retry and gamification_writer.running:
+            requeued = sum(gamification_writer.submit(item) for item in retry)
+            logging.error(f"{len(failed)}/{len(batch)} eventos de gamificación no volcados; {requeued} reencolados")
+        else:
+            dead.extend(retry)  # Sin hilo de fondo (parada o modo síncrono) no hay cola a la que volver
+        if dead:
+            _dead_letter(db, dead)
+    finally:
+        db.close()
+
+
+gamification_writer = BatchWriter(
+    "gamification_events",
+    _flush_gamification_events,
+    max_batch=settings.GAMIFICATION_BATCH_SIZE,
+    flush_interval=settings.GAMIFICATION_FLUSH_INTERVAL,
+    max_queue=settings.GAMIFICATION_MAX_QUEUE,
+)
+
+
+def enqueue_event(db: Session, user: UserContext, event_type_id: int, idempotency_key: Optional[str] = None) -> str:
+    """
+    Encola un evento para el volcado en segundo plano (sin consultas ni commit en la petición).
+    Si la cola está llena, lo registra de forma síncrona. Devuelve la clave de idempotencia.
+    """
+    if badge_index.points_per_event(db, event_type_id) is None:
+        raise ValueError("Event type not found")
+    item = {
+        "event_type_id": event_type_id,
+        "user_id": int(user.user_id) if user.user_type == "registered" else None,
+        "session_id": user.session_id if user.user_type == "anonymous" else None,
+        "timestamp": datetime.utcnow(),
+        "idempotency_key": idempotency_key or uuid.uuid4().hex,
+    }
+    if not gamification_writer.submit(item):
+        _store_events(db, [item])
+        db.commit()
+    return item["idempotency_key"]
+
+
+def get_gamification_pipeline_metrics() -> dict:
+    return {**gamification_writer.metrics, **_dead_letter_metrics, "pending": gamification_writer.pending(),
+            "running": gamification_writer.running}
+
+
+def register_event(db: Session, event: GamificationEventCreate, user: UserContext,
+                   idempotency_key: Optional[str] = None) -> GamificationEvent:
+    """Registra un evento de gamificación y actualiza los puntos del usuario (una sola transacción)."""
+    if idempotency_key:
+        existing = db.query(GamificationEvent).filter(GamificationEvent.idempotency_key == idempotency_key).first()
+        if existing:
+            return existing
     user_id = int(user.user_id) if user.user_type == "registered" else None
     session_id = user.session_id if user.user_type == "anonymous" else None
 
     db_event = GamificationEvent(
         event_type_id=event.event_type_id,
         user_id=user_id,
-        session_id=session_id
+        session_id=session_id,
+        idempotency_key=idempotency_key
     )
     db.add(db_event)
-    db.commit()
+    apply_gamification_points(db, user.user_type, user_id, session_id, event.event_type_id)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Reintento concurrente con la misma clave: devolver el evento ya registrado
+        db.rollback()
+        existing = db.query(GamificationEvent).filter(GamificationEvent.idempotency_key == idempotency_key).first()
+        if not idempotency_key or not existing:
+            raise
+        return existing
     db.refresh(db_event)
-    update_user_gamification(db, user, event.event_type_id)
     return db_event
 
+def register_events_batch(db: Session, events: List[GamificationEventBatchItem], user: UserContext) -> dict:
+    """
+    Registra un lote de eventos en una sola transacción: INSERT masivo de los eventos y, por tabla,
+    incrementos en bloque con los eventos agregados en memoria por (usuario o sesión, tipo, hora).
+    """
+    if not events:
+        return {"accepted": 0, "duplicates": 0}
+    if len(events) > settings.GAMIFICATION_BATCH_MAX_EVENTS:
+        raise HTTPException(status_code=400,
+                            detail=f"Máximo {settings.GAMIFICATION_BATCH_MAX_EVENTS} eventos por lote")
+
+    own_user_id = int(user.user_id) if user.user_type == "registered" else None
+    own_session_id = user.session_id if user.user_type == "anonymous" else None
+    now = datetime.utcnow()
+    oldest = now - timedelta(days=settings.GAMIFICATION_BATCH_MAX_AGE_DAYS)
+    rows = []
+    unknown = set()
+    for event in events:
+        user_id, session_id = own_user_id, own_session_id
+        if event.user_id is not None or event.session_id is not None:
+            if user.rol != "admin" and (event.user_id, event.session_id) != (own_user_id, own_session_id):
+                raise HTTPException(status_code=403, detail="Solo administradores pueden registrar eventos de otros usuarios")
+            if (event.user_id is None) == (event.session_id is None):
+                raise HTTPException(status_code=400, detail="Cada evento debe indicar user_id o session_id, no ambos")
+            user_id, session_id = event.user_id, event.session_id
+        if badge_index.points_per_event(db, event.event_type_id) is None:
+            unknown.add(event.event_type_id)
+            continue
+        timestamp = event.timestamp or now
+        if timestamp.tzinfo is not None:
+            # Las columnas guardan UTC sin zona (p.ej. "...Z" de toISOString())
+            timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+        if timestamp < oldest:
+            raise HTTPException(status_code=400,
+                                detail=f"Eventos con más de {settings.GAMIFICATION_BATCH_MAX_AGE_DAYS} días de antigüedad")
+        rows.append({"event_type_id": event.event_type_id, "user_id": user_id, "session_id": session_id,
+                     "timestamp": min(timestamp, now), "idempotency_key": event.idempotency_key})
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Tipos de evento no encontrados: {sorted(unknown)}")
+
+    try:
+        accepted = _store_events(db, rows)
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        logging.error(f"Error registrando lote de eventos de gamificación: {str(e)}")
+        raise HTTPException(status_code=400, detail="Usuario o sesión no válidos en el lote")
+    return {"accepted": accepted, "duplicates": len(rows) - accepted}
+
 def get_user_gamification(db: Session, user: UserContext) -> List[UserGamification]:
     """Obtiene todos los registros de gamificación del usuario."""
     if user.user_type == "registered":
         return db.query(UserGamification).filter(UserGamification.user_id == int(user.user_id)).all()
     return db.query(UserGamification).filter(UserGamification.session_id == user.session_id).all()
 
-def get_user_events(db: Session, user: UserContext) -> List[GamificationEvent]:
-    """Obtiene todos los eventos de gamificación del usuario."""
+def get_user_events(db: Session, user: UserContext) -> List:
+    """
+    Obtiene los eventos de gamificación del usuario: primero los resúmenes diarios de los eventos
+    compactados (uno por día y tipo, con count, id=None y su propio summary_id) y después los
+    eventos recientes sin compactar.
+    """
     if user.user_type == "registered":
-        return db.query(GamificationEvent).filter(GamificationEvent.user_id == int(user.user_id)).all()
-    return db.query(GamificationEvent).filter(GamificationEvent.session_id == user.session_id).all()
+        summary_owner = GamificationEventSummary.user_id == int(user.user_id)
+        event_owner = GamificationEvent.user_id == int(user.user_id)
+    else:
+        summary_owner = GamificationEventSummary.session_id == user.session_id
+        event_owner = GamificationEvent.session_id == user.session_id
+    summaries = db.query(GamificationEventSummary).filter(summary_owner).order_by(
+        GamificationEventSummary.day, GamificationEventSummary.event_type_id
+    ).all()
+    compacted = [
+        SimpleNamespace(id=None, summary_id=summary.id, event_type_id=summary.event_type_id,
+                        user_id=summary.user_id, session_id=summary.session_id,
+                        timestamp=datetime.combine(summary.day, datetime.min.time()),
+                        count=summary.events, compacted=True)
+        for summary in summaries
+    ]
+    return compacted + db.query(GamificationEvent).filter(event_owner).order_by(GamificationEvent.id).all()
 
 def get_event_details(db: Session, event_id: int, user: UserContext) -> Optional[GamificationEvent]:
     """Obtiene los detalles de un evento específico si pertenece al usuario."""
@@ -60,9 +584,9 @@ def get_event_details(db: Session, event_id: int, user: UserContext) -> Optional
         return event
     return None
 
-def get_badges_for_event(db: Session, event_type_id: int) -> List[Badge]:
-    """Obtiene todos los badges asociados a un tipo de evento."""
-    return db.query(Badge).filter(Badge.event_type_id == event_type_id).all()
+def get_badges_for_event(db: Session, event_type_id: int) -> List[SimpleNamespace]:
+    """Obtiene todos los badges asociados a un tipo de evento (desde el índice en memoria)."""
+    return badge_index.badges_for_event(db, event_type_id)
 
 def get_user_progress_for_event(db: Session, user: UserContext, event_type_id: int) -> Optional[UserGamification]:
     """Obtiene el progreso del usuario para un tipo de evento específico."""
@@ -83,46 +607,17 @@ def update_user_gamification(db: Session, user: UserContext, event_type_id: int)
     user_id = int(user.user_id) if user.user_type == "registered" else None
     session_id = user.session_id if user.user_type == "anonymous" else None
 
-    gamification = get_user_progress_for_event(db, user, event_type_id)
-    if not gamification:
-        gamification = UserGamification(
-            user_id=user_id,
-            session_id=session_id,
-            event_type_id=event_type_id,
-            points=0
-        )
-        db.add(gamification)
-        logging.info("Creado nuevo registro de UserGamification")
-
-    event_type = db.query(EventType).filter(EventType.id == event_type_id).first()
-    if not event_type:
-        raise ValueError("Event type not found")
-
-    events_count = db.query(GamificationEvent).filter(
-        GamificationEvent.event_type_id == event_type_id,
-        (GamificationEvent.user_id == user_id) if user_id else (GamificationEvent.session_id == session_id)
-    ).count()
-    logging.info(f"Contados {events_count} eventos para event_type_id={event_type_id}")
-
-    gamification.points = events_count * event_type.points_per_event
-
-    badge = db.query(Badge).filter(
-        Badge.event_type_id == event_type_id,
-        Badge.user_type.in_([user.user_type, "both"]),
-        Badge.required_points <= gamification.points
-    ).order_by(Badge.required_points.desc()).first()
-    logging.info(f"Badge encontrado: {badge.id if badge else 'None'}")
-
-    gamification.badge_id = badge.id if badge else None
+    apply_gamification_points(db, user.user_type, user_id, session_id, event_type_id)
     db.commit()
-    db.refresh(gamification)
-    return gamification
+    return get_user_progress_for_event(db, user, event_type_id)
+
 # Funciones para EventType
 def create_event_type(db: Session, event_type: EventTypeCreate):
     db_event_type = EventType(**event_type.dict())
     db.add(db_event_type)
     db.commit()
     db.refresh(db_event_type)
+    invalidate_gamification_caches()
     return db_event_type
 
 def get_event_types(db: Session) -> List[EventType]:
@@ -136,6 +631,7 @@ def update_event_type(db: Session, event_type_id: int, event_type_update: EventT
         setattr(event_type, key, value)
     db.commit()
     db.refresh(event_type)
+    invalidate_gamification_caches()
     return event_type
 
 def delete_event_type(db: Session, event_type_id: int):
@@ -144,6 +640,7 @@ def delete_event_type(db: Session, event_type_id: int):
         raise HTTPException(status_code=404, detail="Event type not found")
     db.delete(event_type)
     db.commit()
+    invalidate_gamification_caches()
     return {"message": "Event type deleted"}
 
 # Funciones para Badge
@@ -152,6 +649,7 @@ def create_badge(db: Session, badge: BadgeCreate):
     db.add(db_badge)
     db.commit()
     db.refresh(db_badge)
+    invalidate_gamification_caches()
     return db_badge
 
 def get_badges(db: Session) -> List[Badge]:
@@ -165,6 +663,7 @@ def update_badge(db: Session, badge_id: int, badge_update: BadgeCreate):
         setattr(badge, key, value)
     db.commit()
     db.refresh(badge)
+    invalidate_gamification_caches()
     return badge
 
 def delete_badge(db: Session, badge_id: int):
@@ -173,6 +672,7 @@ def delete_badge(db: Session, badge_id: int):
         raise HTTPException(status_code=404, detail="Badge not found")
     db.delete(badge)
     db.commit()
+    invalidate_gamification_caches()
     return {"message": "Badge deleted"}
 
 #def calculate_points(api_usages: int) -> int:
@@ -189,72 +689,158 @@ def delete_badge(db: Session, badge_id: int):
 
 
 
-def get_rankings(db: Session) -> List[RankingResponse]:
-    # Rankings para usuarios registrados
-    registered = db.query(
-        User.username,
-        func.sum(UserGamification.points).label("total_points"),
-        func.count(UserGamification.badge_id).label("badges_count")
-    ).join(UserGamification, User.id == UserGamification.user_id
-    ).group_by(User.id).all()
-
-    # Rankings para usuarios anónimos
-    anonymous = db.query(
-        GuestsSession.username,
-        func.sum(UserGamification.points).label("total_points"),
-        func.count(UserGamification.badge_id).label("badges_count")
-    ).join(UserGamification, GuestsSession.id == UserGamification.session_id
-    ).group_by(GuestsSession.id).all()
-
-    all_rankings = [
+def rebuild_leaderboard(db: Session, commit: bool = True) -> int:
+    """Regenera el ranking materializado desde user_gamification con un único INSERT ... SELECT."""
+    db.execute(delete(LeaderboardEntry), execution_options={"synchronize_session": False})
+    totals = select(
+        UserGamification.user_id,
+        UserGamification.session_id,
+        func.sum(UserGamification.points),
+        func.count(UserGamification.badge_id),
+    ).group_by(UserGamification.user_id, UserGamification.session_id)
+    db.execute(insert(LeaderboardEntry).from_select(["user_id", "session_id", "points", "badges_count"], totals))
+    if commit:
+        db.commit()
+    entries = db.query(func.count(LeaderboardEntry.id)).scalar() or 0
+    logging.info(f"Ranking materializado regenerado: {entries} participantes")
+    return entries
+
+
+def _leaderboard_missing(db: Session) -> bool:
+    return db.query(LeaderboardEntry.id).first() is None and db.query(UserGamification.id).first() is not None
+
+
+def ensure_leaderboard(db: Session) -> None:
+    """
+    En el arranque: construye el ranking si aún no existe y hay progreso registrado. Todos los
+    workers arrancan a la vez; en MariaDB/MySQL sólo el que obtiene el bloqueo con nombre lo
+    regenera y el resto sigue sin esperar.
+    """
+    if not _leaderboard_missing(db):
+        return
+    engine = db.get_bind()
+    if engine.dialect.name not in ("mysql", "mariadb"):
+        rebuild_leaderboard(db)
+        return
+    # Conexión propia: el bloqueo es de conexión y la sesión la devuelve al pool en el commit
+    with engine.connect() as lock_conn:
+        if not lock_conn.execute(text("SELECT GET_LOCK('neptuno_leaderboard_rebuild', 0)")).scalar():
+            logging.info("Ranking materializado: otro worker lo está regenerando")
+            return
+        try:
+            if _leaderboard_missing(db):
+                rebuild_leaderboard(db)
+        finally:
+            lock_conn.execute(text("SELECT RELEASE_LOCK('neptuno_leaderboard_rebuild')"))
+
+
+def get_rankings(db: Session, limit: int = 100, offset: int = 0) -> List[RankingResponse]:
+    """Top-K del ranking materializado: sólo se leen y enlazan las limit filas de la página."""
+    rows = db.query(
+        LeaderboardEntry.user_id,
+        LeaderboardEntry.points,
+        LeaderboardEntry.badges_count,
+        User.username.label("user_name"),
+        GuestsSession.username.label("session_name"),
+    ).outerjoin(User, User.id == LeaderboardEntry.user_id
+    ).outerjoin(GuestsSession, GuestsSession.id == LeaderboardEntry.session_id
+    ).order_by(LeaderboardEntry.points.desc(), LeaderboardEntry.id.desc()
+    ).offset(offset).limit(limit).all()
+
+    return [
         RankingResponse(
-            username=r.username,
-            points=r.total_points,
+            username=(r.user_name if r.user_id is not None else r.session_name) or "",
+            points=r.points,
             badges_count=r.badges_count,
-            user_type="registered" if r in registered else "anonymous"
-        ) for r in registered + anonymous
+            user_type="registered" if r.user_id is not None else "anonymous"
+        ) for r in rows
     ]
-    return sorted(all_rankings, key=lambda x: x.points, reverse=True)
-
-
-def get_event_types(db: Session) -> List[EventType]:
-    return db.query(EventType).all()
 
-def update_event_type(db: Session, event_type_id: int, event_type_update: EventTypeCreate):
-    event_type = db.query(EventType).filter(EventType.id == event_type_id).first()
-    if not event_type:
-        raise HTTPException(status_code=404, detail="Event type not found")
-    for key, value in event_type_update.dict().items():
-        setattr(event_type, key, value)
-    db.commit()
-    db.refresh(event_type)
-    return event_type
-
-def delete_event_type(db: Session, event_type_id: int):
-    event_type = db.query(EventType).filter(EventType.id == event_type_id).first()
-    if not event_type:
-        raise HTTPException(status_code=404, detail="Event type not found")
-    db.delete(event_type)
-    db.commit()
-    return {"message": "Event type deleted"}
 
-def get_badges(db: Session) -> List[Badge]:
-    return db.query(Badge).all()
+def get_my_rank(db: Session, user: UserContext) -> dict:
+    """
+    Posición del usuario: cuenta por el índice (points, id) las entradas que le preceden. Es un
+    recorrido de rango sin filesort, pero lee tantas entradas del índice como puestos por delante.
+    """
+    user_id = int(user.user_id) if user.user_type == "registered" else None
+    session_id = user.session_id if user.user_type == "anonymous" else None
+    entry = db.query(LeaderboardEntry).filter(_owner_filter(user_id, session_id, LeaderboardEntry)).first()
+    if not entry:
+        return {"rank": None, "points": 0, "badges_count": 0}
+    ahead = db.query(func.count(LeaderboardEntry.id)).filter(or_(
+        LeaderboardEntry.points > entry.points,
+        and_(LeaderboardEntry.points == entry.points, LeaderboardEntry.id > entry.id)
+    )).scalar() or 0
+    return {"rank": ahead + 1, "points": entry.points, "badges_count": entry.badges_count}
+
+
+def _ranking_rows(db: Session, totals, limit: int, offset: int) -> List[RankingResponse]:
+    """Ordena una subconsulta (user_id, session_id, points) y enlaza nombres y badges de la página."""
+    totals = totals.subquery()
+    rows = db.query(
+        totals.c.user_id,
+        totals.c.points,
+        func.coalesce(LeaderboardEntry.badges_count, 0).label("badges_count"),
+        User.username.label("user_name"),
+        GuestsSession.username.label("session_name"),
+    ).select_from(totals
+    ).outerjoin(LeaderboardEntry, or_(
+        LeaderboardEntry.user_id == totals.c.user_id, LeaderboardEntry.session_id == totals.c.session_id
+    )).outerjoin(User, User.id == totals.c.user_id
+    ).outerjoin(GuestsSession, GuestsSession.id == totals.c.session_id
+    ).order_by(totals.c.points.desc(), totals.c.user_id, totals.c.session_id
+    ).offset(offset).limit(limit).all()
+    return [
+        RankingResponse(
+            username=(r.user_name if r.user_id is not None else r.session_name) or "",
+            points=r.points or 0,
+            badges_count=r.badges_count,
+            user_type="registered" if r.user_id is not None else "anonymous"
+        ) for r in rows
+    ]
 
-def update_badge(db: Session, badge_id: int, badge_update: BadgeCreate):
-    badge = db.query(Badge).filter(Badge.id == badge_id).first()
-    if not badge:
-        raise HTTPException(status_code=404, detail="Badge not found")
-    for key, value in badge_update.dict().items():
-        setattr(badge, key, value)
-    db.commit()
-    db.refresh(badge)
-    return badge
 
-def delete_badge(db: Session, badge_id: int):
-    badge = db.query(Badge).filter(Badge.id == badge_id).first()
-    if not badge:
-        raise HTTPException(status_code=404, detail="Badge not found")
-    db.delete(badge)
-    db.commit()
-    return {"message": "Badge deleted"}
\ No newline at end of file
+def get_window_rankings(db: Session, window: str = "all", event_type_id: Optional[int] = None,
+                        limit: int = 100, offset: int = 0) -> List[RankingResponse]:
+    """
+    Ranking por ventana deslizante (1d, 7d, 30d) y, opcionalmente, por tipo de evento.
+    Suma los contadores por hora de la ventana (a lo sumo 24 * días por participante) en lugar de
+    recorrer gamification_events. window="all" usa user_gamification o el ranking materializado.
+    """
+    if window == "all" and event_type_id is None:
+        return get_rankings(db, limit=limit, offset=offset)
+
+    key = (window, event_type_id, limit, offset)
+    now = time.monotonic()
+    cached = _window_rankings_cache.get(key)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    if window == "all":
+        totals = select(
+            UserGamification.user_id, UserGamification.session_id, UserGamification.points.label("points")
+        ).where(UserGamification.event_type_id == event_type_id
+        ).order_by(UserGamification.points.desc(), UserGamification.user_id, UserGamification.session_id
+        ).offset(offset).limit(limit)
+    else:
+        since = (datetime.utcnow() - RANKING_WINDOWS[window]).replace(minute=0, second=0, microsecond=0)
+        totals = select(
+            GamificationHourlyCount.user_id,
+            GamificationHourlyCount.session_id,
+            func.sum(GamificationHourlyCount.points).label("points"),
+        ).where(GamificationHourlyCount.bucket_start >= since)
+        if event_type_id is not None:
+            totals = totals.where(GamificationHourlyCount.event_type_id == event_type_id)
+        totals = totals.group_by(GamificationHourlyCount.user_id, GamificationHourlyCount.session_id
+        ).order_by(func.sum(GamificationHourlyCount.points).desc(),
+                   GamificationHourlyCount.user_id, GamificationHourlyCount.session_id
+        ).offset(offset).limit(limit)
+
+    # La subconsulta ya está paginada con el mismo desempate (user_id, session_id) que el exterior,
+    # así que los empates no cambian de página entre peticiones; el exterior sólo ordena y enlaza
+    result = _ranking_rows(db, totals, limit, 0)
+    with _window_rankings_lock:
+        if len(_window_rankings_cache) > 256:
+            _window_rankings_cache.clear()
+        _window_rankings_cache[key] = (now + settings.GAMIFICATION_WINDOW_CACHE_TTL, result)
+    return result
@@ -1,45 +1,148 @@
 # backend/services/integration_service.py
 # Servicio para gestión de integraciones y webhooks
 
-from datetime import datetime
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from models.integration import Integration
+from models.webhook_delivery import WebhookDelivery
 from core.logging import configure_logging
 from fastapi import HTTPException
-import requests
+from core.config import settings
+from threading import Lock
+import json
+import time
 
 logger = configure_logging()
 
-def add_integration(db: Session, user_id: str, name: str, webhook_url: str, event_type: str):
+# Tabla de rutas en memoria: event_type -> [(integration_id, coalesce_window)] de integraciones activas.
+# Se invalida localmente al crear/editar/activar/eliminar integraciones y caduca tras
+# INTEGRATION_ROUTES_TTL segundos para recoger los cambios hechos en otros workers.
+_routes_lock = Lock()
+_routes: dict | None = None
+_routes_loaded_at = 0.0
+
+# Eventos que admiten agrupación por usuario cuando la integración define coalesce_window
+COALESCIBLE_EVENTS = {"credit_usage"}
+
+def _get_integration_routes(db: Session) -> dict:
+    global _routes, _routes_loaded_at
+    if _routes is not None and time.monotonic() - _routes_loaded_at < settings.INTEGRATION_ROUTES_TTL:
+        return _routes
+    with _routes_lock:
+        if _routes is None or time.monotonic() - _routes_loaded_at >= settings.INTEGRATION_ROUTES_TTL:
+            routes = {}
+            rows = db.query(Integration.id, Integration.event_type, Integration.coalesce_window).filter(
+                Integration.active == True
+            ).all()
+            for row in rows:
+                routes.setdefault(row.event_type, []).append((row.id, row.coalesce_window or 0))
+            _routes = routes
+            _routes_loaded_at = time.monotonic()
+        return _routes
+
+def invalidate_integration_routes() -> None:
+    global _routes
+    with _routes_lock:
+        _routes = None
+
+def add_integration(db: Session, user_id: str, name: str, webhook_url: str, event_type: str, coalesce_window: int = 0):
     try:
         integration = Integration(
             user_id=user_id,
             name=name,
             webhook_url=webhook_url,
-            event_type=event_type
+            event_type=event_type,
+            coalesce_window=coalesce_window
         )
         db.add(integration)
         db.commit()
+        invalidate_integration_routes()
         logger.info(f"Integración {name} añadida para usuario ID {user_id}")
         return integration
     except Exception as e:
         logger.error(f"Error al añadir integración {name} para usuario {user_id}: {str(e)}")
         raise HTTPException(status_code=500, detail="Error al añadir integración")
 
+def _coalesce_delivery(db: Session, integration_id: int, key: str, body: str) -> bool:
+    """Fusiona el evento en una entrega agrupada aún no enviada; False si no hay ninguna abierta."""
+    return db.execute(
+        update(WebhookDelivery)
+        .where(WebhookDelivery.integration_id == integration_id,
+               WebhookDelivery.coalesce_key == key,
+               WebhookDelivery.status == "pending",
+               WebhookDelivery.attempts == 0)
+        .values(payload=body, coalesced_count=WebhookDelivery.coalesced_count + 1)
+        .execution_options(synchronize_session=False)
+    ).rowcount > 0
+
+def enqueue_webhook(db: Session, event_type: str, payload: dict) -> int:
+    """
+    Añade a la sesión una entrega por cada integración activa suscrita a event_type, sin commit:
+    las filas de la outbox se confirman en la misma transacción que el cambio que las origina.
+    El envío HTTP lo hace en segundo plano services.webhook_dispatcher.
+    Si la integración tiene coalesce_window, los credit_usage de un mismo usuario se acumulan
+    en una única entrega que sale al cerrar la ventana con el último saldo y el total consumido.
+    Devuelve el número de integraciones notificadas.
+    """
+    integrations = _get_integration_routes(db).get(event_type)
+    if not integrations:
+        return 0  # Sin suscriptores: ni una consulta
+    body = json.dumps(payload, default=str)
+    now = datetime.utcnow()
+    coalesce_key = None
+    if event_type in COALESCIBLE_EVENTS and payload.get("user_id") is not None:
+        coalesce_key = f"{payload.get('user_type')}:{payload['user_id']}"
+
+    queued = 0
+    for integration_id, coalesce_window in integrations:
+        if coalesce_key and coalesce_window:
+            if _coalesce_delivery(db, integration_id, coalesce_key, body):
+                queued += 1
+                continue
+            delivery = WebhookDelivery(integration_id=integration_id, event_type=event_type, payload=body,
+                                       coalesce_key=coalesce_key,
+                                       next_attempt_at=now + timedelta(seconds=coalesce_window))
+        else:
+            delivery = WebhookDelivery(integration_id=integration_id, event_type=event_type, payload=body)
+        try:
+            with db.begin_nested():
+                db.add(delivery)
+            queued += 1
+        except IntegrityError:
+            # Integración eliminada en otro worker y aún presente en la tabla de rutas en caché
+            logger.warning(f"Integración ID {integration_id} ya no existe; webhook {event_type} omitido")
+            invalidate_integration_routes()
+    logger.debug(f"{queued} webhooks encolados para event_type {event_type}")
+    return queued
+
 def trigger_webhook(db: Session, event_type: str, payload: dict):
+    """Encola los webhooks de event_type en su propia transacción (eventos sin otro cambio que confirmar)."""
     try:
-        integrations = db.query(Integration).filter(Integration.event_type == event_type, Integration.active == True).all()
-        for integration in integrations:
-            try:
-                response = requests.post(integration.webhook_url, json=payload, timeout=5)
-                if response.status_code == 200:
-                    integration.last_triggered = datetime.utcnow()
-                    db.commit()
-                    logger.info(f"Webhook disparado para integración ID {integration.id}")
-                else:
-                    logger.warning(f"Webhook falló para integración ID {integration.id}: {response.status_code}")
-            except Exception as e:
-                logger.error(f"Error al disparar webhook ID {integration.id}: {str(e)}")
+        enqueue_webhook(db, event_type, payload)
+        db.commit()
     except Exception as e:
+        db.rollback()
         logger.error(f"Error al procesar webhooks para event_type {event_type}: {str(e)}")
-        raise HTTPException(status_code=500, detail="Error al procesar webhooks")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Error al procesar webhooks")
+
+def get_webhook_deliveries(db: Session, status: str = None, limit: int = 100):
+    query = db.query(WebhookDelivery)
+    if status:
+        query = query.filter(WebhookDelivery.status == status)
+    return query.order_by(WebhookDelivery.id.desc()).limit(limit).all()
+
+def retry_webhook_delivery(db: Session, delivery_id: int):
+    delivery = db.query(WebhookDelivery).filter(WebhookDelivery.id == delivery_id).first()
+    if not delivery:
+        raise HTTPException(status_code=404, detail="Entrega no encontrada")
+    if delivery.status == "delivering":
+        raise HTTPException(status_code=409, detail="La entrega está en curso")
+    delivery.status = "pending"
+    delivery.attempts = 0
+    delivery.next_attempt_at = datetime.utcnow()
+    db.commit()
+    db.refresh(delivery)
+    logger.info(f"Entrega de webhook {delivery_id} reencolada")
+    return delivery
@@ -0,0 +1,279 @@
+# backend/services/kpi_service.py
+# KPIs del SaaS calculados a partir de agregados diarios (kpi_daily_rollups) o en directo
+import time as clock
+from datetime import date, datetime, time, timedelta
+from threading import Lock
+from sqlalchemy import case, delete, func, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from core.config import settings
+from core.logging import configure_logging
+from models.credit_transaction import CreditTransaction
+from models.kpi_rollup import KpiDailyRollup
+from models.user import User, subscriptionEnum
+
+logger = configure_logging()
+
+PAID_SUBSCRIPTIONS = [subscriptionEnum.PREMIUM, subscriptionEnum.CORPORATE]
+
+# Caché del resultado del panel: un único cálculo por TTL aunque refresquen muchos administradores
+_kpi_cache: dict | None = None
+_kpi_expires_at = 0.0
+_kpi_flight_lock = Lock()  # Sólo un cálculo en curso por proceso
+
+
+def _as_date(value) -> date:
+    # func.date() devuelve str en SQLite y date en MariaDB/MySQL
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    return value
+
+
+SNAPSHOT_COLUMNS = ("total_users", "paying_users", "churned_users", "total_credits", "dau", "wau", "mau")
+
+
+def _count_if(condition):
+    return func.sum(case((condition, 1), else_=0))
+
+
+def _user_snapshot(db: Session, now: datetime) -> dict:
+    """Estado de usuarios en una sola pasada (agregación condicional sobre usuarios)."""
+    month_start = datetime.combine(now.date().replace(day=1), time.min)
+    is_paid = User.subscription.in_(PAID_SUBSCRIPTIONS)
+    row = db.execute(select(
+        func.count(User.id).label("total_users"),
+        _count_if(User.subscription != subscriptionEnum.FREEMIUM).label("paying_users"),
+        _count_if(is_paid & (User.last_login < now - timedelta(days=60))).label("churned_users"),
+        func.coalesce(func.sum(User.credits), 0).label("total_credits"),
+        _count_if(User.last_login >= now - timedelta(days=1)).label("dau"),
+        _count_if(User.last_login >= now - timedelta(days=7)).label("wau"),
+        _count_if(User.last_login >= now - timedelta(days=30)).label("mau"),
+        _count_if(User.create_at >= month_start).label("new_users_month"),
+        _count_if(is_paid & (User.create_at >= month_start)).label("conversions_month"),
+    )).one()
+    return {key: int(value or 0) for key, value in row._mapping.items()}
+
+
+def refresh_kpi_rollups(db: Session, since: date | None = None) -> dict:
+    """
+    Recalcula los agregados desde since (por defecto, el último día ya agregado, que pudo quedar
+    incompleto) hasta hoy. Cada fuente se agrega con un único GROUP BY por día sobre el índice temporal.
+    active_users sale de users.last_login, que sólo guarda el último acceso: un día cerrado nunca
+    baja del valor ya guardado (cada usuario que vuelve a entrar lo restaría), y la foto de
+    usuarios de los días cerrados se conserva tal como se tomó.
+    """
+    now = datetime.utcnow()
+    today = now.date()
+    if since is None:
+        since = db.query(func.max(KpiDailyRollup.day)).scalar()
+    if since is None:
+        earliest = [
+            db.query(func.min(User.create_at)).scalar(),
+            db.query(func.min(CreditTransaction.timestamp)).scalar(),
+        ]
+        earliest = [e for e in earliest if e is not None]
+        since = min(earliest).date() if earliest else today
+    since = _as_date(since)
+    since_dt = datetime.combine(since, time.min)
+    stored = {
+        _as_date(row.day): row
+        for row in db.execute(select(KpiDailyRollup.__table__).where(KpiDailyRollup.day >= since))
+    }
+
+    days = {}
+    def day_row(day):
+        return days.setdefault(_as_date(day), {
+            "new_users": 0, "active_users": 0, "conversions": 0,
+            "payments": 0, "revenue": 0.0, "credits_used": 0,
+        })
+
+    is_payment = (
+        (CreditTransaction.transaction_type == "payment")
+        & (CreditTransaction.payment_status == "success")
+        & (CreditTransaction.user_type == "registered")
+    )
+    tx_day = func.date(CreditTransaction.timestamp)
+    for day, payments, revenue, credits_used in db.execute(
+        select(
+            tx_day,
+            func.sum(case((is_payment, 1), else_=0)),
+            func.sum(case((is_payment, func.coalesce(CreditTransaction.payment_amount, 0)), else_=0)),
+            func.sum(case((CreditTransaction.transaction_type == "usage", 1), else_=0)),
+        ).where(CreditTransaction.timestamp >= since_dt).group_by(tx_day)
+    ):
+        row = day_row(day)
+        row.update(payments=int(payments or 0), revenue=float(revenue or 0), credits_used=int(credits_used or 0))
+
+    signup_day = func.date(User.create_at)
+    for day, new_users, conversions in db.execute(
+        select(
+            signup_day,
+            func.count(User.id),
+            func.sum(case((User.subscription.in_(PAID_SUBSCRIPTIONS), 1), else_=0)),
+        ).where(User.create_at >= since_dt).group_by(signup_day)
+    ):
+        day_row(day).update(new_users=int(new_users or 0), conversions=int(conversions or 0))
+
+    login_day = func.date(User.last_login)
+    for day, active_users in db.execute(
+        select(login_day, func.count(User.id)).where(User.last_login >= since_dt).group_by(login_day)
+    ):
+        day_row(day)["active_users"] = int(active_users or 0)
+
+    snapshot = _user_snapshot(db, now)
+    rows = []
+    current = since
+    while current <= today:
+        row = {"day": current, "updated_at": now, **day_row(current)}
+        previous = stored.get(current)
+        if previous is not None:
+            row["active_users"] = max(row["active_users"], previous.active_users or 0)
+        if current == today:
+            row.update({key: snapshot[key] for key in SNAPSHOT_COLUMNS})
+        elif previous is not None:
+            row.update({key: getattr(previous, key) or 0 for key in SNAPSHOT_COLUMNS})
+        rows.append(row)
+        current += timedelta(days=1)
+
+    # Sustituir el rango recalculado; los días anteriores a since quedan intactos
+    try:
+        db.execute(delete(KpiDailyRollup).where(KpiDailyRollup.day >= since))
+        db.execute(insert(KpiDailyRollup), rows)
+        db.commit()
+    except IntegrityError:
+        # Otro proceso ha recalculado el mismo rango a la vez; sus filas son equivalentes
+        db.rollback()
+        logger.info(f"Agregados de KPIs desde {since} ya recalculados por otro proceso")
+        return {"since": since.isoformat(), "days": 0}
+    invalidate_kpi_cache()
+    logger.info(f"Agregados de KPIs recalculados desde {since} ({len(rows)} días)")
+    return {"since": since.isoformat(), "days": len(rows)}
+
+
+def _latest_rollup(db: Session) -> KpiDailyRollup | None:
+    return db.query(KpiDailyRollup).order_by(KpiDailyRollup.day.desc()).first()
+
+
+def _transaction_totals(db: Session, now: datetime) -> dict:
+    """Ingresos y consumo del ledger en una sola pasada (agregación condicional)."""
+    month_start = datetime.combine(now.date().replace(day=1), time.min)
+    is_payment = (
+        (CreditTransaction.transaction_type == "payment")
+        & (CreditTransaction.payment_status == "success")
+        & (CreditTransaction.user_type == "registered")
+    )
+    amount = func.coalesce(CreditTransaction.payment_amount, 0)
+    row = db.execute(select(
+        func.sum(case((is_payment, amount), else_=0)).label("total_revenue"),
+        func.sum(case((is_payment & (CreditTransaction.timestamp >= month_start), amount), else_=0)).label("mrr"),
+        _count_if(CreditTransaction.transaction_type == "usage").label("credits_used"),
+    )).one()
+    return {
+        "total_revenue": float(row.total_revenue or 0),
+        "mrr": float(row.mrr or 0),
+        "credits_used": int(row.credits_used or 0),
+    }
+
+
+def _live_kpis(db: Session, now: datetime) -> tuple[dict, dict]:
+    """Dos consultas: una sobre usuarios y otra sobre el ledger."""
+    return _user_snapshot(db, now), _transaction_totals(db, now)
+
+
+def _rollup_kpis(db: Session, now: datetime) -> tuple[dict, dict]:
+    # Sólo lectura: los agregados los mantiene la tarea programada refresh_kpis (tasks.py)
+    latest = _latest_rollup(db)
+    if latest is None:
+        logger.warning("Sin agregados de KPIs todavía; se calculan en directo")
+        return _live_kpis(db, now)
+
+    month_start = now.date().replace(day=1)
+    row = db.execute(select(
+        func.sum(case((KpiDailyRollup.day >= month_start, KpiDailyRollup.new_users), else_=0)).label("new_users_month"),
+        func.sum(case((KpiDailyRollup.day >= month_start, KpiDailyRollup.conversions), else_=0)).label("conversions_month"),
+        func.sum(case((KpiDailyRollup.day >= month_start, KpiDailyRollup.revenue), else_=0)).label("mrr"),
+        func.sum(KpiDailyRollup.revenue).label("total_revenue"),
+        func.sum(KpiDailyRollup.credits_used).label("credits_used"),
+    )).one()
+    users = {key: getattr(latest, key) or 0 for key in SNAPSHOT_COLUMNS}
+    users.update(new_users_month=int(row.new_users_month or 0), conversions_month=int(row.conversions_month or 0))
+    transactions = {
+        "total_revenue": float(row.total_revenue or 0),
+        "mrr": float(row.mrr or 0),
+        "credits_used": int(row.credits_used or 0),
+        "rollup_updated_at": latest.updated_at.isoformat(),
+    }
+    return users, transactions
+
+
+def compute_saas_kpis(db: Session, source: str | None = None) -> dict:
+    """
+    KPIs del panel de administración. source="rollup" (por defecto, KPI_SOURCE) lee los agregados
+    diarios; source="live" calcula sobre usuarios y ledger con dos consultas de una sola pasada.
+    """
+    now = datetime.utcnow()
+    source = source or settings.KPI_SOURCE
+    users, transactions = _rollup_kpis(db, now) if source == "rollup" else _live_kpis(db, now)
+
+    total_users = users["total_users"]
+    paying_users = users["paying_users"]
+    churned_users = users["churned_users"]
+    mrr = transactions["mrr"]
+    arr = mrr * 12
+
+    # ARPU y LTV
+    arpu = mrr / paying_users if paying_users else 0
+    churn_rate = churned_users / paying_users if paying_users else 0
+    ltv = arpu / churn_rate if churn_rate else 0
+
+    # Conversión
+    conversion_rate = users["conversions_month"] / total_users if total_users else 0
+
+    result = {
+        "total_users": total_users,
+        "active_users_30d": users["mau"],
+        "new_users_month": users["new_users_month"],
+        "paying_users": paying_users,
+        "mrr": round(mrr, 2),
+        "arr": round(arr, 2),
+        "total_revenue": round(transactions["total_revenue"], 2),
+        "arpu": round(arpu, 2),
+        "ltv": round(ltv, 2),
+        "churn_rate": round(churn_rate, 4),
+        "churned_users": churned_users,
+        "conversion_rate": round(conversion_rate, 4),
+        "total_credits": users["total_credits"],
+        "credits_used": transactions["credits_used"],
+        "dau": users["dau"],
+        "wau": users["wau"],
+        "mau": users["mau"],
+        "source": source,
+        "computed_at": now.isoformat(),
+    }
+    if "rollup_updated_at" in transactions:
+        result["rollup_updated_at"] = transactions["rollup_updated_at"]
+    return result
+
+
+def invalidate_kpi_cache() -> None:
+    global _kpi_cache, _kpi_expires_at
+    _kpi_cache = None
+    _kpi_expires_at = 0.0
+
+
+def get_saas_kpis(db: Session) -> dict:
+    """
+    KPIs cacheados KPI_CACHE_TTL segundos. El cálculo es de vuelo único: si varias peticiones
+    llegan con la caché caducada, una calcula y el resto espera y reutiliza su resultado.
+    """
+    global _kpi_cache, _kpi_expires_at
+    if _kpi_cache is not None and clock.monotonic() < _kpi_expires_at:
+        return _kpi_cache
+    with _kpi_flight_lock:
+        if _kpi_cache is not None and clock.monotonic() < _kpi_expires_at:
+            return _kpi_cache
+        result = compute_saas_kpis(db)
+        _kpi_cache, _kpi_expires_at = result, clock.monotonic() + settings.KPI_CACHE_TTL
+        return result
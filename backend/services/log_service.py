@@ -1,20 +1,200 @@
 # backend/services/log_service.py
 # Servicio para limpiar logs de API y errores
 
+import hashlib
+import json
+import random
+from datetime import datetime
+from sqlalchemy import bindparam, desc, insert, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from core.background import BatchWriter
+from core.config import settings
+from core.database import SessionLocal
 from models.log import APILog  # Ajusta la ruta si es diferente
-from models.error_log import ErrorLog  # Ajusta la ruta si es diferente
+from models.error_log import ErrorLog, ErrorGroup  # Ajusta la ruta si es diferente
+from services.retention_service import truncate_table
 
 def clear_api_logs(db: Session) -> None:
     """
     Elimina todos los logs de la API de la base de datos.
     """
-    db.query(APILog).delete()
+    truncate_table(db, APILog)
     db.commit()
 
 def clear_error_logs(db: Session) -> None:
     """
     Elimina todos los errores registrados de la base de datos.
     """
-    db.query(ErrorLog).delete()
-    db.commit()
\ No newline at end of file
+    truncate_table(db, ErrorLog)
+    truncate_table(db, ErrorGroup)
+    db.commit()
+
+def error_fingerprint(error_code: int, route: str | None, message: str) -> str:
+    return hashlib.sha1(f"{error_code}|{route or ''}|{message}".encode()).hexdigest()
+
+def _reservoir_add(samples: list, seen: int, sample: dict) -> None:
+    """Muestreo de reservorio (algoritmo R): seen es el total de ocurrencias incluida ésta."""
+    if len(samples) < settings.ERROR_GROUP_SAMPLE_SIZE:
+        samples.append(sample)
+    else:
+        slot = random.randrange(seen)
+        if slot < settings.ERROR_GROUP_SAMPLE_SIZE:
+            samples[slot] = sample
+
+def _aggregate_error_groups(db: Session, rows: list) -> None:
+    groups = {}
+    for row in rows:
+        group = groups.setdefault(row["fingerprint"], {
+            "error_code": row["error_code"], "route": row["route"], "message": row["message"],
+            "count": 0, "first_seen": row["created_at"], "last_seen": row["created_at"], "occurrences": [],
+        })
+        group["count"] += 1
+        group["last_seen"] = max(group["last_seen"], row["created_at"])
+        group["occurrences"].append({
+            "url": row["url"], "method": row["method"], "ip_address": row["ip_address"],
+            "details": row["details"], "at": row["created_at"].isoformat(),
+        })
+
+    existing = {
+        g.fingerprint: g for g in db.query(ErrorGroup.id, ErrorGroup.fingerprint, ErrorGroup.count, ErrorGroup.samples)
+        .filter(ErrorGroup.fingerprint.in_(list(groups))).all()
+    }
+    updates, inserts = [], []
+    for fingerprint, group in groups.items():
+        current = existing.get(fingerprint)
+        seen = current.count if current else 0
+        samples = json.loads(current.samples) if current and current.samples else []
+        for occurrence in group["occurrences"]:
+            seen += 1
+            _reservoir_add(samples, seen, occurrence)
+        if current:
+            updates.append({"b_id": current.id, "b_count": group["count"],
+                            "b_last_seen": group["last_seen"], "b_samples": json.dumps(samples)})
+        else:
+            inserts.append({"fingerprint": fingerprint, "error_code": group["error_code"], "route": group["route"],
+                            "message": group["message"], "count": group["count"], "first_seen": group["first_seen"],
+                            "last_seen": group["last_seen"], "samples": json.dumps(samples)})
+
+    if updates:
+        # count se incrementa en SQL para no perder ocurrencias si otro worker vuelca a la vez
+        table = ErrorGroup.__table__
+        db.execute(
+            update(table).where(table.c.id == bindparam("b_id")).values(
+                count=table.c.count + bindparam("b_count"),
+                last_seen=bindparam("b_last_seen"),
+                samples=bindparam("b_samples"),
+            ),
+            updates,
+        )
+    if inserts:
+        db.execute(insert(ErrorGroup), inserts)
+
+def _flush_error_logs(rows: list) -> None:
+    """Agrega el lote en error_groups y guarda en error_logs sólo los errores graves."""
+    for attempt in range(2):
+        db = SessionLocal()
+        try:
+            _aggregate_error_groups(db, rows)
+            raw = [
+                {k: row[k] for k in ("user_id", "session_id", "user_type", "error_code", "message",
+                                     "details", "url", "method", "ip_address", "created_at")}
+                for row in rows if row["error_code"] >= settings.ERROR_LOG_RAW_MIN_STATUS
+            ]
+            if raw:
+                db.execute(insert(ErrorLog), raw)  # executemany
+            db.commit()
+            return
+        except IntegrityError:
+            # Otro worker creó el mismo grupo a la vez: al reintentar ya existe y se incrementa
+            db.rollback()
+            if attempt:
+                raise
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+def get_error_groups(db: Session, sort: str = "count", limit: int = 50) -> list[dict]:
+    order = desc(ErrorGroup.last_seen) if sort == "recent" else desc(ErrorGroup.count)
+    groups = db.query(ErrorGroup).order_by(order).limit(limit).all()
+    return [
+        {
+            "id": g.id,
+            "fingerprint": g.fingerprint,
+            "error_code": g.error_code,
+            "route": g.route,
+            "message": g.message,
+            "count": g.count,
+            "first_seen": g.first_seen,
+            "last_seen": g.last_seen,
+            "samples": json.loads(g.samples) if g.samples else [],
+        }
+        for g in groups
+    ]
+
+def _flush_api_logs(rows: list) -> None:
+    db = SessionLocal()
+    try:
+        db.execute(insert(APILog), rows)  # executemany
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+api_log_writer = BatchWriter(
+    "api_logs",
+    _flush_api_logs,
+    max_batch=settings.API_LOG_BATCH_SIZE,
+    flush_interval=settings.API_LOG_FLUSH_INTERVAL,
+    max_queue=settings.API_LOG_MAX_QUEUE,
+)
+
+error_log_writer = BatchWriter(
+    "error_logs",
+    _flush_error_logs,
+    max_batch=settings.ERROR_LOG_BATCH_SIZE,
+    flush_interval=settings.ERROR_LOG_FLUSH_INTERVAL,
+    max_queue=settings.ERROR_LOG_MAX_QUEUE,
+)
+_sampled_out = 0
+
+def record_error(error_code: int, message: str, url: str = None, method: str = None,
+                 ip_address: str = None, details: str = None, route: str = None) -> bool:
+    """
+    Encola un error para agregarlo en lote en error_groups por su huella (código + plantilla de
+    ruta + mensaje); nunca espera a la base de datos.
+    Si la cola pasa de la mitad de su capacidad, los 4xx se muestrean con ERROR_LOG_SAMPLE_RATE
+    (los 5xx se conservan siempre); con la cola llena se descartan. Devuelve False si no se encola.
+    """
+    global _sampled_out
+    if error_code < 500 and error_log_writer.pending() >= settings.ERROR_LOG_MAX_QUEUE // 2 \
+            and random.random() >= settings.ERROR_LOG_SAMPLE_RATE:
+        _sampled_out += 1
+        return False
+    message = str(message)[:255]
+    return error_log_writer.submit({
+        "fingerprint": error_fingerprint(error_code, route, message),
+        "route": route[:255] if route else None,
+        "user_id": None,
+        "session_id": None,
+        "user_type": "anonymous",
+        "error_code": error_code,
+        "message": message,
+        "details": details,
+        "url": url[:255] if url else None,
+        "method": method,
+        "ip_address": ip_address,
+        "created_at": datetime.utcnow(),
+    })
+
+def get_error_log_metrics() -> dict:
+    return {
+        "pending": error_log_writer.pending(),
+        "max_queue": error_log_writer.max_queue,
+        "sampled_out": _sampled_out,
+        **error_log_writer.metrics,
+    }
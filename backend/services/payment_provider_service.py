@@ -4,6 +4,7 @@
 from sqlalchemy.orm import Session
 from models.payment_provider import PaymentProvider
 from schemas.payment import PaymentProviderCreate
+from services.reference_cache import payment_provider_cache
 from fastapi import HTTPException
 
 def create_payment_provider(db: Session, provider: PaymentProviderCreate):
@@ -14,10 +15,11 @@ def create_payment_provider(db: Session, provider: PaymentProviderCreate):
     db.add(db_provider)
     db.commit()
     db.refresh(db_provider)
+    payment_provider_cache.invalidate()
     return db_provider
 
 def get_payment_providers(db: Session):
-    return db.query(PaymentProvider).all()
+    return payment_provider_cache.all(db)
 
 def update_payment_provider(db: Session, provider_id: int, provider_update: PaymentProviderCreate):
     provider = db.query(PaymentProvider).filter(PaymentProvider.id == provider_id).first()
@@ -27,6 +29,7 @@ def update_payment_provider(db: Session, provider_id: int, provider_update: Paym
         setattr(provider, key, value)
     db.commit()
     db.refresh(provider)
+    payment_provider_cache.invalidate()
     return provider
 
 def delete_payment_provider(db: Session, provider_id: int):
@@ -35,4 +38,5 @@ def delete_payment_provider(db: Session, provider_id: int):
         raise HTTPException(status_code=404, detail="Payment provider not found")
     db.delete(provider)
     db.commit()
+    payment_provider_cache.invalidate()
     return {"message": "Payment provider deleted"}
\ No newline at end of file
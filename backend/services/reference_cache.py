@@ -0,0 +1,63 @@
+# backend/services/reference_cache.py
+# Caché en memoria de datos de referencia (tipos de evento, badges, tipos de cupón, proveedores de pago)
+import time
+from threading import Lock
+from types import SimpleNamespace
+from typing import List, Optional
+from sqlalchemy.orm import Session
+from core.config import settings
+from models.coupon_type import CouponType
+from models.gamification import Badge, EventType
+from models.payment_provider import PaymentProvider
+
+
+class ReferenceCache:
+    """
+    Tabla pequeña y de lectura frecuente cargada entera en memoria, indexada por id y por nombre.
+    Las filas se guardan como copias desacopladas de la sesión (SimpleNamespace con las columnas),
+    así que se pueden compartir entre peticiones y serializar con from_attributes.
+    El CRUD correspondiente llama a invalidate(); el TTL cubre los cambios hechos por otros procesos.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self._columns = [column.key for column in model.__table__.columns]
+        self._lock = Lock()
+        self._by_id: dict | None = None
+        self._by_name: dict = {}
+        self._loaded_at = 0.0
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._by_id = None
+
+    def _ensure(self, db: Session) -> dict:
+        by_id = self._by_id
+        if by_id is not None and time.monotonic() - self._loaded_at < settings.REFERENCE_CACHE_TTL:
+            return by_id
+        with self._lock:
+            if self._by_id is None or time.monotonic() - self._loaded_at >= settings.REFERENCE_CACHE_TTL:
+                rows = [
+                    SimpleNamespace(**{column: getattr(row, column) for column in self._columns})
+                    for row in db.query(self.model).order_by(self.model.id)
+                ]
+                self._by_name = {row.name: row for row in rows}
+                self._by_id = {row.id: row for row in rows}
+                self._loaded_at = time.monotonic()
+            return self._by_id
+
+    def get(self, db: Session, row_id: int) -> Optional[SimpleNamespace]:
+        return self._ensure(db).get(row_id)
+
+    def get_by_name(self, db: Session, name: str) -> Optional[SimpleNamespace]:
+        self._ensure(db)
+        return self._by_name.get(name)
+
+    def all(self, db: Session) -> List[SimpleNamespace]:
+        return list(self._ensure(db).values())
+
+
+event_type_cache = ReferenceCache(EventType)
+badge_cache = ReferenceCache(Badge)
+coupon_type_cache = ReferenceCache(CouponType)
+payment_provider_cache = ReferenceCache(PaymentProvider)
@@ -0,0 +1,206 @@
+# backend/services/retention_service.py
+# Retención por periodos de las tablas de sólo inserción (logs, errores, eventos, ledger)
+#
+# En MariaDB/MySQL las tablas se particionan por RANGE (TO_DAYS(columna)) en periodos diarios o
+# mensuales: purgar es DROP PARTITION y preparar los periodos futuros es REORGANIZE de pmax.
+# La conversión es explícita (enable_partitioning) porque exige cambiar la clave primaria y
+# eliminar las claves foráneas de la tabla, que InnoDB no admite en tablas particionadas.
+# En el resto de motores (SQLite) o en tablas aún sin particionar se purga por lotes acotados
+# usando el índice temporal, sin bloquear la tabla completa.
+import time
+from datetime import date, datetime, timedelta
+from sqlalchemy import UniqueConstraint, delete, select, text
+from sqlalchemy.orm import Session
+from core.config import settings
+from core.logging import configure_logging
+from models.log import APILog
+from models.error_log import ErrorLog
+from models.gamification import GamificationEvent, GamificationHourlyCount
+from models.credit_transaction import CreditTransaction
+
+logger = configure_logging()
+
+# tabla -> (modelo, columna temporal, granularidad, días de retención; 0 = conservar siempre)
+RETENTION_POLICIES = {
+    "api_logs": (APILog, "timestamp", "daily", settings.API_LOG_RETENTION_DAYS),
+    "error_logs": (ErrorLog, "created_at", "daily", settings.ERROR_LOG_RETENTION_DAYS),
+    "gamification_events": (GamificationEvent, "timestamp", "monthly", settings.GAMIFICATION_EVENT_RETENTION_DAYS),
+    "credit_transactions": (CreditTransaction, "timestamp", "monthly", settings.CREDIT_TRANSACTION_RETENTION_DAYS),
+    "gamification_hourly_counts": (GamificationHourlyCount, "bucket_start", "daily", settings.GAMIFICATION_BUCKET_RETENTION_DAYS),
+}
+
+# TO_DAYS() de MySQL cuenta desde el año 0: TO_DAYS(d) == d.toordinal() + 365
+_TO_DAYS_OFFSET = 365
+
+
+def _is_mysql(db: Session) -> bool:
+    return db.get_bind().dialect.name in ("mysql", "mariadb")
+
+
+def _period_start(day: date, granularity: str) -> date:
+    return day.replace(day=1) if granularity == "monthly" else day
+
+
+def _next_period(start: date, granularity: str) -> date:
+    if granularity == "monthly":
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def _partition_name(start: date, granularity: str) -> str:
+    return start.strftime("p%Y%m" if granularity == "monthly" else "p%Y%m%d")
+
+
+def _partition_clause(start: date, granularity: str) -> str:
+    upper = _next_period(start, granularity)
+    return f"PARTITION {_partition_name(start, granularity)} VALUES LESS THAN (TO_DAYS('{upper.isoformat()}'))"
+
+
+def _list_partitions(db: Session, table: str) -> list[tuple[str, date | None]]:
+    """Particiones de la tabla con su límite superior (None para MAXVALUE); vacío si no está particionada."""
+    rows = db.execute(text(
+        "SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND PARTITION_NAME IS NOT NULL "
+        "ORDER BY PARTITION_ORDINAL_POSITION"
+    ), {"table": table}).all()
+    partitions = []
+    for name, description in rows:
+        if description is None or description.upper() == "MAXVALUE":
+            partitions.append((name, None))
+        else:
+            partitions.append((name, date.fromordinal(int(description) - _TO_DAYS_OFFSET)))
+    return partitions
+
+
+def _maintain_partitions(db: Session, table: str, granularity: str, cutoff: date | None) -> dict:
+    partitions = _list_partitions(db, table)
+    dropped = [name for name, upper in partitions if upper is not None and cutoff is not None and upper <= cutoff]
+    if dropped:
+        db.execute(text(f"ALTER TABLE {table} DROP PARTITION {', '.join(dropped)}"))
+
+    # Preparar los periodos futuros partiendo pmax, para que nunca se acumulen filas en él
+    bounds = [upper for _, upper in partitions if upper is not None]
+    start = max(bounds) if bounds else _period_start(date.today(), granularity)
+    horizon = _period_start(date.today(), granularity)
+    for _ in range(settings.RETENTION_PARTITIONS_AHEAD):
+        horizon = _next_period(horizon, granularity)
+    created = []
+    while start <= horizon:
+        created.append(start)
+        start = _next_period(start, granularity)
+    if created:
+        clauses = ", ".join(_partition_clause(s, granularity) for s in created)
+        db.execute(text(
+            f"ALTER TABLE {table} REORGANIZE PARTITION pmax INTO "
+            f"({clauses}, PARTITION pmax VALUES LESS THAN MAXVALUE)"
+        ))
+    return {"mode": "partitions", "dropped": len(dropped), "created": len(created)}
+
+
+def _purge_in_chunks(db: Session, model, column_name: str, cutoff: datetime) -> dict:
+    """Borra por lotes de clave primaria para que cada transacción sea corta y no bloquee la tabla."""
+    column = getattr(model, column_name)
+    chunk_size = settings.RETENTION_CHUNK_SIZE
+    deleted = 0
+    while True:
+        ids = db.execute(
+            select(model.id).where(column < cutoff).order_by(model.id).limit(chunk_size)
+        ).scalars().all()
+        if not ids:
+            break
+        db.execute(delete(model).where(model.id.in_(ids)), execution_options={"synchronize_session": False})
+        db.commit()
+        deleted += len(ids)
+        if len(ids) < chunk_size:
+            break
+    return {"mode": "delete", "deleted": deleted}
+
+
+def apply_retention(db: Session, table: str) -> dict:
+    model, column_name, granularity, retention_days = RETENTION_POLICIES[table]
+    started = time.perf_counter()
+    cutoff = None
+    if retention_days > 0:
+        # Sólo se eliminan periodos completos anteriores al límite
+        cutoff = _period_start(date.today() - timedelta(days=retention_days), granularity)
+
+    if _is_mysql(db) and _list_partitions(db, table):
+        result = _maintain_partitions(db, table, granularity, cutoff)
+    elif cutoff is not None:
+        result = _purge_in_chunks(db, model, column_name, datetime.combine(cutoff, datetime.min.time()))
+    else:
+        result = {"mode": "none"}
+    result.update({
+        "table": table,
+        "retention_days": retention_days,
+        "cutoff": cutoff.isoformat() if cutoff else None,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+    })
+    logger.info(f"Retención aplicada a {table}: {result}")
+    return result
+
+
+def apply_retention_policies(db: Session) -> list[dict]:
+    results = []
+    for table in RETENTION_POLICIES:
+        try:
+            results.append(apply_retention(db, table))
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error aplicando retención a {table}: {str(e)}")
+            results.append({"table": table, "error": str(e)})
+    return results
+
+
+def enable_partitioning(db: Session, table: str) -> dict:
+    """
+    Convierte una tabla de MariaDB/MySQL en particionada por periodos (operación de mantenimiento).
+    Elimina sus claves foráneas y amplía la clave primaria con la columna temporal.
+    """
+    if not _is_mysql(db):
+        raise ValueError("El particionado nativo sólo está disponible en MariaDB/MySQL")
+    model, column_name, granularity, _ = RETENTION_POLICIES[table]
+    if _list_partitions(db, table):
+        return {"table": table, "partitioned": True, "changed": False}
+    # InnoDB exige que toda clave única incluya la columna de partición
+    unique_keys = [constraint.columns for constraint in model.__table__.constraints
+                   if isinstance(constraint, UniqueConstraint)]
+    unique_keys += [index.columns for index in model.__table__.indexes if index.unique]
+    blocking = [", ".join(c.name for c in columns) for columns in unique_keys if column_name not in columns]
+    if blocking:
+        raise ValueError(f"{table} no se puede particionar: claves únicas sin {column_name} ({'; '.join(blocking)}); "
+                         f"se purga por lotes")
+
+    foreign_keys = db.execute(text(
+        "SELECT CONSTRAINT_NAME FROM information_schema.REFERENTIAL_CONSTRAINTS "
+        "WHERE CONSTRAINT_SCHEMA = DATABASE() AND TABLE_NAME = :table"
+    ), {"table": table}).scalars().all()
+    for name in foreign_keys:
+        db.execute(text(f"ALTER TABLE {table} DROP FOREIGN KEY {name}"))
+
+    oldest = db.execute(select(getattr(model, column_name)).order_by(getattr(model, column_name)).limit(1)).scalar()
+    start = _period_start((oldest or datetime.utcnow()).date(), granularity)
+    current = _period_start(date.today(), granularity)
+    clauses = []
+    while start <= current:
+        clauses.append(_partition_clause(start, granularity))
+        start = _next_period(start, granularity)
+
+    db.execute(text(f"UPDATE {table} SET {column_name} = UTC_TIMESTAMP() WHERE {column_name} IS NULL"))
+    db.execute(text(
+        f"ALTER TABLE {table} MODIFY {column_name} DATETIME NOT NULL, "
+        f"DROP PRIMARY KEY, ADD PRIMARY KEY (id, {column_name}) "
+        f"PARTITION BY RANGE (TO_DAYS({column_name})) "
+        f"({', '.join(clauses)}, PARTITION pmax VALUES LESS THAN MAXVALUE)"
+    ))
+    logger.info(f"Tabla {table} particionada ({granularity}, {len(clauses)} periodos; FKs eliminadas: {foreign_keys})")
+    result = _maintain_partitions(db, table, granularity, None)
+    return {"table": table, "partitioned": True, "changed": True, "dropped_foreign_keys": foreign_keys, **result}
+
+
+def truncate_table(db: Session, model) -> None:
+    """Vacía una tabla completa; en MariaDB/MySQL TRUNCATE evita el DELETE fila a fila."""
+    if _is_mysql(db):
+        db.execute(text(f"TRUNCATE TABLE {model.__tablename__}"))
+    else:
+        db.query(model).delete()
@@ -0,0 +1,149 @@
+# backend/services/revocation_service.py
+# Índice en memoria de tokens revocados: filtro de Bloom + LRU de aciertos confirmados
+import hashlib
+import math
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from threading import Lock
+from sqlalchemy.orm import Session
+from models.token import RevokedToken
+from core.config import settings
+from core.logging import configure_logging
+
+logger = configure_logging()
+
+
+class BloomFilter:
+    """Filtro de Bloom sobre hashes SHA-256 de los tokens."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, digest: bytes):
+        # Doble hashing (Kirsch-Mitzenmacher) a partir de un único digest
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:16], "big") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, digest: bytes) -> None:
+        for pos in self._positions(digest):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, digest: bytes) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(digest))
+
+
+class RevocationIndex:
+    """
+    Responde "¿está revocado este token?" sin ir a la base de datos en el caso común.
+    Un negativo del filtro es definitivo; un positivo se confirma contra revoked_tokens
+    y se guarda en la LRU. Cada worker consulta periódicamente las revocaciones nuevas
+    (marca de agua sobre revoked_at) para propagar las hechas por otros procesos.
+
+    revoked_tokens no tiene una clave monótona, así que cada consulta relee una ventana de
+    REVOCATION_REFRESH_OVERLAP segundos antes de la marca: cubre las filas con revoked_at anterior
+    a su commit. Los tokens de esa ventana se recuerdan para no volver a contarlos en el filtro.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._bloom: BloomFilter | None = None
+        self._confirmed: OrderedDict = OrderedDict()
+        self._high_water_mark: datetime | None = None
+        self._recent: dict[bytes, datetime] = {}  # Tokens ya añadidos dentro de la ventana de relectura
+        self._refreshed_at = 0.0
+
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def _remember(self, digest: bytes) -> None:
+        self._confirmed[digest] = True
+        self._confirmed.move_to_end(digest)
+        while len(self._confirmed) > settings.REVOCATION_LRU_SIZE:
+            self._confirmed.popitem(last=False)
+
+    def rebuild(self, db: Session) -> None:
+        """Reconstruye el filtro a partir de toda la tabla revoked_tokens."""
+        rows = db.query(RevokedToken.token, RevokedToken.revoked_at).all()
+        capacity = max(settings.REVOCATION_BLOOM_CAPACITY, len(rows) * 2)
+        bloom = BloomFilter(capacity, settings.REVOCATION_BLOOM_ERROR_RATE)
+        high_water_mark = None
+        for token, revoked_at in rows:
+            bloom.add(self._digest(token))
+            if revoked_at and (high_water_mark is None or revoked_at > high_water_mark):
+                high_water_mark = revoked_at
+        with self._lock:
+            self._bloom = bloom
+            self._confirmed.clear()
+            self._high_water_mark = high_water_mark
+            self._recent = {}
+            if high_water_mark is not None:
+                window_start = high_water_mark - timedelta(seconds=settings.REVOCATION_REFRESH_OVERLAP)
+                self._recent = {self._digest(token): revoked_at for token, revoked_at in rows
+                                if revoked_at and revoked_at >= window_start}
+            self._refreshed_at = time.monotonic()
+        logger.info(f"Índice de tokens revocados reconstruido con {len(rows)} tokens")
+
+    def refresh(self, db: Session) -> None:
+        """Incorpora las revocaciones registradas por otros workers desde la última consulta."""
+        query = db.query(RevokedToken.token, RevokedToken.revoked_at)
+        if self._high_water_mark is not None:
+            query = query.filter(RevokedToken.revoked_at >= self._high_water_mark
+                                 - timedelta(seconds=settings.REVOCATION_REFRESH_OVERLAP))
+        rows = query.all()
+        with self._lock:
+            for token, revoked_at in rows:
+                digest = self._digest(token)
+                if digest not in self._recent:
+                    self._bloom.add(digest)
+                self._recent[digest] = revoked_at or datetime.utcnow()
+                if revoked_at and (self._high_water_mark is None or revoked_at > self._high_water_mark):
+                    self._high_water_mark = revoked_at
+            if self._high_water_mark is not None:
+                window_start = self._high_water_mark - timedelta(seconds=settings.REVOCATION_REFRESH_OVERLAP)
+                self._recent = {d: at for d, at in self._recent.items() if at >= window_start}
+            self._refreshed_at = time.monotonic()
+            needs_rebuild = self._bloom.count > self._bloom.capacity
+        if needs_rebuild:
+            self.rebuild(db)
+
+    def add(self, token: str) -> None:
+        """Registra localmente un token recién revocado por este worker."""
+        digest = self._digest(token)
+        with self._lock:
+            if self._bloom is not None and digest not in self._recent:
+                self._bloom.add(digest)
+                self._recent[digest] = datetime.utcnow()
+            self._remember(digest)
+
+    def is_revoked(self, db: Session, token: str) -> bool:
+        if self._bloom is None:
+            self.rebuild(db)
+        elif time.monotonic() - self._refreshed_at >= settings.REVOCATION_REFRESH_INTERVAL:
+            self.refresh(db)
+
+        digest = self._digest(token)
+        with self._lock:
+            if digest in self._confirmed:
+                self._confirmed.move_to_end(digest)
+                return True
+            if digest not in self._bloom:
+                return False
+
+        # Posible falso positivo: confirmar contra la base de datos
+        if db.query(RevokedToken.token).filter(RevokedToken.token == token).first():
+            with self._lock:
+                self._remember(digest)
+            return True
+        return False
+
+
+revocation_index = RevocationIndex()
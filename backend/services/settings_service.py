@@ -1,13 +1,68 @@
 # backend/services/settings_service.py
 # Servicio para gestión de configuración del sistema
+import copy
 import json
+import time
+from threading import Lock
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from models.site_settings import SiteSettings
+from core.config import settings as app_settings
 from core.logging import configure_logging
 from fastapi import HTTPException
 
 logger = configure_logging()
 
+# Snapshot en memoria de site_settings compartido por todo el proceso.
+# La versión es (max(updated_at), count) para que otros workers detecten cambios
+# con una sola consulta agregada en lugar de releer y parsear cada ajuste.
+_settings_lock = Lock()
+_settings_cache: dict = {}
+_settings_version: tuple | None = None
+_settings_checked_at: float = 0.0
+
+def _parse_setting_value(value: str):
+    try:
+        return json.loads(value)  # Intentar deserializar como JSON
+    except json.JSONDecodeError:
+        # Si falla, intentar limpiar comillas adicionales y devolver la cadena
+        cleaned_value = value.strip('"')
+        try:
+            return json.loads(cleaned_value)  # Reintentar con el valor limpio
+        except json.JSONDecodeError:
+            return cleaned_value  # Devolver la cadena limpia si no es JSON válido
+
+def _current_settings_version(db: Session) -> tuple:
+    last_update, total = db.query(func.max(SiteSettings.updated_at), func.count(SiteSettings.id)).one()
+    return (last_update, total)
+
+def _load_settings_snapshot(db: Session) -> None:
+    global _settings_cache, _settings_version, _settings_checked_at
+    rows = db.query(SiteSettings.key, SiteSettings.value, SiteSettings.updated_at).all()
+    _settings_cache = {row.key: _parse_setting_value(row.value) for row in rows}
+    _settings_version = (max((row.updated_at for row in rows if row.updated_at), default=None), len(rows))
+    _settings_checked_at = time.monotonic()
+    logger.debug(f"Snapshot de ajustes cargado: {len(rows)} claves")
+
+def _ensure_settings_snapshot(db: Session) -> None:
+    global _settings_checked_at
+    if _settings_version is not None and time.monotonic() - _settings_checked_at < app_settings.SETTINGS_CACHE_TTL:
+        return
+    with _settings_lock:
+        if _settings_version is None:
+            _load_settings_snapshot(db)
+        elif time.monotonic() - _settings_checked_at >= app_settings.SETTINGS_CACHE_TTL:
+            if _current_settings_version(db) != _settings_version:
+                _load_settings_snapshot(db)
+            else:
+                _settings_checked_at = time.monotonic()
+
+def invalidate_settings_cache() -> None:
+    """Descarta el snapshot de ajustes; la siguiente lectura lo recarga desde la base de datos."""
+    global _settings_version
+    with _settings_lock:
+        _settings_version = None
+
 def update_setting(db: Session, admin_id: str, key: str, value: str, description: str = None, tag: str = None):
     try:
         from models.user import User
@@ -25,6 +80,7 @@ def update_setting(db: Session, admin_id: str, key: str, value: str, description
             setting = SiteSettings(key=key, value=value, description=description, tag=tag, updated_by=admin_id)
             db.add(setting)
         db.commit()
+        invalidate_settings_cache()
         logger.info(f"Ajuste {key} actualizado por admin ID {admin_id}")
         return {"key": key, "value": value, "tag": tag}
     except HTTPException as e:
@@ -50,19 +106,10 @@ def get_all_settings(db: Session, admin_id: str):
 
 def get_setting(db: Session, key: str) -> dict | list | int | str | None:
     try:
-        setting = db.query(SiteSettings).filter(SiteSettings.key == key).first()
-        if not setting:
-            return None
-        value = setting.value
-        try:
-            return json.loads(value)  # Intentar deserializar como JSON
-        except json.JSONDecodeError:
-            # Si falla, intentar limpiar comillas adicionales y devolver la cadena
-            cleaned_value = value.strip('"')
-            try:
-                return json.loads(cleaned_value)  # Reintentar con el valor limpio
-            except json.JSONDecodeError:
-                return cleaned_value  # Devolver la cadena limpia si no es JSON válido
+        _ensure_settings_snapshot(db)
+        value = _settings_cache.get(key)
+        # Copia para que quien llama no altere el snapshot compartido
+        return copy.deepcopy(value) if isinstance(value, (dict, list)) else value
     except Exception as e:
         logger.error(f"Error al obtener ajuste {key}: {str(e)}")
         raise HTTPException(status_code=500, detail="Error al obtener ajuste")
@@ -83,6 +130,7 @@ def set_setting(db: Session, key: str, value: any, admin_id: str, description: s
             setting = SiteSettings(key=key, value=serialized_value, description=description)
             db.add(setting)
         db.commit()
+        invalidate_settings_cache()
         logger.info(f"Configuración '{key}' actualizada por admin {admin_id}: {value}")
         return {"key": key, "value": value}
     except HTTPException as e:
@@ -0,0 +1,203 @@
+# backend/services/webhook_dispatcher.py
+# Despachador asíncrono de la outbox de webhooks (asyncio + cliente httpx compartido)
+import asyncio
+import json
+import random
+from datetime import datetime, timedelta
+import httpx
+from sqlalchemy import update
+from core.config import settings
+from core.database import SessionLocal
+from core.logging import configure_logging
+from models.integration import Integration
+from models.webhook_delivery import WebhookDelivery
+
+logger = configure_logging()
+
+CLAIMABLE_STATUSES = ("pending", "delivering")
+
+
+class WebhookDispatcher:
+    """
+    Entrega en segundo plano las filas de webhook_deliveries.
+
+    Cada worker reclama filas vencidas con un UPDATE condicional (así dos workers no envían la
+    misma fila) y las marca "delivering" con un plazo de bloqueo en next_attempt_at; si el worker
+    muere, la fila vuelve a ser reclamable al vencer ese plazo. Los envíos se hacen en paralelo con
+    un límite de concurrencia por integración: sólo se reclaman tantas filas como huecos libres
+    tenga cada integración, de modo que ninguna espera en cola mientras corre su plazo. El resultado
+    sólo se registra si la fila sigue bloqueada con ese mismo plazo. Los fallos se reintentan con
+    backoff exponencial y, agotados WEBHOOK_MAX_ATTEMPTS, la fila queda en "dead".
+    """
+
+    def __init__(self):
+        self._task: asyncio.Task | None = None
+        self._stopping: asyncio.Event | None = None
+        self._client: httpx.AsyncClient | None = None
+        self._active: dict[int, int] = {}  # integration_id -> entregas en curso
+        self._inflight: set[asyncio.Task] = set()
+
+    def _claim_due(self, limit: int, active: dict[int, int]) -> list[dict]:
+        per_integration = settings.WEBHOOK_PER_INTEGRATION_CONCURRENCY
+        saturated = [integration_id for integration_id, count in active.items() if count >= per_integration]
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            query = db.query(
+                WebhookDelivery.id, WebhookDelivery.integration_id, WebhookDelivery.payload,
+                WebhookDelivery.attempts, WebhookDelivery.coalesce_key, WebhookDelivery.coalesced_count,
+                Integration.webhook_url
+            ).join(Integration, Integration.id == WebhookDelivery.integration_id).filter(
+                WebhookDelivery.status.in_(CLAIMABLE_STATUSES),
+                WebhookDelivery.next_attempt_at <= now
+            )
+            if saturated:
+                query = query.filter(WebhookDelivery.integration_id.notin_(saturated))
+            rows = query.order_by(WebhookDelivery.next_attempt_at).limit(limit).all()
+
+            # Cubre el plazo total del envío (WEBHOOK_TIMEOUT) más el registro del resultado.
+            # Sin microsegundos: DATETIME de MariaDB los descarta y _record_result compara por igualdad
+            lease_until = (now + timedelta(seconds=settings.WEBHOOK_TIMEOUT * 2 + settings.WEBHOOK_POLL_INTERVAL)
+                           ).replace(microsecond=0)
+            taken: dict[int, int] = {}
+            claimed = []
+            for row in rows:
+                if active.get(row.integration_id, 0) + taken.get(row.integration_id, 0) >= per_integration:
+                    continue
+                won = db.execute(
+                    update(WebhookDelivery)
+                    .where(WebhookDelivery.id == row.id,
+                           WebhookDelivery.status.in_(CLAIMABLE_STATUSES),
+                           WebhookDelivery.next_attempt_at <= now)
+                    .values(status="delivering", next_attempt_at=lease_until)
+                    .execution_options(synchronize_session=False)
+                ).rowcount == 1
+                if won:
+                    taken[row.integration_id] = taken.get(row.integration_id, 0) + 1
+                    claimed.append({**row._asdict(), "lease_until": lease_until})
+            db.commit()
+            return claimed
+        finally:
+            db.close()
+
+    def _record_result(self, delivery: dict, error: str | None) -> None:
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            attempts = delivery["attempts"] + 1
+            if error is None:
+                values = {"status": "delivered", "attempts": attempts, "delivered_at": now, "last_error": None}
+            elif attempts >= settings.WEBHOOK_MAX_ATTEMPTS:
+                values = {"status": "dead", "attempts": attempts, "last_error": error[:255]}
+                logger.error(f"Webhook {delivery['id']} descartado tras {attempts} intentos: {error}")
+            else:
+                delay = min(settings.WEBHOOK_BACKOFF_BASE * 2 ** (attempts - 1), settings.WEBHOOK_BACKOFF_MAX)
+                delay *= 0.5 + random.random() / 2  # jitter para no sincronizar reintentos
+                values = {"status": "pending", "attempts": attempts, "last_error": error[:255],
+                          "next_attempt_at": now + timedelta(seconds=delay)}
+                logger.warning(f"Webhook {delivery['id']} falló (intento {attempts}), reintento en {delay:.1f}s: {error}")
+            owned = db.execute(
+                update(WebhookDelivery)
+                .where(WebhookDelivery.id == delivery["id"],
+                       WebhookDelivery.status == "delivering",
+                       WebhookDelivery.next_attempt_at == delivery["lease_until"])
+                .values(**values).execution_options(synchronize_session=False)
+            ).rowcount == 1
+            if not owned:
+                # El bloqueo venció y otro worker reclamó la fila: su resultado es el que cuenta
+                db.rollback()
+                logger.warning(f"Webhook {delivery['id']}: bloqueo perdido, resultado descartado")
+                return
+            if error is None:
+                db.execute(update(Integration).where(Integration.id == delivery["integration_id"])
+                           .values(last_triggered=now).execution_options(synchronize_session=False))
+            db.commit()
+        finally:
+            db.close()
+
+    @staticmethod
+    def _build_body(delivery: dict) -> str:
+        if not delivery["coalesce_key"]:
+            return delivery["payload"]
+        # Entrega agrupada: último payload + eventos acumulados en la ventana
+        # (cada credit_usage corresponde a un cargo de un crédito)
+        payload = json.loads(delivery["payload"])
+        payload["credits_consumed"] = delivery["coalesced_count"]
+        payload["coalesced"] = True
+        return json.dumps(payload, default=str)
+
+    async def _deliver(self, delivery: dict) -> None:
+        error = None
+        try:
+            try:
+                # Plazo total: los timeouts de httpx son por fase (connect, write, read, pool) y
+                # sumados podrían superar el bloqueo de la fila
+                response = await asyncio.wait_for(self._client.post(
+                    delivery["webhook_url"], content=self._build_body(delivery),
+                    headers={"Content-Type": "application/json"}
+                ), timeout=settings.WEBHOOK_TIMEOUT)
+                if not 200 <= response.status_code < 300:
+                    error = f"HTTP {response.status_code}"
+            except Exception as e:
+                error = f"{type(e).__name__}: {str(e)}"
+            try:
+                await asyncio.to_thread(self._record_result, delivery, error)
+                if error is None:
+                    logger.info(f"Webhook disparado para integración ID {delivery['integration_id']}")
+            except Exception as e:
+                logger.error(f"Error al registrar la entrega del webhook {delivery['id']}: {str(e)}")
+        finally:
+            integration_id = delivery["integration_id"]
+            self._active[integration_id] -= 1
+            if not self._active[integration_id]:
+                del self._active[integration_id]
+
+    async def _run(self) -> None:
+        while not self._stopping.is_set():
+            claimed = []
+            try:
+                capacity = settings.WEBHOOK_BATCH_SIZE - len(self._inflight)
+                if capacity > 0:
+                    claimed = await asyncio.to_thread(self._claim_due, capacity, dict(self._active))
+                for delivery in claimed:
+                    integration_id = delivery["integration_id"]
+                    self._active[integration_id] = self._active.get(integration_id, 0) + 1
+                    task = asyncio.create_task(self._deliver(delivery))
+                    self._inflight.add(task)
+                    task.add_done_callback(self._inflight.discard)
+            except Exception as e:
+                logger.error(f"Error en el despachador de webhooks: {str(e)}")
+            if claimed and len(claimed) == capacity:
+                await asyncio.sleep(0)  # Hay más trabajo pendiente: seguir sin esperar
+                continue
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=settings.WEBHOOK_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._stopping = asyncio.Event()
+        self._client = httpx.AsyncClient(
+            timeout=settings.WEBHOOK_TIMEOUT,
+            limits=httpx.Limits(max_connections=settings.WEBHOOK_MAX_CONNECTIONS,
+                                max_keepalive_connections=settings.WEBHOOK_MAX_CONNECTIONS),
+        )
+        self._task = asyncio.create_task(self._run())
+        logger.info("Despachador de webhooks iniciado")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stopping.set()
+        await self._task
+        if self._inflight:
+            # Lo que no termine a tiempo se reintentará al vencer su bloqueo
+            await asyncio.wait(self._inflight, timeout=settings.WEBHOOK_TIMEOUT)
+        await self._client.aclose()
+        self._task = None
+        logger.info("Despachador de webhooks detenido")
+
+
+webhook_dispatcher = WebhookDispatcher()
@@ -3,10 +3,15 @@
 
 from datetime import datetime, timedelta
 from celery import Celery
+from celery.schedules import crontab
 from models.guests import GuestsSession
 from core.config import settings
 from core.database import SessionLocal
-from services.credits_service import deduct_credit
+from services.credits_service import deduct_credit, get_renewal_policy, reset_credits
+from services.gamification_compaction import compact_gamification_events as compact_events
+from services.gamification_service import recompute_user_gamification
+from services.kpi_service import refresh_kpi_rollups
+from services.retention_service import apply_retention_policies, enable_partitioning
 
 # Limpieza: todos los imports son usados en este archivo.
 
@@ -27,4 +32,71 @@ def cleanup_anonymous_sessions():
     db = SessionLocal()
     threshold = datetime.utcnow() - timedelta(days=30)
     db.query(GuestsSession).filter(GuestsSession.ultima_actividad < threshold).delete()
-    db.commit()
\ No newline at end of file
+    db.commit()
+
+#  renovar créditos de cuentas inactivas (los usuarios activos se renuevan al acceder):
+
+@celery_app.task
+def reset_dormant_credits():
+    db = SessionLocal()
+    try:
+        return reset_credits(db, **get_renewal_policy(db))
+    finally:
+        db.close()
+
+#  agregados diarios de KPIs (incremental desde el último día agregado):
+
+@celery_app.task
+def refresh_kpis():
+    db = SessionLocal()
+    try:
+        return refresh_kpi_rollups(db)
+    finally:
+        db.close()
+
+#  reparar puntos y badges recalculando desde los eventos:
+
+@celery_app.task
+def recompute_gamification(event_type_id: int = None):
+    db = SessionLocal()
+    try:
+        return recompute_user_gamification(db, event_type_id)
+    finally:
+        db.close()
+
+#  compactar eventos de gamificación antiguos en resúmenes diarios (archivo NDJSON.gz):
+
+@celery_app.task
+def compact_gamification_events(older_than_days: int = None):
+    db = SessionLocal()
+    try:
+        return compact_events(db, older_than_days)
+    finally:
+        db.close()
+
+#  retención de logs, errores, eventos y ledger (DROP PARTITION o borrado por lotes):
+
+@celery_app.task
+def apply_retention():
+    db = SessionLocal()
+    try:
+        return apply_retention_policies(db)
+    finally:
+        db.close()
+
+#  mantenimiento: convertir una tabla a particionada (MariaDB/MySQL, ejecutar una sola vez):
+
+@celery_app.task
+def partition_table(table: str):
+    db = SessionLocal()
+    try:
+        return enable_partitioning(db, table)
+    finally:
+        db.close()
+
+# Tareas periódicas: requieren celery beat (background.sh arranca el worker con -B)
+celery_app.conf.beat_schedule = {
+    "apply-retention": {"task": apply_retention.name, "schedule": crontab(hour=3, minute=0)},
+    "compact-gamification-events": {"task": compact_gamification_events.name, "schedule": crontab(hour=3, minute=30)},
+    "refresh-kpis": {"task": refresh_kpis.name, "schedule": float(settings.KPI_ROLLUP_MAX_AGE)},
+}
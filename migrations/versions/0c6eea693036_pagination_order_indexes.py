@@ -0,0 +1,38 @@
+"""pagination order indexes
+
+Revision ID: 0c6eea693036
+Revises: b1bb8851709e
+Create Date: 2026-10-18 20:02:48.331906
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0c6eea693036'
+down_revision: Union[str, None] = 'b1bb8851709e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Columnas de orden de la paginación por cursor
+INDEXES = (
+    ("ix_sesiones_anonimas_create_at", "sesiones_anonimas", "create_at"),
+    ("ix_coupons_issued_at", "coupons", "issued_at"),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    for name, table, column in INDEXES:
+        if name not in {index["name"] for index in inspector.get_indexes(table)}:
+            op.create_index(name, table, [column])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, _ in INDEXES:
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,42 @@
+"""api log route and latency
+
+Revision ID: 44d29b49386b
+Revises: afd9f9417ac9
+Create Date: 2026-10-18 18:11:40.872315
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '44d29b49386b'
+down_revision: Union[str, None] = 'afd9f9417ac9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Las bases creadas con create_all ya tienen columnas e índice
+    inspector = sa.inspect(op.get_bind())
+    columns = {column["name"] for column in inspector.get_columns("api_logs")}
+    if "route" not in columns:
+        op.add_column("api_logs", sa.Column("route", sa.String(length=255), nullable=True))
+    if "duration_ms" not in columns:
+        op.add_column("api_logs", sa.Column("duration_ms", sa.Float(), nullable=True))
+    if "response_size" not in columns:
+        op.add_column("api_logs", sa.Column("response_size", sa.Integer(), nullable=True))
+    indexes = {index["name"] for index in inspector.get_indexes("api_logs")}
+    if "ix_api_logs_timestamp" not in indexes:
+        op.create_index("ix_api_logs_timestamp", "api_logs", ["timestamp"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_api_logs_timestamp", table_name="api_logs")
+    op.drop_column("api_logs", "response_size")
+    op.drop_column("api_logs", "duration_ms")
+    op.drop_column("api_logs", "route")
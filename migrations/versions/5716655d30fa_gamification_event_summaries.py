@@ -0,0 +1,48 @@
+"""gamification event summaries
+
+Revision ID: 5716655d30fa
+Revises: 7dfdb51defb1
+Create Date: 2026-10-18 20:44:58.062193
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5716655d30fa'
+down_revision: Union[str, None] = '7dfdb51defb1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Las bases creadas con create_all ya tienen la tabla
+    if sa.inspect(op.get_bind()).has_table("gamification_event_summaries"):
+        return
+    op.create_table(
+        "gamification_event_summaries",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("event_type_id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("session_id", sa.String(length=36), nullable=True),
+        sa.Column("events", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["event_type_id"], ["event_types.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["user_id"], ["usuarios.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["session_id"], ["sesiones_anonimas.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("day", "event_type_id", "user_id", name="uq_event_summary_user"),
+        sa.UniqueConstraint("day", "event_type_id", "session_id", name="uq_event_summary_session"),
+    )
+    op.create_index("ix_gamification_event_summaries_id", "gamification_event_summaries", ["id"])
+    op.create_index("ix_gamification_event_summaries_user_id", "gamification_event_summaries", ["user_id"])
+    op.create_index("ix_gamification_event_summaries_session_id", "gamification_event_summaries", ["session_id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("gamification_event_summaries")
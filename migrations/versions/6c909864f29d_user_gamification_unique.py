@@ -0,0 +1,72 @@
+"""user gamification unique progress rows
+
+Revision ID: 6c909864f29d
+Revises: 44d29b49386b
+Create Date: 2026-10-18 18:24:03.519874
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6c909864f29d'
+down_revision: Union[str, None] = '44d29b49386b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CONSTRAINTS = (
+    ("uq_user_gamification_user", "user_id", "registered"),
+    ("uq_user_gamification_session", "session_id", "anonymous"),
+)
+
+
+def _merge_duplicates(bind, owner: str, user_type: str) -> None:
+    """
+    Funde los registros repetidos de (owner, event_type_id) en el de menor id. Cada duplicado ya
+    guardaba el recuento completo (eventos * points_per_event), así que los puntos no se suman:
+    se recalculan desde gamification_events y, si no quedan eventos, se conserva el mayor.
+    """
+    duplicates = bind.execute(sa.text(
+        f"SELECT {owner}, event_type_id, MIN(id), MAX(points) FROM user_gamification "
+        f"WHERE {owner} IS NOT NULL GROUP BY {owner}, event_type_id HAVING COUNT(*) > 1"
+    )).all()
+    for owner_id, event_type_id, keep_id, max_points in duplicates:
+        events, points_per_event = bind.execute(sa.text(
+            f"SELECT COUNT(e.id), MAX(t.points_per_event) FROM event_types t "
+            f"LEFT JOIN gamification_events e ON e.event_type_id = t.id AND e.{owner} = :owner_id "
+            f"WHERE t.id = :event_type_id"
+        ), {"owner_id": owner_id, "event_type_id": event_type_id}).one()
+        points = events * (points_per_event or 0) if events else max_points
+        # Mismo criterio que BadgeIndex.badge_for: el badge de mayor umbral alcanzado
+        badge_id = bind.execute(sa.text(
+            "SELECT id FROM badges WHERE event_type_id = :event_type_id AND required_points <= :points "
+            "AND COALESCE(user_type, 'both') IN (:user_type, 'both') ORDER BY required_points DESC, id DESC LIMIT 1"
+        ), {"event_type_id": event_type_id, "points": points or 0, "user_type": user_type}).scalar()
+        bind.execute(sa.text(
+            "UPDATE user_gamification SET points = :points, badge_id = :badge_id WHERE id = :id"
+        ), {"points": points or 0, "badge_id": badge_id, "id": keep_id})
+        bind.execute(sa.text(
+            f"DELETE FROM user_gamification WHERE {owner} = :owner_id AND event_type_id = :event_type_id AND id <> :id"
+        ), {"owner_id": owner_id, "event_type_id": event_type_id, "id": keep_id})
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    existing = {constraint["name"] for constraint in sa.inspect(bind).get_unique_constraints("user_gamification")}
+    for name, owner, user_type in CONSTRAINTS:
+        if name in existing:
+            continue
+        _merge_duplicates(bind, owner, user_type)
+        with op.batch_alter_table("user_gamification") as batch_op:
+            batch_op.create_unique_constraint(name, [owner, "event_type_id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("user_gamification") as batch_op:
+        for name, _, _ in CONSTRAINTS:
+            batch_op.drop_constraint(name, type_="unique")
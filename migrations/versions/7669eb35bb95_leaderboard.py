@@ -0,0 +1,46 @@
+"""leaderboard
+
+Revision ID: 7669eb35bb95
+Revises: 8fb876b701e1
+Create Date: 2026-10-18 20:21:37.804415
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7669eb35bb95'
+down_revision: Union[str, None] = '8fb876b701e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Las bases creadas con create_all ya tienen la tabla; el arranque la rellena (ensure_leaderboard)
+    if sa.inspect(op.get_bind()).has_table("leaderboard"):
+        return
+    op.create_table(
+        "leaderboard",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("session_id", sa.String(length=36), nullable=True),
+        sa.Column("points", sa.Integer(), nullable=False),
+        sa.Column("badges_count", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["usuarios.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["session_id"], ["sesiones_anonimas.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("user_id"),
+        sa.UniqueConstraint("session_id"),
+    )
+    op.create_index("ix_leaderboard_id", "leaderboard", ["id"])
+    op.create_index("ix_leaderboard_points_id", "leaderboard", ["points", "id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("leaderboard")
@@ -0,0 +1,44 @@
+"""gamification dead events
+
+Revision ID: 7dfdb51defb1
+Revises: f2e746c885b1
+Create Date: 2026-10-18 20:36:12.490871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7dfdb51defb1'
+down_revision: Union[str, None] = 'f2e746c885b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Las bases creadas con create_all ya tienen la tabla
+    if sa.inspect(op.get_bind()).has_table("gamification_dead_events"):
+        return
+    op.create_table(
+        "gamification_dead_events",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("event_type_id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("session_id", sa.String(length=36), nullable=True),
+        sa.Column("timestamp", sa.DateTime(), nullable=False),
+        sa.Column("idempotency_key", sa.String(length=64), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("last_error", sa.String(length=255), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_gamification_dead_events_id", "gamification_dead_events", ["id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("gamification_dead_events")
@@ -0,0 +1,49 @@
+"""kpi daily rollups
+
+Revision ID: 8fb876b701e1
+Revises: 0c6eea693036
+Create Date: 2026-10-18 20:14:05.517362
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8fb876b701e1'
+down_revision: Union[str, None] = '0c6eea693036'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Las bases creadas con create_all ya tienen la tabla
+    if sa.inspect(op.get_bind()).has_table("kpi_daily_rollups"):
+        return
+    op.create_table(
+        "kpi_daily_rollups",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("new_users", sa.Integer(), nullable=True),
+        sa.Column("active_users", sa.Integer(), nullable=True),
+        sa.Column("conversions", sa.Integer(), nullable=True),
+        sa.Column("payments", sa.Integer(), nullable=True),
+        sa.Column("revenue", sa.Float(), nullable=True),
+        sa.Column("credits_used", sa.Integer(), nullable=True),
+        sa.Column("total_users", sa.Integer(), nullable=True),
+        sa.Column("paying_users", sa.Integer(), nullable=True),
+        sa.Column("churned_users", sa.Integer(), nullable=True),
+        sa.Column("total_credits", sa.Integer(), nullable=True),
+        sa.Column("dau", sa.Integer(), nullable=True),
+        sa.Column("wau", sa.Integer(), nullable=True),
+        sa.Column("mau", sa.Integer(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("day"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("kpi_daily_rollups")
@@ -0,0 +1,31 @@
+"""integration coalesce window
+
+Revision ID: afd9f9417ac9
+Revises: 59f373d5b1b3
+Create Date: 2026-10-18 18:05:12.431207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'afd9f9417ac9'
+down_revision: Union[str, None] = '59f373d5b1b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Las bases creadas con create_all ya tienen la columna
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("integrations")}
+    if "coalesce_window" not in columns:
+        op.add_column("integrations", sa.Column("coalesce_window", sa.Integer(), nullable=True, server_default="0"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("integrations", "coalesce_window")
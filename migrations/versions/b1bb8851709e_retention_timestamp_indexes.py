@@ -0,0 +1,39 @@
+"""retention timestamp indexes
+
+Revision ID: b1bb8851709e
+Revises: fa222de06557
+Create Date: 2026-10-18 19:53:17.845920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b1bb8851709e'
+down_revision: Union[str, None] = 'fa222de06557'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Índices temporales que usan la purga por lotes y el particionado (ix_api_logs_timestamp: 44d29b49386b)
+INDEXES = (
+    ("ix_error_logs_created_at", "error_logs", "created_at"),
+    ("ix_gamification_events_timestamp", "gamification_events", "timestamp"),
+    ("ix_credit_transactions_timestamp", "credit_transactions", "timestamp"),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    for name, table, column in INDEXES:
+        if name not in {index["name"] for index in inspector.get_indexes(table)}:
+            op.create_index(name, table, [column])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, _ in INDEXES:
+        op.drop_index(name, table_name=table)
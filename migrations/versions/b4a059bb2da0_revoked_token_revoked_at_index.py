@@ -0,0 +1,31 @@
+"""revoked token revoked_at index
+
+Revision ID: b4a059bb2da0
+Revises: c1d2062525fd
+Create Date: 2026-10-18 19:20:44.118302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4a059bb2da0'
+down_revision: Union[str, None] = 'c1d2062525fd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Consulta incremental del índice de revocaciones por marca de agua
+    indexes = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes("revoked_tokens")}
+    if "ix_revoked_tokens_revoked_at" not in indexes:
+        op.create_index("ix_revoked_tokens_revoked_at", "revoked_tokens", ["revoked_at"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_revoked_tokens_revoked_at", table_name="revoked_tokens")
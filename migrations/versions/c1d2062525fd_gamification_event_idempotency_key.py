@@ -0,0 +1,51 @@
+"""gamification event idempotency key
+
+Revision ID: c1d2062525fd
+Revises: 6c909864f29d
+Create Date: 2026-10-18 18:47:26.904158
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c1d2062525fd'
+down_revision: Union[str, None] = '6c909864f29d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CONSTRAINT = "uq_gamification_events_idempotency_key"
+
+
+def _is_partitioned(bind) -> bool:
+    if bind.dialect.name not in ("mysql", "mariadb"):
+        return False
+    return bool(bind.execute(sa.text(
+        "SELECT COUNT(*) FROM information_schema.PARTITIONS WHERE TABLE_SCHEMA = DATABASE() "
+        "AND TABLE_NAME = 'gamification_events' AND PARTITION_NAME IS NOT NULL"
+    )).scalar())
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    # Las bases creadas con create_all ya tienen la columna y su restricción
+    columns = {column["name"] for column in sa.inspect(bind).get_columns("gamification_events")}
+    if "idempotency_key" in columns:
+        return
+    op.add_column("gamification_events", sa.Column("idempotency_key", sa.String(length=64), nullable=True))
+    # En una tabla ya particionada toda clave única debe incluir la columna de partición; la
+    # deduplicación por clave la sigue haciendo _store_events antes de insertar
+    unique_columns = ["idempotency_key", "timestamp"] if _is_partitioned(bind) else ["idempotency_key"]
+    with op.batch_alter_table("gamification_events") as batch_op:
+        batch_op.create_unique_constraint(CONSTRAINT, unique_columns)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("gamification_events") as batch_op:
+        batch_op.drop_constraint(CONSTRAINT, type_="unique")
+        batch_op.drop_column("idempotency_key")
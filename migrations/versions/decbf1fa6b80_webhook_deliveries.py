@@ -0,0 +1,52 @@
+"""webhook deliveries outbox
+
+Revision ID: decbf1fa6b80
+Revises: b4a059bb2da0
+Create Date: 2026-10-18 19:41:09.602731
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'decbf1fa6b80'
+down_revision: Union[str, None] = 'b4a059bb2da0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Las bases creadas con create_all ya tienen la tabla
+    if sa.inspect(op.get_bind()).has_table("webhook_deliveries"):
+        return
+    op.create_table(
+        "webhook_deliveries",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("integration_id", sa.Integer(), nullable=False),
+        sa.Column("event_type", sa.String(length=50), nullable=False),
+        sa.Column("payload", sa.Text(), nullable=False),
+        sa.Column("status", sa.String(length=20), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=True),
+        sa.Column("next_attempt_at", sa.DateTime(), nullable=True),
+        sa.Column("last_error", sa.String(length=255), nullable=True),
+        sa.Column("coalesce_key", sa.String(length=100), nullable=True),
+        sa.Column("coalesced_count", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("delivered_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["integration_id"], ["integrations.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_webhook_deliveries_id", "webhook_deliveries", ["id"])
+    op.create_index("ix_webhook_deliveries_integration_id", "webhook_deliveries", ["integration_id"])
+    op.create_index("ix_webhook_deliveries_status", "webhook_deliveries", ["status"])
+    op.create_index("ix_webhook_deliveries_next_attempt_at", "webhook_deliveries", ["next_attempt_at"])
+    op.create_index("ix_webhook_deliveries_coalesce_key", "webhook_deliveries", ["coalesce_key"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("webhook_deliveries")
@@ -0,0 +1,54 @@
+"""gamification window rankings
+
+Revision ID: f2e746c885b1
+Revises: 7669eb35bb95
+Create Date: 2026-10-18 20:27:52.136094
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2e746c885b1'
+down_revision: Union[str, None] = '7669eb35bb95'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    # Ranking por tipo de evento sobre user_gamification
+    if "ix_user_gamification_type_points" not in {index["name"] for index in inspector.get_indexes("user_gamification")}:
+        op.create_index("ix_user_gamification_type_points", "user_gamification", ["event_type_id", "points"])
+
+    # Las bases creadas con create_all ya tienen la tabla
+    if inspector.has_table("gamification_hourly_counts"):
+        return
+    op.create_table(
+        "gamification_hourly_counts",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("bucket_start", sa.DateTime(), nullable=False),
+        sa.Column("event_type_id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("session_id", sa.String(length=36), nullable=True),
+        sa.Column("events", sa.Integer(), nullable=False),
+        sa.Column("points", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["event_type_id"], ["event_types.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["user_id"], ["usuarios.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["session_id"], ["sesiones_anonimas.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("bucket_start", "event_type_id", "user_id", name="uq_hourly_count_user"),
+        sa.UniqueConstraint("bucket_start", "event_type_id", "session_id", name="uq_hourly_count_session"),
+    )
+    op.create_index("ix_gamification_hourly_counts_id", "gamification_hourly_counts", ["id"])
+    op.create_index("ix_hourly_count_type_bucket", "gamification_hourly_counts", ["event_type_id", "bucket_start"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("gamification_hourly_counts")
+    op.drop_index("ix_user_gamification_type_points", table_name="user_gamification")
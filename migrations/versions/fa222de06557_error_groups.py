@@ -0,0 +1,46 @@
+"""error groups
+
+Revision ID: fa222de06557
+Revises: decbf1fa6b80
+Create Date: 2026-10-18 19:48:31.270514
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'fa222de06557'
+down_revision: Union[str, None] = 'decbf1fa6b80'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Las bases creadas con create_all ya tienen la tabla
+    if sa.inspect(op.get_bind()).has_table("error_groups"):
+        return
+    op.create_table(
+        "error_groups",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("fingerprint", sa.String(length=40), nullable=False),
+        sa.Column("error_code", sa.Integer(), nullable=False),
+        sa.Column("route", sa.String(length=255), nullable=True),
+        sa.Column("message", sa.String(length=255), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.Column("first_seen", sa.DateTime(), nullable=True),
+        sa.Column("last_seen", sa.DateTime(), nullable=True),
+        sa.Column("samples", sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("fingerprint"),
+    )
+    op.create_index("ix_error_groups_id", "error_groups", ["id"])
+    op.create_index("ix_error_groups_last_seen", "error_groups", ["last_seen"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("error_groups")